@@ -16,13 +16,36 @@
 
 import os
 import click
+from concurrent.futures import ProcessPoolExecutor
 from dagify.converter import ControlM, Automic
 from dagify.converter.report_generator import Report
+from dagify.converter.graph_optimizer import OPTIMIZE_SCOPES
+from dagify.converter.partitioner import SPLIT_MODES
+from dagify.converter.sharding import load_shard_plan
+from dagify.converter.uf_columnar import write_dataset
+from dagify.converter.xml_backend import BACKENDS
 
 
 CONTEXT_SETTINGS = dict(help_option_names=['-h', '--help'])
 
 
+def parse_profiles(ctx, param, value):
+    """Splits NAME=CONFIG_FILE profile options"""
+    profiles = []
+    for profile in value:
+        name, separator, config_file = profile.partition("=")
+        if not separator or not name or not config_file:
+            raise click.BadParameter(
+                f"expected NAME=CONFIG_FILE, got {profile}")
+        profiles.append((name, config_file))
+    return profiles
+
+
+def convert_shard(options):
+    """Converts one shard of a shard plan in a local worker process"""
+    ControlM(**options)
+
+
 
 
 @click.command(context_settings=CONTEXT_SETTINGS)
@@ -58,7 +81,8 @@ CONTEXT_SETTINGS = dict(help_option_names=['-h', '--help'])
                                 "./dagify/templates")))
 @click.option("-d",
              "--dag-divider",
-             help="Which field in Job Definition should be used to divide up DAGS.")
+             help="Which field in Job Definition should be used to divide up DAGS. "
+                  "Several fields may be combined with +, e.g. APPLICATION+SUB_APPLICATION")
 
 @click.option("-r",
              "--report",
@@ -67,33 +91,245 @@ CONTEXT_SETTINGS = dict(help_option_names=['-h', '--help'])
              help="Generate report in txt and json format which \
                gives an overview of job_types converted")
 
+@click.option("--streaming",
+             is_flag=True,
+             default=False,
+             help="Parse the source file incrementally, job by job, "
+                  "to keep memory usage low on very large exports")
+
+@click.option("--parser-backend",
+              type=click.Choice(list(BACKENDS)),
+              default=lambda: os.environ.get("AS_PARSER_BACKEND", None),
+              help="XML parser used to read the source file, "
+                   "defaults to the fastest one for the parse mode")
+
+@click.option("--parse-workers",
+              type=int,
+              default=lambda: int(os.environ.get("AS_PARSE_WORKERS", 1)),
+              help="Number of processes parsing the folders of the source file, "
+                   "0 uses one per CPU",
+              show_default="{}".format(os.environ.get("AS_PARSE_WORKERS", 1)))
+
+@click.option("--cache-dir",
+              default=lambda: os.environ.get("AS_CACHE_DIR", None),
+              help="Directory caching parsed snapshots of source files and "
+                   "rendered jobs, unchanged sources are then not parsed again "
+                   "and unchanged jobs not rendered again")
+
+@click.option("--cache-size",
+              type=int,
+              default=lambda: int(os.environ.get("AS_CACHE_SIZE", 512)),
+              help="Maximum size of the cache directory in MB, a quarter of it "
+                   "for rendered jobs, the least recently used snapshots and "
+                   "rendered jobs are removed first",
+              show_default="{}".format(os.environ.get("AS_CACHE_SIZE", 512)))
+
+@click.option("--export-dataset",
+              default=lambda: os.environ.get("AS_EXPORT_DATASET", None),
+              help="Directory of a partitioned Parquet dataset the parsed "
+                   "source is written to, for analytics across many exports")
+
+@click.option("--profile",
+              multiple=True,
+              callback=parse_profiles,
+              help="Conversion profile as NAME=CONFIG_FILE, may be repeated. "
+                   "The source is parsed once and converted with every "
+                   "profile into OUTPUT_PATH/NAME")
+
+@click.option("--optimize-dependencies",
+              type=click.Choice(OPTIMIZE_SCOPES),
+              default=lambda: os.environ.get("AS_OPTIMIZE_DEPENDENCIES", None),
+              help="Report dependency cycles, remove dependencies implied by "
+                   "others within each DAG (dag) or across DAGs (global) and "
+                   "write the rest with chain and cross_downstream")
+
+@click.option("--partition-dags",
+              is_flag=True,
+              default=lambda: os.environ.get("AS_PARTITION_DAGS", "false").lower() == "true",
+              help="Move tasks between the DAGs of the dag divider to minimise "
+                   "dependencies across DAGs, writing a report of the sensors saved. "
+                   "DAGs grow up to --max-dag-size tasks, by default the size of "
+                   "the largest DAG of the dag divider")
+
+@click.option("--max-dag-size",
+              type=int,
+              default=lambda: os.environ.get("AS_MAX_DAG_SIZE", None),
+              help="Maximum number of tasks of a DAG, larger DAGs are split "
+                   "and partitioning does not grow DAGs beyond it")
+
+@click.option("--dag-split",
+              type=click.Choice(list(SPLIT_MODES)),
+              default=lambda: os.environ.get("AS_DAG_SPLIT", "components"),
+              help="How DAGs larger than --max-dag-size are split: along connected "
+                   "groups of tasks (components) or topological layers (layers)",
+              show_default="{}".format(os.environ.get("AS_DAG_SPLIT", "components")))
+
+@click.option("--task-priorities",
+              is_flag=True,
+              default=lambda: os.environ.get("AS_TASK_PRIORITIES", "false").lower() == "true",
+              help="Set the priority_weight of every task from the length of its "
+                   "critical path and its downstream tasks, boosting CRITICAL jobs")
+
+@click.option("--condition-registry",
+              default=lambda: os.environ.get("AS_CONDITION_REGISTRY", None),
+              help="SQLite file registering the conditions of every converted "
+                   "export, so dependencies on jobs of other exports get "
+                   "markers and sensors (controlm only)")
+
+@click.option("--shard-plan",
+              default=lambda: os.environ.get("AS_SHARD_PLAN", None),
+              help="Shard plan file of a sharded conversion, written by "
+                   "--plan-shards and read by --shard and --local-workers")
+
+@click.option("--plan-shards",
+              type=int,
+              default=lambda: os.environ.get("AS_PLAN_SHARDS", None),
+              help="Write a plan dividing the DAGs of the source into this "
+                   "number of shards to --shard-plan, without converting them")
+
+@click.option("--shard",
+              type=int,
+              default=lambda: os.environ.get("AS_SHARD", None),
+              help="Convert only the DAGs of this shard of --shard-plan, "
+                   "numbered from 0, into the shared output path")
+
+@click.option("--local-workers",
+              type=int,
+              default=lambda: os.environ.get("AS_LOCAL_WORKERS", None),
+              help="Convert every shard of --shard-plan in this number of "
+                   "local processes, 0 uses one per CPU")
+
 @click.option("--tool",
               type=click.Choice(['controlm', 'automic']),  # Restrict input to these choices
               default=lambda: os.environ.get("AS_TYPE", "controlm"),  # Default to 'ctrl-m'
               help="Type of conversion ('controlm' or 'automic')",
               show_default="{}".format(os.environ.get("AS_TYPE", "controlm")))
 
-def dagify(source_path, output_path, config_file, templates, dag_divider, report, tool):
+def dagify(source_path, output_path, config_file, templates, dag_divider, report, streaming, parser_backend, parse_workers, cache_dir, cache_size, export_dataset, profile, optimize_dependencies, partition_dags, max_dag_size, dag_split, task_priorities, condition_registry, shard_plan, plan_shards, shard, local_workers, tool):
     """Run dagify."""
     print("Run DAGify Engine")
 
-    if tool == "controlm":
+    if plan_shards is not None or shard is not None or local_workers is not None:
+        if tool != "controlm":
+            raise click.UsageError("sharded conversion is only supported for controlm")
+        if shard_plan is None:
+            raise click.UsageError("--shard-plan is required to plan or convert shards")
+    if shard is not None or local_workers is not None:
+        # Each shard only converts its tasks, these options need all of them
+        unsupported = [name for name, value in [
+            ("--report", report),
+            ("--export-dataset", export_dataset),
+            ("--partition-dags", partition_dags),
+            ("--max-dag-size", max_dag_size is not None),
+            ("--task-priorities", task_priorities),
+            ("--condition-registry", condition_registry),
+        ] if value]
+        if unsupported:
+            raise click.UsageError(f"{', '.join(unsupported)} cannot be used to convert shards")
+
+    # The planning pass names the tasks with the templates, the shards convert them
+    if plan_shards is not None:
         ControlM(
             source_path=source_path,
             output_path=output_path,
             config_file=config_file,
             templates_path=templates,
             dag_divider=dag_divider,
+            streaming=streaming,
+            parser_backend=parser_backend,
+            parse_workers=parse_workers,
+            cache_dir=cache_dir,
+            cache_size=cache_size * 2**20,
+            shard_plan=shard_plan,
+            plan_shards=plan_shards,
         )
-    elif tool == "automic":
-        Automic(
+        if local_workers is None:
+            return
+
+    if local_workers is not None:
+        if profile:
+            raise click.UsageError("profiles cannot be converted with --local-workers")
+        options = dict(
             source_path=source_path,
             output_path=output_path,
             config_file=config_file,
             templates_path=templates,
             dag_divider=dag_divider,
-    )
-        
+            streaming=streaming,
+            parser_backend=parser_backend,
+            parse_workers=parse_workers,
+            cache_dir=cache_dir,
+            cache_size=cache_size * 2**20,
+            optimize_dependencies=optimize_dependencies,
+            partition_dags=partition_dags,
+            max_dag_size=max_dag_size,
+            dag_split=dag_split,
+            task_priorities=task_priorities,
+            condition_registry=condition_registry,
+            shard_plan=shard_plan,
+        )
+        shard_count = len(load_shard_plan(shard_plan)["shards"])
+        with ProcessPoolExecutor(max_workers=local_workers or None) as executor:
+            list(executor.map(convert_shard, [dict(options, shard=number) for number in range(shard_count)]))
+        return
+
+    # Without profiles the source is converted once with the config file
+    if not profile:
+        profile = [(None, config_file)]
+
+    # The source is parsed once, every profile converts an overlay of it
+    uf = None
+    for profile_name, profile_config_file in profile:
+        profile_output_path = output_path
+        if profile_name is not None:
+            profile_output_path = os.path.join(output_path, profile_name)
+            print(f"Convert with profile {profile_name}")
+
+        if tool == "controlm":
+            converter = ControlM(
+                source_path=source_path,
+                output_path=profile_output_path,
+                config_file=profile_config_file,
+                templates_path=templates,
+                dag_divider=dag_divider,
+                streaming=streaming,
+                parser_backend=parser_backend,
+                parse_workers=parse_workers,
+                cache_dir=cache_dir,
+                cache_size=cache_size * 2**20,
+                uf=uf,
+                optimize_dependencies=optimize_dependencies,
+                partition_dags=partition_dags,
+                max_dag_size=max_dag_size,
+                dag_split=dag_split,
+                task_priorities=task_priorities,
+                condition_registry=condition_registry,
+                shard_plan=shard_plan,
+                shard=shard,
+            )
+        elif tool == "automic":
+            converter = Automic(
+                source_path=source_path,
+                output_path=profile_output_path,
+                config_file=profile_config_file,
+                templates_path=templates,
+                dag_divider=dag_divider,
+                parser_backend=parser_backend,
+                cache_dir=cache_dir,
+                cache_size=cache_size * 2**20,
+                uf=uf,
+                optimize_dependencies=optimize_dependencies,
+                partition_dags=partition_dags,
+                max_dag_size=max_dag_size,
+                dag_split=dag_split,
+                task_priorities=task_priorities,
+        )
+        uf = converter.source_uf
+
+    if export_dataset:
+        source = os.path.splitext(os.path.basename(source_path))[0]
+        write_dataset(uf, export_dataset, source)
+
     if report:
         Report(
             source_path=source_path,
@@ -101,6 +337,12 @@ def dagify(source_path, output_path, config_file, templates, dag_divider, report
             config_file=config_file,
             templates_path=templates,
             dag_divider=dag_divider,
+            streaming=streaming,
+            parser_backend=parser_backend,
+            parse_workers=parse_workers,
+            cache_dir=cache_dir,
+            cache_size=cache_size * 2**20,
+            uf=uf if tool == "controlm" else None,
         )
 
 if __name__ == '__main__':
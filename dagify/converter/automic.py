@@ -24,6 +24,9 @@ from .engine import (
     convert,
     cal_dag_dividers,
     calc_dag_dependencies,
+    partition_dag_dividers,
+    calc_task_priorities,
+    split_dag_dividers,
     generate_airflow_dags
 )
 
@@ -35,6 +38,15 @@ class Automic():
         templates_path="./templates",
         config_file="./config.yaml",
         dag_divider="BranchType", # update if needed
+        parser_backend=None,
+        cache_dir=None,
+        cache_size=None,
+        uf=None,
+        optimize_dependencies=None,
+        partition_dags=False,
+        max_dag_size=None,
+        dag_split="components",
+        task_priorities=False,
     ):
         self.DAGs = []
         self.baseline_imports = []
@@ -48,14 +60,38 @@ class Automic():
         self.output_path = f"{output_path}/{source_xml_name}"
         self.dag_divider = "BranchType" if dag_divider == None else dag_divider # update if needed
         self.schema = "./dagify/converter/yaml_validator/schema.yaml"
-        self.uf = load_source(self.source_path, "automic")
+        self.parser_backend = parser_backend
+        self.cache_dir = cache_dir
+        self.cache_size = cache_size
+        # Scope of the dependency optimization, None to render them as calculated
+        self.optimize_dependencies = optimize_dependencies
+        # Move tasks between DAGs to save sensors, DAGs with more than
+        # max_dag_size tasks are split by dag_split
+        self.partition_dags = partition_dags
+        self.max_dag_size = max_dag_size
+        self.dag_split = dag_split
+        # Weight tasks by their critical path across DAGs
+        self.task_priorities = task_priorities
+        # The parsed source is read-only and can be passed in to convert it
+        # with another profile, this conversion runs on an overlay of it
+        if uf is None:
+            uf = load_source(self.source_path, "automic", backend=self.parser_backend,
+                             cache_dir=self.cache_dir, cache_size=self.cache_size)
+        self.source_uf = uf
+        self.uf = uf.create_overlay()
 
         # Run the Proccess
         set_baseline_imports(self)
         load_config(self)
         load_templates(self)
         validate(self)
+        if self.task_priorities:
+            calc_task_priorities(self, "automic")
         convert(self, "automic", "OType", "Object")
         cal_dag_dividers(self)
         calc_dag_dependencies(self.uf, "automic")
+        if self.partition_dags:
+            partition_dag_dividers(self, "Object", "automic")
+        if self.max_dag_size is not None:
+            split_dag_dividers(self, "Object", "automic")
         generate_airflow_dags(self, "Object")
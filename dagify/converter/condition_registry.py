@@ -0,0 +1,118 @@
+# Copyright 2024 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import sqlite3
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS producers (
+    source TEXT NOT NULL,
+    condition TEXT NOT NULL,
+    dag_id TEXT NOT NULL,
+    task_id TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS consumers (
+    source TEXT NOT NULL,
+    condition TEXT NOT NULL,
+    dag_id TEXT NOT NULL,
+    task_id TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS producers_condition ON producers (condition);
+CREATE INDEX IF NOT EXISTS producers_source ON producers (source);
+CREATE INDEX IF NOT EXISTS consumers_condition ON consumers (condition);
+CREATE INDEX IF NOT EXISTS consumers_source ON consumers (source);
+"""
+
+# Conditions consumed in one export and only produced in others
+UPSTREAM_QUERY = """
+SELECT DISTINCT c.dag_id, c.task_id, p.source, p.dag_id, p.task_id
+FROM consumers c JOIN producers p ON p.condition = c.condition
+WHERE c.source = :source AND p.source != :source
+AND NOT EXISTS (SELECT 1 FROM producers l
+                WHERE l.condition = c.condition AND l.source = :source)
+ORDER BY c.dag_id, c.task_id, p.source, p.dag_id, p.task_id
+"""
+
+# Conditions produced in one export for the exports that do not produce them
+DOWNSTREAM_QUERY = """
+SELECT DISTINCT p.dag_id, p.task_id, c.source, c.dag_id, c.task_id
+FROM producers p JOIN consumers c ON c.condition = p.condition
+WHERE p.source = :source AND c.source != :source
+AND NOT EXISTS (SELECT 1 FROM producers l
+                WHERE l.condition = c.condition AND l.source = c.source)
+ORDER BY p.dag_id, p.task_id, c.source, c.dag_id, c.task_id
+"""
+
+
+class ConditionRegistry():
+    """Conditions of every converted export of an estate, in a SQLite file
+
+    Each export registers the DAG and task of the jobs producing and
+    consuming its conditions. A condition an export consumes but does not
+    produce is matched to the jobs producing it in the exports converted
+    before, so their dependencies get markers and sensors without parsing
+    the other exports again. Converting an export again replaces its rows
+    only.
+
+    Args:
+        registry_path (str): The SQLite file, created when missing.
+    """
+
+    def __init__(self, registry_path):
+        self.connection = sqlite3.connect(registry_path)
+        with self.connection:
+            self.connection.executescript(SCHEMA)
+
+    def update_source(self, source, producers, consumers):
+        """Replaces the conditions of an export
+
+        Args:
+            source (str): The export name.
+            producers (list): (condition, dag_id, task_id) of jobs adding them.
+            consumers (list): (condition, dag_id, task_id) of jobs waiting on them.
+        """
+        with self.connection:
+            for table, rows in (("producers", producers), ("consumers", consumers)):
+                self.connection.execute(f"DELETE FROM {table} WHERE source = ?", (source,))
+                self.connection.executemany(
+                    f"INSERT INTO {table} (source, condition, dag_id, task_id) VALUES (?, ?, ?, ?)",
+                    [(source,) + tuple(row) for row in rows])
+
+    def remove_source(self, source):
+        self.update_source(source, [], [])
+
+    def get_sources(self):
+        rows = self.connection.execute(
+            "SELECT source FROM producers UNION SELECT source FROM consumers ORDER BY source")
+        return [source for source, in rows]
+
+    def get_upstream_tasks(self, source):
+        """Returns the tasks of other exports the tasks of source wait on
+
+        Returns:
+            list: (dag_id, task_id, upstream source, upstream dag_id,
+            upstream task_id) rows.
+        """
+        return self.connection.execute(UPSTREAM_QUERY, {"source": source}).fetchall()
+
+    def get_downstream_tasks(self, source):
+        """Returns the tasks of other exports waiting on the tasks of source
+
+        Returns:
+            list: (dag_id, task_id, downstream source, downstream dag_id,
+            downstream task_id) rows.
+        """
+        return self.connection.execute(DOWNSTREAM_QUERY, {"source": source}).fetchall()
+
+    def close(self):
+        self.connection.close()
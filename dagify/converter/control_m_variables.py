@@ -0,0 +1,115 @@
+# Copyright 2024 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import string
+from functools import lru_cache
+from typing import NamedTuple
+
+VARIABLE_MARKER = "%%"
+# %%\ writes a literal %% rather than a variable reference
+VARIABLE_ESCAPE = "\\"
+VARIABLE_NAME_CHARS = frozenset(string.ascii_letters + string.digits + "_")
+# A period after a reference is the concatenation operator when text,
+# a path or another reference follows it
+CONCAT_OPERATOR = "."
+CONCAT_CHARS = VARIABLE_NAME_CHARS | {"/", "%"}
+# References to these variables are always concatenated to what follows
+PREFIX_SUFFIX = "_PREFIX"
+
+# Distinct values parsed, they repeat heavily across the jobs of an export
+PARSE_CACHE_SIZE = 2**16
+
+
+class Text(NamedTuple):
+    value: str
+
+
+class Variable(NamedTuple):
+    name: str
+
+
+@lru_cache(maxsize=PARSE_CACHE_SIZE)
+def parse_variables(value):
+    """Parses a Control-M value into text and variable references
+
+    The value is read once from left to right. %%NAME references a
+    variable, %%\\ is a literal %%, and a period after a reference is the
+    concatenation operator and is dropped: %%APP_HOME.bin reads the value
+    of APP_HOME followed by bin. A period after a _PREFIX variable is
+    always dropped.
+
+    Args:
+        value (str): The Control-M value.
+
+    Returns:
+        tuple: The Text and Variable nodes of the value.
+    """
+    nodes = []
+    text = []
+    index = 0
+    length = len(value)
+    while index < length:
+        start = value.find(VARIABLE_MARKER, index)
+        if start == -1:
+            text.append(value[index:])
+            break
+        text.append(value[index:start])
+        index = start + len(VARIABLE_MARKER)
+        if value.startswith(VARIABLE_ESCAPE, index):
+            text.append(VARIABLE_MARKER)
+            index += len(VARIABLE_ESCAPE)
+            continue
+        end = index
+        while end < length and value[end] in VARIABLE_NAME_CHARS:
+            end += 1
+        if end == index:
+            text.append(VARIABLE_MARKER)
+            continue
+        if "".join(text):
+            nodes.append(Text("".join(text)))
+        text = []
+        name = value[index:end]
+        nodes.append(Variable(name))
+        index = end
+        if value.startswith(CONCAT_OPERATOR, index) and (
+                name.endswith(PREFIX_SUFFIX)
+                or (index + 1 < length and value[index + 1] in CONCAT_CHARS)):
+            index += len(CONCAT_OPERATOR)
+    if text and "".join(text):
+        nodes.append(Text("".join(text)))
+    return tuple(nodes)
+
+
+def get_python_name(name):
+    """Returns the Python variable holding a Control-M variable"""
+    return name.lower()
+
+
+def get_variable_names(nodes):
+    """Returns the variables referenced by nodes, once each, in order"""
+    return list(dict.fromkeys(node.name for node in nodes if isinstance(node, Variable)))
+
+
+def get_variable_declarations(nodes):
+    """Returns the variables of nodes as the env vars declared by a DAG
+
+    Each is read in the DAG from the Airflow Variable of its name."""
+    return [{"env_var": name, "python_var": get_python_name(name)}
+            for name in get_variable_names(nodes)]
+
+
+def to_fstring(nodes):
+    """Returns nodes as the body of a Python f-string"""
+    return "".join(node.value if isinstance(node, Text) else "{" + get_python_name(node.name) + "}"
+                   for node in nodes)
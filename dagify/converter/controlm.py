@@ -24,6 +24,14 @@ from .engine import (
     convert,
     cal_dag_dividers,
     calc_dag_dependencies,
+    partition_dag_dividers,
+    calc_task_priorities,
+    split_dag_dividers,
+    register_conditions,
+    check_stable_task_names,
+    create_shard_plan,
+    select_shard,
+    add_shard_dependencies,
     generate_airflow_dags
 )
 
@@ -36,6 +44,21 @@ class ControlM():
         templates_path="./templates",
         config_file="./config.yaml",
         dag_divider="PARENT_FOLDER",
+        streaming=False,
+        parser_backend=None,
+        parse_workers=None,
+        cache_dir=None,
+        cache_size=None,
+        uf=None,
+        optimize_dependencies=None,
+        partition_dags=False,
+        max_dag_size=None,
+        dag_split="components",
+        task_priorities=False,
+        condition_registry=None,
+        shard_plan=None,
+        plan_shards=None,
+        shard=None,
     ):
         self.DAGs = []
         self.baseline_imports = []
@@ -49,14 +72,66 @@ class ControlM():
         self.output_path = f"{output_path}/{source_xml_name}"
         self.dag_divider = "PARENT_FOLDER" if dag_divider == None else dag_divider
         self.schema = "./dagify/converter/yaml_validator/schema.yaml"
-        self.uf = load_source(self.source_path, "controlm")
+        self.streaming = streaming
+        self.parser_backend = parser_backend
+        self.parse_workers = parse_workers
+        self.cache_dir = cache_dir
+        self.cache_size = cache_size
+        # Scope of the dependency optimization, None to render them as calculated
+        self.optimize_dependencies = optimize_dependencies
+        # Move tasks between DAGs to save sensors, DAGs with more than
+        # max_dag_size tasks are split by dag_split
+        self.partition_dags = partition_dags
+        self.max_dag_size = max_dag_size
+        self.dag_split = dag_split
+        # Weight tasks by their critical path across DAGs
+        self.task_priorities = task_priorities
+        # SQLite file matching conditions across exports, None for this export only
+        self.condition_registry = condition_registry
+        # Convert only the DAGs of shard in the plan written by the planning
+        # pass, which divides the DAGs into plan_shards shards
+        self.shard_plan = shard_plan
+        self.plan_shards = plan_shards
+        self.shard = shard
+        # The parsed source is read-only and can be passed in to convert it
+        # with another profile, this conversion runs on an overlay of it
+        if uf is None:
+            uf = load_source(self.source_path, "controlm",
+                             streaming=self.streaming,
+                             backend=self.parser_backend,
+                             workers=self.parse_workers,
+                             cache_dir=self.cache_dir,
+                             cache_size=self.cache_size)
+        self.source_uf = uf
+        if self.shard is None:
+            self.uf = uf.create_overlay()
+        else:
+            self.uf = select_shard(self, uf)
 
         set_baseline_imports(self)
         load_config(self)
         load_templates(self)
+        if self.plan_shards is not None:
+            # The planning pass names the tasks, the shards convert them
+            create_shard_plan(self, "control-m", "TASKTYPE", "JOBNAME")
+            return
         validate(self)
+        if self.condition_registry is not None:
+            check_stable_task_names(self, "control-m", "TASKTYPE", "JOBNAME", "the condition registry")
+        if self.shard is not None:
+            check_stable_task_names(self, "control-m", "TASKTYPE", "JOBNAME", "other shards")
+        if self.task_priorities:
+            calc_task_priorities(self, "controlm")
         convert(self, "control-m", "TASKTYPE", "JOBNAME")
         cal_dag_dividers(self)
         calc_dag_dependencies(self.uf, "controlm")
+        if self.shard is not None:
+            add_shard_dependencies(self, "JOBNAME")
+        if self.partition_dags:
+            partition_dag_dividers(self, "JOBNAME", "controlm")
+        if self.max_dag_size is not None:
+            split_dag_dividers(self, "JOBNAME", "controlm")
+        if self.condition_registry is not None:
+            register_conditions(self, "JOBNAME")
         generate_airflow_dags(self, "JOBNAME")
         
\ No newline at end of file
@@ -0,0 +1,140 @@
+# Copyright 2024 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from array import array
+
+
+class DependencyGraph():
+    """Task dependencies of a Universal Format split by DAG
+
+    Tasks are identified by their position in the Universal Format. The
+    downstream tasks of task i are targets[offsets[i]:offsets[i + 1]], and
+    internal marks the edges the task added within its own DAG.
+
+    The edges of every DAG are split once when the graph is built:
+    internal edges become dependency statements, external edges need an
+    ExternalTaskMarker in the upstream DAG and an ExternalTaskSensor in the
+    DAG of the downstream task.
+
+    Args:
+        uf (UF): The Universal Format, with its dependencies calculated.
+        dag_divider (str): The task attribute dividing tasks into DAGs.
+        task_name (str): The task attribute naming tasks in dependencies.
+    """
+
+    def __init__(self, uf, dag_divider, task_name):
+        tasks = uf.get_tasks()
+        self.names = [task.get_attribute(task_name) for task in tasks]
+        self.dividers = [task.get_attribute(dag_divider) for task in tasks]
+        # Dependencies reference tasks by name, the first task of a name wins
+        self.ids = {}
+        self.divider_tasks = {}
+        self.name_dividers = {}
+        for task_id, name in enumerate(self.names):
+            divider = self.dividers[task_id]
+            self.ids.setdefault(name, task_id)
+            self.divider_tasks.setdefault(divider, []).append(task_id)
+            self.name_dividers.setdefault(name, {}).setdefault(divider, None)
+
+        self.offsets = array("l", [0])
+        self.targets = array("l")
+        self.internal = array("b")
+        for task_id, task in enumerate(tasks):
+            for dep in task.get_dependent_tasks():
+                target = self.ids.get(dep.get("task_name"), None)
+                if target is None:
+                    continue
+                self.targets.append(target)
+                self.internal.append(dep.get("dag_name") == self.dividers[task_id])
+            self.offsets.append(len(self.targets))
+        self.split_edges()
+
+    def split_edges(self):
+        self.internal_edges = {}
+        self.external_edges = {}
+        self.upstream_edges = {}
+        for task_id in range(len(self.names)):
+            divider = self.dividers[task_id]
+            downstream = []
+            for edge in range(self.offsets[task_id], self.offsets[task_id + 1]):
+                target = self.targets[edge]
+                if self.internal[edge]:
+                    downstream.append(target)
+                    continue
+                self.external_edges.setdefault(divider, []).append((task_id, target))
+                # The sensor goes in every DAG with a task of the target name
+                for target_divider in self.name_dividers[self.names[target]]:
+                    self.upstream_edges.setdefault(target_divider, []).append((task_id, target))
+            if downstream:
+                self.internal_edges.setdefault(divider, []).append((task_id, downstream))
+
+    def remove_edges(self, edges):
+        """Removes edges, given by their index in targets, from the graph"""
+        offsets = array("l", [0])
+        targets = array("l")
+        internal = array("b")
+        for task_id in range(len(self.names)):
+            for edge in range(self.offsets[task_id], self.offsets[task_id + 1]):
+                if edge not in edges:
+                    targets.append(self.targets[edge])
+                    internal.append(self.internal[edge])
+            offsets.append(len(targets))
+        self.offsets, self.targets, self.internal = offsets, targets, internal
+        self.split_edges()
+
+    def get_edges(self):
+        """Yields the (edge, task, downstream task) triples of the graph"""
+        for task_id in range(len(self.names)):
+            for edge in range(self.offsets[task_id], self.offsets[task_id + 1]):
+                yield edge, task_id, self.targets[edge]
+
+    def is_internal(self, edge):
+        return bool(self.internal[edge])
+
+    def get_task_count(self):
+        return len(self.names)
+
+    def get_edge_count(self):
+        return len(self.targets)
+
+    def get_dividers(self):
+        """Returns the divider values in the order of their first task"""
+        return list(self.divider_tasks)
+
+    def get_name(self, task_id):
+        return self.names[task_id]
+
+    def get_divider(self, task_id):
+        return self.dividers[task_id]
+
+    def get_task_id(self, name):
+        return self.ids.get(name, None)
+
+    def get_tasks(self, divider):
+        return self.divider_tasks.get(divider, [])
+
+    def get_downstream(self, task_id):
+        return self.targets[self.offsets[task_id]:self.offsets[task_id + 1]]
+
+    def get_internal_dependencies(self, divider):
+        """Returns (task, downstream tasks) pairs within the DAG of divider"""
+        return self.internal_edges.get(divider, [])
+
+    def get_external_dependencies(self, divider):
+        """Returns (task, downstream task) edges leaving the DAG of divider"""
+        return self.external_edges.get(divider, [])
+
+    def get_upstream_dependencies(self, divider):
+        """Returns (upstream task, task) edges entering the DAG of divider"""
+        return self.upstream_edges.get(divider, [])
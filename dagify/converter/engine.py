@@ -8,6 +8,30 @@ import xml.etree.ElementTree as ET
 from jinja2 import Environment, FileSystemLoader
 import autopep8
 from .post_process_dag import post_process_dag_file
+from .dependency_graph import DependencyGraph
+from .condition_registry import ConditionRegistry
+from .sharding import (
+    build_shard_plan,
+    write_shard_plan,
+    load_shard_plan,
+    get_shard_positions,
+    get_shard_dependencies
+)
+from .partitioner import (
+    PARTITION_ATTRIBUTE,
+    format_partition_report,
+    partition_tasks,
+    split_dags,
+)
+from .priorities import (
+    PRIORITY_WEIGHT_RULE,
+    compute_priority_weights,
+)
+from .graph_optimizer import (
+    CHAIN_IMPORT_PACKAGE,
+    compact_dependency_statements,
+    optimize_dependencies,
+)
 from .utils import (
     file_exists,
     create_directory,
@@ -15,11 +39,31 @@ from .utils import (
     is_directory,
     read_yaml_to_dict,
     calculate_cron_schedule,
+    get_divider_value,
+    DIVIDER_KEY_SEPARATOR,
 )
 from .rules import (
-    Rule
+    RuleChain,
+    NONDETERMINISTIC_RULES,
+)
+from .structure_renderer import StructureRenderer
+from .control_m_variables import (
+    parse_variables,
+    get_variable_declarations,
+    to_fstring,
+)
+from .render_cache import (
+    RenderCache,
+    get_template_hash,
+    get_render_key,
 )
 
+# Values airflow_task_build sets besides the mappings of a template
+TEMPLATE_INJECTED_KEYS = ["queue", "trigger_rule", "priority_weight", "weight_rule"]
+# Template whose tasks get the parameter_string of their variables
+PARAMETER_STRING_TEMPLATE = "control-m-job-to-airflow-bash"
+PARAMETER_STRING_KEY = "parameter_string"
+
 def load_config(object):
     # Validate Template Path Provided
     if object.config_file is None:
@@ -48,6 +92,7 @@ def load_config(object):
             object.config["config"]["mappings"][idx]["job_type"] = \
                 object.config["config"]["mappings"][idx]["job_type"].upper()
         templatesToValidate.append(object.config["config"]["mappings"][idx]["template_name"])
+    compile_template_index(object)
 
     for root, dirs, files in os.walk(object.templates_path):
         for file in files:
@@ -77,6 +122,20 @@ def load_config(object):
 
     return
 
+def compile_template_index(object):
+    """Indexes the template names of the mappings by job_type and appl_type
+
+    The first mapping of a job_type or appl_type wins, as when the
+    mappings are read in order. Template names resolved for a task are
+    memoised by its (job_type, appl_type) pair, see get_template_name."""
+    object.template_index = {"job_type": {}, "appl_type": {}}
+    for mapping in object.config["config"]["mappings"]:
+        for key in ("job_type", "appl_type"):
+            if key in mapping:
+                object.template_index[key].setdefault(mapping[key], mapping["template_name"])
+    object.template_names = {}
+    return
+
 def validate(object):
     # TODO
     # Check that every Job in the Source has a Configured Mapping in Config
@@ -109,33 +168,231 @@ def load_templates(object):
                 template = read_yaml_to_dict(os.path.join(root, file))
                 if template is not None:
                     # if the dict it not empty
+                    compile_template(template)
                     object.templates_count += 1
                     object.templates[template["metadata"]["name"]] = template
     return
 
+def compile_template(template):
+    """Compiles the rules and the structure of a template once it loads
+
+    The placeholders of the structure are checked against the targets of
+    the mappings and TEMPLATE_INJECTED_KEYS, and parameter_string for
+    PARAMETER_STRING_TEMPLATE only, so a template missing one fails when
+    it loads rather than when its first task is rendered."""
+    mappings = template.get("mappings", None) or []
+    template["content_hash"] = get_template_hash(template)
+    # The rules of every mapping are compiled once
+    template["rule_chains"] = [RuleChain(mapping.get("rules", None)) for mapping in mappings]
+    template["cacheable"] = all(chain.cacheable for chain in template["rule_chains"])
+    template["renderer"] = None
+    template["priority_renderer"] = None
+    if template.get("structure", None) is None:
+        return
+    name = template.get("metadata", {}).get("name", None)
+    template["renderer"] = StructureRenderer(template["structure"], name)
+    if template.get("mappings", None) is not None:
+        injected_keys = TEMPLATE_INJECTED_KEYS
+        if name == PARAMETER_STRING_TEMPLATE:
+            injected_keys = injected_keys + [PARAMETER_STRING_KEY]
+        template["renderer"].check_keys(
+            [mapping.get("target", None) for mapping in mappings] + injected_keys)
+    return
+
 def calc_dag_dependencies(uf, tool):
     function = "calculate_dag_dependencies_" + tool
     getattr(uf, function)()
 
 def cal_dag_dividers(object):
-    dag_dividers = []
     for tIdx, task in enumerate(object.uf.get_tasks()):
-        td = task.get_attribute(object.dag_divider)
-        if td is not None and td not in dag_dividers:
-            dag_dividers.append(td)
-        task.set_dag_name(td)
-    object.dag_dividers = dag_dividers
+        if DIVIDER_KEY_SEPARATOR in object.dag_divider:
+            # Composite dividers are set as an attribute named after them
+            task.set_attribute(object.dag_divider, get_divider_value(task, object.dag_divider))
+        task.set_dag_name(task.get_attribute(object.dag_divider))
+    object.dag_dividers = [td for td in object.uf.get_attribute_values(object.dag_divider)
+                           if td is not None]
+    return
+
+def partition_dag_dividers(object, task_name, tool):
+    """Moves tasks between the DAGs of the dag divider to save sensors
+
+    The report of the moves is printed and written to
+    partition_report.txt in the output path."""
+    graph = DependencyGraph(object.uf, object.dag_divider, task_name)
+    labels = partition_tasks(graph, object.max_dag_size)
+    report = format_partition_report(graph, labels)
+    print(report)
+    create_directory(object.output_path)
+    with open(f"{object.output_path}/partition_report.txt", mode="w", encoding="utf-8") as report_file:
+        report_file.write(report + "\n")
+
+    set_dag_partitions(object, labels, tool)
+    return
+
+def split_dag_dividers(object, task_name, tool):
+    """Splits the DAGs with more than max_dag_size tasks
+
+    DAGs are split by object.dag_split, see SPLIT_MODES, and the
+    dependencies between their parts get markers and sensors as any
+    other dependency across DAGs."""
+    graph = DependencyGraph(object.uf, object.dag_divider, task_name)
+    labels = [graph.get_divider(task_id) for task_id in range(graph.get_task_count())]
+    split_labels = split_dags(graph, labels, object.max_dag_size, object.dag_split)
+    if split_labels != labels:
+        set_dag_partitions(object, split_labels, tool)
+    return
+
+def set_dag_partitions(object, labels, tool):
+    # The DAG of each task becomes the dag divider, and the dependencies
+    # are calculated again for the new DAGs
+    for task, label in zip(object.uf.get_tasks(), labels):
+        task.set_attribute(PARTITION_ATTRIBUTE, label)
+        task.clear_dependent_tasks()
+    object.dag_divider = PARTITION_ATTRIBUTE
+    cal_dag_dividers(object)
+    calc_dag_dependencies(object.uf, tool)
+    return
+
+def register_conditions(object, task_name):
+    """Registers the conditions of the source in the condition registry
+
+    The rows of the source are replaced with the final DAG and name of the
+    tasks producing and consuming its conditions. The registry then gives
+    the tasks of other exports the tasks of the source wait on, which get
+    sensors, and those waiting on the tasks of the source, which get
+    markers. The exports linked to the source are printed, converting them
+    again refreshes their side of the dependencies."""
+    source = object.source_path.split("/")[-1].split(".")[0]
+    producers = []
+    consumers = []
+    for task in object.uf.get_tasks():
+        dag_id = task.get_attribute(object.dag_divider)
+        if dag_id is None:
+            continue
+        name = task.get_attribute(task_name)
+        for out_cond in task.get_out_conditions():
+            if out_cond.get_attribute("SIGN") == "+":
+                producers.append((out_cond.get_attribute("NAME"), dag_id, name))
+        for in_cond in task.get_in_conditions():
+            consumers.append((in_cond.get_attribute("NAME"), dag_id, name))
+
+    registry = ConditionRegistry(object.condition_registry)
+    try:
+        registry.update_source(source, producers, consumers)
+        upstream = registry.get_upstream_tasks(source)
+        downstream = registry.get_downstream_tasks(source)
+    finally:
+        registry.close()
+
+    add_external_dependencies(
+        object,
+        [(dag_id, name, upstream_dag_id, upstream_name)
+         for dag_id, name, _, upstream_dag_id, upstream_name in upstream],
+        [(dag_id, name, downstream_dag_id, downstream_name)
+         for dag_id, name, _, downstream_dag_id, downstream_name in downstream])
+    linked = sorted({row[2] for row in upstream + downstream})
+    if linked:
+        print(f"Conditions of {source} are shared with {', '.join(linked)}")
+    return
+
+def add_external_dependencies(object, upstream, downstream):
+    """Adds dependencies on tasks converted outside of this conversion
+
+    Args:
+        upstream (list): (dag_id, task, upstream dag_id, upstream task)
+            rows, rendered as sensors in the DAG of the task.
+        downstream (list): (dag_id, task, downstream dag_id, downstream
+            task) rows, rendered as markers in the DAG of the task.
+    """
+    if not hasattr(object, "external_upstream"):
+        object.external_upstream = {}
+        object.external_downstream = {}
+    for dag_id, name, upstream_dag_id, upstream_name in upstream:
+        object.external_upstream.setdefault(dag_id, []).append((name, upstream_dag_id, upstream_name))
+    for dag_id, name, downstream_dag_id, downstream_name in downstream:
+        object.external_downstream.setdefault(dag_id, []).append((name, downstream_dag_id, downstream_name))
+    return
+
+def create_shard_plan(object, tool, type, name):
+    """Writes the plan of a sharded conversion of the source
+
+    The tasks are not converted, the plan names them by the rules of
+    their templates so that shards refer to the tasks of the others by
+    the task ids the other shards convert them to."""
+    check_stable_task_names(object, tool, type, name, "other shards")
+    source = object.source_path.split("/")[-1].split(".")[0]
+    plan = build_shard_plan(object.uf, source, object.dag_divider, name,
+                            get_converted_task_names(object, tool, type, name), object.plan_shards)
+    write_shard_plan(plan, object.shard_plan)
+    print(f"Planned {len(plan['shards'])} shards of {source} in {object.shard_plan}")
+    return
+
+def select_shard(object, uf):
+    """Returns an overlay of the tasks of the shard of the plan to convert
+
+    Dependencies with the tasks of other shards are resolved from the
+    conditions in the plan, so they get markers and sensors without
+    converting the other shards, see add_shard_dependencies."""
+    if object.partition_dags or object.max_dag_size is not None or object.task_priorities \
+            or object.condition_registry is not None:
+        raise ValueError(
+            "dagify: partitioning, DAG splitting, task priorities and the condition registry "
+            "need all the tasks, they cannot be used to convert a shard")
+    plan = load_shard_plan(object.shard_plan)
+    if plan["dag_divider"] != object.dag_divider:
+        raise ValueError(
+            f"dagify: the shard plan divides DAGs by {plan['dag_divider']}, not {object.dag_divider}")
+    positions = get_shard_positions(plan, object.shard, uf)
+    # Positions in the source of the tasks of the overlay
+    overlay_positions = {position: index for index, position in enumerate(positions)}
+    upstream, downstream = get_shard_dependencies(plan, object.shard)
+    object.shard_dependencies = (
+        [(overlay_positions[position], dag_id, task_id) for position, dag_id, task_id in upstream],
+        [(overlay_positions[position], dag_id, task_id) for position, dag_id, task_id in downstream])
+    print(f"Convert shard {object.shard} of {len(plan['shards'])}: "
+          f"{len(plan['shards'][object.shard])} DAGs, {len(positions)} tasks")
+    return uf.create_overlay(positions)
+
+def add_shard_dependencies(object, task_name):
+    """Adds the dependencies of the tasks of the shard on other shards
+
+    Tasks of the shard are named as converted, the tasks of other shards
+    by the task ids in the plan."""
+    tasks = object.uf.get_tasks()
+    upstream, downstream = object.shard_dependencies
+    add_external_dependencies(
+        object,
+        [(tasks[index].get_dag_name(), tasks[index].get_attribute(task_name), dag_id, task_id)
+         for index, dag_id, task_id in upstream],
+        [(tasks[index].get_dag_name(), tasks[index].get_attribute(task_name), dag_id, task_id)
+         for index, dag_id, task_id in downstream])
     return
 
 def get_dag_dividers(object):
     return object.dag_dividers
 
+def calc_task_priorities(object, tool):
+    """Sets the priority_weight of every task from its critical path
+
+    Dependencies are matched on the source conditions, so the weights are
+    known before the tasks are built. Tasks with CRITICAL set to 1 are
+    boosted above all others."""
+    tasks = object.uf.get_tasks()
+    edges = getattr(object.uf, "match_dependencies_" + tool)()
+    critical = [position for position, task in enumerate(tasks)
+                if task.get_attribute("CRITICAL") == "1"]
+    weights = compute_priority_weights(len(tasks), edges, critical)
+    for task, weight in zip(tasks, weights):
+        task.set_priority_weight(weight)
+    return
+
 def convert(object, tool, type, name):
     if object.uf is None:
         raise ValueError(
             "dagify: no data in universal format. nothing to convert!")
 
     # process the conversion of all universal format items
+    template_tasks = {}
     for tIdx, task in enumerate(object.uf.get_tasks()):
         # process a single task
         task_type = task.get_attribute(type)
@@ -143,7 +400,7 @@ def convert(object, tool, type, name):
         if task_type is None:
             raise ValueError(
                 f"dagify: no task/OType in source for task {task_name}")
-        template_name = get_template_name(object, task_type)
+        template_name = get_template_name(object, task_type, task.get_attribute("APPL_TYPE"))
         print(template_name)
         # get the template from the template name
         # [0][0] as the template dictionary is the first element of a tuple, in turn first element of a list
@@ -165,13 +422,173 @@ def convert(object, tool, type, name):
 \t from Source Platform {src_platform_name} to Target Platform: {tgt_platform_name}\n \
 \t from Source Operator {src_operator_name} to Target Operator: {tgt_operator_name}\n \
 \t with template: {template_name}\n")
+        template_tasks.setdefault(template["metadata"]["name"], (template, []))[1].append(task)
+
+    # Unchanged tasks are served from the render cache of the cache directory
+    cache = None
+    if getattr(object, "cache_dir", None) is not None:
+        cache = RenderCache(object.cache_dir, getattr(object, "cache_size", None))
+    cached_count = 0
+    try:
+        # The rules of a template run over the tasks sharing it at once
+        for template, tasks in template_tasks.values():
+            # Imports only depend on the template
+            python_imports = airflow_task_python_imports_build(tasks[0], template)
+            use_cache = cache is not None and template["cacheable"]
+            keys = []
+            if use_cache:
+                keys = [get_render_key(template["content_hash"], get_render_inputs(task, template))
+                        for task in tasks]
+                renders = cache.get_many(keys)
+                missed = []
+                for task, key in zip(tasks, keys):
+                    if key in renders:
+                        restore_render(task, renders[key])
+                        task.set_airflow_task_python_imports(python_imports)
+                    else:
+                        missed.append((task, key))
+                cached_count += len(tasks) - len(missed)
+                tasks = [task for task, _ in missed]
+                keys = [key for _, key in missed]
+
+            mapped_values = apply_template_rules(template, tasks)
+            new_renders = []
+            for task, mapped in zip(tasks, mapped_values):
+                output = airflow_task_build(task, template, mapped)
+                task.set_airflow_task_output(output)
+                task.set_airflow_task_python_imports(python_imports)
+                if use_cache:
+                    new_renders.append(get_render(task, template, mapped))
+            if new_renders:
+                cache.store_many(zip(keys, new_renders))
+    finally:
+        if cache is not None:
+            cache.close()
+    if cache is not None:
+        print(f"Served {cached_count} of {object.uf.get_task_count()} tasks from the render cache")
+    
+    return
 
-        output = airflow_task_build(task, template)
-        task.set_airflow_task_output(output)
+def get_render_inputs(task, template):
+    """Returns the task values airflow_task_build reads for a template
+
+    These are the sources of the mappings of the template, before their
+    rules, and the values of the keys the engine injects."""
+    inputs = [task.get_attribute(mapping.get("source", ""))
+              for mapping in template["mappings"] or []]
+    inputs.append(task.get_attribute("NODEID"))
+    inputs.append([in_condition.get_attribute("AND_OR") for in_condition in task.get_in_conditions()])
+    if template["metadata"]["name"] == PARAMETER_STRING_TEMPLATE:
+        inputs.append([(variable.get_attribute("NAME"), variable.get_attribute("VALUE"))
+                       for variable in task.get_variables()])
+    inputs.append(task.get_priority_weight())
+    return inputs
+
+def get_render(task, template, mapped_values):
+    """Returns what rendering a task produced, to be cached
+
+    Besides the output, the mapped values written back to the source
+    attributes are kept, later stages such as dependencies read them."""
+    attributes = []
+    for mapping, chain, mapped in zip(template["mappings"], template["rule_chains"], mapped_values):
+        if mapped is not None and len(chain) > 0:
+            attributes.append([mapping.get("source", ""), mapped[1]])
+    return {
+        "output": task.get_airflow_task_output(),
+        "env_vars": task.get_env_vars(),
+        "attributes": attributes,
+    }
+
+def restore_render(task, render):
+    for source, value in render["attributes"]:
+        task.set_attribute(source, value)
+    task.set_env_vars(render["env_vars"])
+    task.set_airflow_task_output(render["output"])
+    return
 
-        python_imports = airflow_task_python_imports_build(task, template)
-        task.set_airflow_task_python_imports(python_imports)
-    
+def apply_template_rules(template, tasks):
+    """Applies the rule chains of the mappings of a template to its tasks
+
+    Each mapping reads its source attribute from all the tasks at once and
+    runs its compiled rule chain over the column of values. The result is
+    written back to the source attribute, so later mappings of the same
+    source read it, as when the mappings of a task are applied in order.
+
+    Returns:
+        list: For each task, the (source value, mapped value) pair of each
+        mapping, None for mappings without a target.
+    """
+    mapped_values = [[] for _ in tasks]
+    for mapping, chain in zip(template["mappings"] or [], template["rule_chains"]):
+        if mapping.get("target", None) is None:
+            for mapped in mapped_values:
+                mapped.append(None)
+            continue
+        source = mapping.get("source", "")
+        column = [task.get_attribute(source) for task in tasks]
+        results = chain.apply_column(column)
+        for task, mapped, value, result in zip(tasks, mapped_values, column, results):
+            if len(chain) > 0:
+                task.set_attribute(source, result)
+            mapped.append((value, result))
+    return mapped_values
+
+def get_task_name_chains(template, name):
+    """Returns the rule chains renaming tasks in a template, in order
+
+    These are the chains of the mappings of the name attribute, which
+    apply_template_rules writes back to it."""
+    return [chain for mapping, chain in zip(template["mappings"] or [], template["rule_chains"])
+            if mapping.get("target", None) is not None and mapping.get("source", "") == name
+            and len(chain) > 0]
+
+def get_task_templates(object, tool, type):
+    """Returns the templates converting the tasks and their task positions
+
+    Returns:
+        dict: (template, task positions) pairs by template name.
+    """
+    templates = {}
+    for position, task in enumerate(object.uf.get_tasks()):
+        task_type = task.get_attribute(type)
+        if task_type is None:
+            # Reported by convert
+            continue
+        template_name = get_template_name(object, task_type, task.get_attribute("APPL_TYPE"))
+        template = get_template(object, template_name, tool)
+        templates.setdefault(template["metadata"]["name"], (template, []))[1].append(position)
+    return templates
+
+def get_converted_task_names(object, tool, type, name):
+    """Returns the names tasks get once converted, in task order
+
+    The rule chains renaming tasks in their templates run over the names
+    as in apply_template_rules, without converting the tasks."""
+    names = [task.get_attribute(name) for task in object.uf.get_tasks()]
+    for template, positions in get_task_templates(object, tool, type).values():
+        column = [names[position] for position in positions]
+        for chain in get_task_name_chains(template, name):
+            column = chain.apply_column(column)
+        for position, value in zip(positions, column):
+            names[position] = value
+    return names
+
+def check_stable_task_names(object, tool, type, name, usage):
+    """Raises a ValueError when a template names tasks differently every run
+
+    Task names referenced outside of one conversion, by other exports or
+    other shards, must be the same whenever their tasks are converted.
+
+    Args:
+        usage (str): What refers to the task names, for the error.
+    """
+    for template_name, (template, _) in get_task_templates(object, tool, type).items():
+        for chain in get_task_name_chains(template, name):
+            if not chain.deterministic:
+                rules = [rule for rule in chain.names if rule in NONDETERMINISTIC_RULES]
+                raise ValueError(
+                    f"dagify: template {template_name} names tasks with {', '.join(rules)}, "
+                    f"which changes them on every run, {usage} cannot refer to them")
     return
 
 def get_template(object, template_name, tool):
@@ -187,70 +604,68 @@ def get_template(object, template_name, tool):
             f"dagify: no template with name: '{template_name}' was not found among loaded templates.")
     return template
 
-def get_template_name(object, job_type):
-    # First check for job_type mappings
-    for mapping in object.config["config"]["mappings"]:
-        if "job_type" in mapping and mapping["job_type"] == job_type.upper():
-            return mapping["template_name"]
-    
-    # If no job_type match, check for appl_type mappings
-    task_appl_type = None
-    for task in object.uf.get_tasks():
-        if task.get_attribute("TASKTYPE") == job_type:
-            task_appl_type = task.get_attribute("APPL_TYPE")
-            break
-    
-    if task_appl_type:
-        for mapping in object.config["config"]["mappings"]:
-            if "appl_type" in mapping and mapping["appl_type"] == task_appl_type:
-                return mapping["template_name"]
-    
-    # no match found
-    return None
+def get_template_name(object, job_type, appl_type=None):
+    """Returns the template name of a task, None when no mapping matches
+
+    A job_type mapping matches first, then an appl_type mapping of the
+    APPL_TYPE of the task."""
+    key = (job_type, appl_type)
+    if key not in object.template_names:
+        template_name = object.template_index["job_type"].get(job_type.upper(), None)
+        if template_name is None and appl_type:
+            template_name = object.template_index["appl_type"].get(appl_type, None)
+        object.template_names[key] = template_name
+    return object.template_names[key]
 
 def generate_airflow_dags(object, task_name):
     if object.uf is None:
         raise ValueError("dagify: no data in universal format. nothing to convert!")
 
+    # Dependencies are split by dag once, each dag reads its own edges
+    graph = DependencyGraph(object.uf, object.dag_divider, task_name)
+    object.dependency_graph = graph
+    if object.optimize_dependencies is not None:
+        optimize_dependencies(graph, object.optimize_dependencies)
+
     for tIdx, dag_divider_value in enumerate(get_dag_dividers(object)):
         airflow_task_outputs = []
         tasks = []
         schedule_interval = None
         dag_owner = 'airflow'  # Default owner
         dag_queue = None  # Default queue (None means no queue will be set)
-        
-        for tIdx, task in enumerate(object.uf.get_tasks()):
+        dag_tasks = object.uf.get_tasks_by_attr(object.dag_divider, dag_divider_value)
+
+        for tIdx, task in enumerate(dag_tasks):
             # Capture the airflow tasks for each dag divider
-            if task.get_attribute(object.dag_divider) == dag_divider_value:
-                tasks.append(task.get_attribute(task_name))
-                airflow_task_outputs.append(task.get_airflow_task_output())
-                if not schedule_interval:
-                    schedule_interval = calculate_cron_schedule(task)
-                # Get the RUN_AS attribute for the DAG owner if not already set
-                if dag_owner == 'airflow' and task.get_attribute('RUN_AS'):
-                    dag_owner = task.get_attribute('RUN_AS')
-                
-                # Get the NODEID attribute for the DAG queue if not already set
-                if dag_queue is None and task.get_attribute('NODEID'):
-                    nodeid = task.get_attribute('NODEID')
-                    # Check if NODEID contains _SVR or _SERVER
-                    if '_SVR' in nodeid or '_SERVER' in nodeid:
-                        # Extract number from NODEID if present
-                        import re
-                        number_match = re.search(r'(\d+)', nodeid)
-                        if number_match:
-                            number = number_match.group(1)
-                            if number == '1' or not number:
-                                dag_queue = 'tol8'
-                            elif number == '2':
-                                dag_queue = 'kidc'
-                            elif number == '9':
-                                dag_queue = 'lidc'
-                            elif number == '8':
-                                dag_queue = 'qidc'
-                        else:
-                            # No number found
+            tasks.append(task.get_attribute(task_name))
+            airflow_task_outputs.append(task.get_airflow_task_output())
+            if not schedule_interval:
+                schedule_interval = calculate_cron_schedule(task)
+            # Get the RUN_AS attribute for the DAG owner if not already set
+            if dag_owner == 'airflow' and task.get_attribute('RUN_AS'):
+                dag_owner = task.get_attribute('RUN_AS')
+            
+            # Get the NODEID attribute for the DAG queue if not already set
+            if dag_queue is None and task.get_attribute('NODEID'):
+                nodeid = task.get_attribute('NODEID')
+                # Check if NODEID contains _SVR or _SERVER
+                if '_SVR' in nodeid or '_SERVER' in nodeid:
+                    # Extract number from NODEID if present
+                    import re
+                    number_match = re.search(r'(\d+)', nodeid)
+                    if number_match:
+                        number = number_match.group(1)
+                        if number == '1' or not number:
                             dag_queue = 'tol8'
+                        elif number == '2':
+                            dag_queue = 'kidc'
+                        elif number == '9':
+                            dag_queue = 'lidc'
+                        elif number == '8':
+                            dag_queue = 'qidc'
+                    else:
+                        # No number found
+                        dag_queue = 'tol8'
 
         # Calculate DAG Specific Python Imports
         dag_python_imports = object.uf.calculate_dag_python_imports(
@@ -258,58 +673,67 @@ def generate_airflow_dags(object, task_name):
             dag_divider_value=dag_divider_value
         )
 
-        # Calculate all internal and external task dependencies
-        dependencies = object.uf.generate_dag_dependencies_by_divider(object.dag_divider, task_name)
+        # Internal and external task dependencies of this dag
         dependencies_in_dag_internal = []
+        if object.optimize_dependencies is not None:
+            dependencies_in_dag_internal, helpers = compact_dependency_statements(graph, dag_divider_value)
+            if helpers:
+                dag_python_imports.append(f"from {CHAIN_IMPORT_PACKAGE} import {', '.join(helpers)}")
+        else:
+            for task_id, downstream in graph.get_internal_dependencies(dag_divider_value):
+                dependencies_in_dag_internal.append(object.uf.generate_dag_dependency_statement(
+                    graph.get_name(task_id), [graph.get_name(dep_id) for dep_id in downstream]))
+
         dependencies_in_dag_external = []
-        for task in tasks:
-            if len(dependencies[dag_divider_value][task]['internal']) > 0:
-                dependencies_in_dag_internal.append(object.uf.generate_dag_dependency_statement(task, dependencies[dag_divider_value][task]['internal']))
-
-            for dep in dependencies[dag_divider_value][task]['external']:
-                ext_task_uf = object.uf.get_task_by_attr(task_name, dep)
-                dependencies_in_dag_external.append({
-                    'task_name': task,
-                    'ext_dag': ext_task_uf.get_attribute(object.dag_divider),
-                    'ext_dep_task': dep,
-                    "marker_name": dep + "_marker_" + ''.join(random.choices('0123456789abcdef', k=4))
-                })
-
-        # Calculate external upstream dependencies where a task in the current dag depends on another dag's task
+        for task_id, dep_id in graph.get_external_dependencies(dag_divider_value):
+            dep = graph.get_name(dep_id)
+            dependencies_in_dag_external.append({
+                'task_name': graph.get_name(task_id),
+                'ext_dag': graph.get_divider(dep_id),
+                'ext_dep_task': dep,
+                "marker_name": dep + "_marker_" + ''.join(random.choices('0123456789abcdef', k=4))
+            })
+        # Dependencies on tasks converted elsewhere, see add_external_dependencies
+        for name, dep_dag, dep in getattr(object, "external_downstream", {}).get(dag_divider_value, []):
+            dependencies_in_dag_external.append({
+                'task_name': name,
+                'ext_dag': dep_dag,
+                'ext_dep_task': dep,
+                "marker_name": dep + "_marker_" + ''.join(random.choices('0123456789abcdef', k=4))
+            })
+
+        # External upstream dependencies, where a task in the current dag depends on another dag's task
         # Such a dependency will require a DAG Sensor
-        # The approach that is implemented is to iterate over all external dependencies in the dependencies dictionary and identify the tasks that
-        # are also in the current dag.
         upstream_dependencies = []
-
-        for _, divider_tasks in dependencies.items():
-            for task, int_ext_deps in divider_tasks.items():
-                ext_deps = int_ext_deps["external"]
-                for ext_dep in ext_deps:
-                    if ext_dep in tasks:
-                        ext_task_uf = object.uf.get_task_by_attr(task_name, task)
-                        upstream_dag_name = ext_task_uf.get_attribute(object.dag_divider)
-
-                        upstream_dependencies.append({
-                            "task_name": ext_dep,
-                            "task_in_upstream_dag": task,
-                            "upstream_dag_name": upstream_dag_name,
-                            "sensor_name": ext_dep + "_sensor_" + ''.join(random.choices('0123456789abcdef', k=4))
-                        })
+        for task_id, dep_id in graph.get_upstream_dependencies(dag_divider_value):
+            dep = graph.get_name(dep_id)
+            upstream_dependencies.append({
+                "task_name": dep,
+                "task_in_upstream_dag": graph.get_name(task_id),
+                "upstream_dag_name": graph.get_divider(task_id),
+                "sensor_name": dep + "_sensor_" + ''.join(random.choices('0123456789abcdef', k=4))
+            })
+        for dep, upstream_dag, name in getattr(object, "external_upstream", {}).get(dag_divider_value, []):
+            upstream_dependencies.append({
+                "task_name": dep,
+                "task_in_upstream_dag": name,
+                "upstream_dag_name": upstream_dag,
+                "sensor_name": dep + "_sensor_" + ''.join(random.choices('0123456789abcdef', k=4))
+            })
 
         # Extract app ID from LIBMEMSYM variable
         app_id = None
-        for task in object.uf.get_tasks():
-            if task.get_attribute(object.dag_divider) == dag_divider_value:
-                for variable in task.get_variables():
-                    if variable.get_attribute("NAME") == "%%LIBMEMSYM":
-                        libmemsym_value = variable.get_attribute("VALUE")
-                        # Extract app ID using regex
-                        match = re.search(r'%%G_LIBMEMSYM_PREFIX/%%G_ENV/([^/]+)/locals', libmemsym_value)
-                        if match:
-                            app_id = match.group(1)
-                            break
-                if app_id:
-                    break
+        for task in dag_tasks:
+            for variable in task.get_variables():
+                if variable.get_attribute("NAME") == "%%LIBMEMSYM":
+                    libmemsym_value = variable.get_attribute("VALUE")
+                    # Extract app ID using regex
+                    match = re.search(r'%%G_LIBMEMSYM_PREFIX/%%G_ENV/([^/]+)/locals', libmemsym_value)
+                    if match:
+                        app_id = match.group(1)
+                        break
+            if app_id:
+                break
 
         # Get DAG Template
         environment = Environment(
@@ -324,11 +748,10 @@ def generate_airflow_dags(object, task_name):
 
         # Collect all environment variables from tasks in this DAG
         all_env_vars = []
-        for task in object.uf.get_tasks():
-            if task.get_attribute(object.dag_divider) == dag_divider_value:
-                env_vars = task.get_env_vars()
-                if env_vars:
-                    all_env_vars.extend(env_vars)
+        for task in dag_tasks:
+            env_vars = task.get_env_vars()
+            if env_vars:
+                all_env_vars.extend(env_vars)
         
         # Remove duplicates while preserving order
         unique_env_vars = []
@@ -376,7 +799,7 @@ def set_baseline_imports(object):
 def get_baseline_imports(object):
     return object.baseline_imports
 
-def airflow_task_build(task, template):
+def airflow_task_build(task, template, mapped_values=None):
     # Load the Template Output Structure
     if template["structure"] is None:
         raise ValueError(
@@ -416,55 +839,27 @@ def airflow_task_build(task, template):
                 # No number found
                 values["queue"] = 'tol8'
 
+    if mapped_values is None:
+        mapped_values = apply_template_rules(template, [task])[0]
+
     # Process each Mapping
-    for mapping in template["mappings"]:
+    for mapping, mapped in zip(template["mappings"], mapped_values):
         # Lookup Mapping Target Key
         targetKey = mapping.get('target', None)
         if targetKey is None:
             # If Key is None, Skip
             continue
 
-        # Load Target Value or Default Value for TargetKey from task source
-        # field
-        targetValue = task.get_attribute(mapping.get("source", ""))
-        
-        # Store the original value before applying rules
-        originalValue = targetValue
-
-        # Apply Rules
-        # TODO: Handle Rules through additional function
-        rules = mapping.get("rules", [])
-        if rules is None:
-            rules = []
-
-        if len(rules) == 0:
-            print("No Rules applied to source during mapping")
+        # Source value before the rules of the mapping, and after them
+        originalValue, targetValue = mapped
 
         # Check if env_var_to_python rule is in the rules
+        rules = mapping.get("rules", None) or []
         has_env_var_rule = any(rule.get('rule') == 'env_var_to_python' for rule in rules)
         
         # Extract environment variables if the original value contains them and the env_var_to_python rule is applied
         if has_env_var_rule and originalValue and '%%' in originalValue:
-            # Find all environment variables in the string
-            found_env_vars = re.findall(r'%%([A-Za-z0-9_]+)', originalValue)
-            for var in found_env_vars:
-                # Convert to lowercase for Python variable naming convention
-                python_var = var.lower()
-                env_vars.append({
-                    'env_var': var,
-                    'python_var': python_var
-                })
-
-        for rule in rules:
-            print(f"Apply Rule {rule.get('rule')}")
-            r = Rule()
-            args = [rule.get("rule"), targetValue]
-            for arg in rule.get("args", []):
-                args.append(arg)
-            targetValue = r.run(args)
-
-            # Update the Current Object Value
-            task.set_attribute(mapping.get("source", ""), targetValue)
+            env_vars += get_variable_declarations(parse_variables(originalValue))
 
         if targetValue is None:
             # TODO - Log That we are going to use the defaults
@@ -483,17 +878,8 @@ def airflow_task_build(task, template):
             trigger_rule =  'one_success'
     values["trigger_rule"] = trigger_rule
     
-    # Store unique environment variables in the task
-    unique_env_vars = []
-    seen_vars = set()
-    for var in env_vars:
-        if var['env_var'] not in seen_vars:
-            unique_env_vars.append(var)
-            seen_vars.add(var['env_var'])
-    task.set_env_vars(unique_env_vars)
-
     # Special handling for control-m-job-to-airflow-bash template
-    if template["metadata"]["name"] == "control-m-job-to-airflow-bash":
+    if template["metadata"]["name"] == PARAMETER_STRING_TEMPLATE:
         # Extract variables from the task
         parameter_string = ""
         for variable in task.get_variables():
@@ -502,19 +888,56 @@ def airflow_task_build(task, template):
                 continue
                 
             if variable.get_attribute("NAME") and variable.get_attribute("VALUE"):
-                # Get the variable value and replace %% with Variable.get
-                value = variable.get_attribute("VALUE")
-                # Replace %%VAR with Variable.get('VAR')
-                value = re.sub(r'%%([A-Za-z0-9_]+)', r"{Variable.get('\1')}", value)
-                parameter_string += value + " "
+                # %%VAR references the DAG level variable read from the Airflow Variable VAR
+                nodes = parse_variables(variable.get_attribute("VALUE"))
+                env_vars += get_variable_declarations(nodes)
+                parameter_string += to_fstring(nodes) + " "
         
         # Add parameter_string to values
-        values["parameter_string"] = parameter_string.strip()
+        values[PARAMETER_STRING_KEY] = parameter_string.strip()
+
+    # Store unique environment variables in the task
+    unique_env_vars = []
+    seen_vars = set()
+    for var in env_vars:
+        if var['env_var'] not in seen_vars:
+            unique_env_vars.append(var)
+            seen_vars.add(var['env_var'])
+    task.set_env_vars(unique_env_vars)
+
+    # Priority weights are passed to every operator, after the template arguments
+    renderer = template["renderer"]
+    if task.get_priority_weight() is not None:
+        values["priority_weight"] = task.get_priority_weight()
+        values["weight_rule"] = PRIORITY_WEIGHT_RULE
+        if "priority_weight" not in renderer.keys:
+            if template["priority_renderer"] is None:
+                template["priority_renderer"] = StructureRenderer(
+                    add_priority_arguments(template["structure"]), template["metadata"]["name"])
+            renderer = template["priority_renderer"]
 
     # Construct Output Python Object Text
-    output = template["structure"].format(**values)
+    output = renderer.render(values)
     return output
 
+def add_priority_arguments(structure):
+    """Adds the priority_weight and weight_rule arguments to an operator call
+
+    The arguments are added before the last closing parenthesis of the
+    structure, on their own lines when it is on its own line."""
+    end = structure.rfind(")")
+    if end == -1:
+        return structure
+    line_start = structure.rfind("\n", 0, end) + 1
+    if structure[line_start:end].strip():
+        arguments = ', priority_weight={priority_weight}, weight_rule="{weight_rule}"'
+        return structure[:end] + arguments + structure[end:]
+    previous_line = structure[structure.rfind("\n", 0, max(line_start - 1, 0)) + 1:line_start]
+    indent = previous_line[:len(previous_line) - len(previous_line.lstrip())]
+    arguments = (f"{indent}priority_weight={{priority_weight}},\n"
+                 f"{indent}weight_rule=\"{{weight_rule}}\",\n")
+    return structure[:line_start] + arguments + structure[line_start:]
+
 def airflow_task_python_imports_build(task, template):
     # Load the Template Output Structure
     if template["target"] is None:
@@ -0,0 +1,299 @@
+# Copyright 2024 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from collections import deque
+
+# Edges considered by the transitive reduction, see reduce_dependencies
+OPTIMIZE_SCOPES = ["dag", "global"]
+
+# Airflow helpers used by compact dependency statements
+CHAIN_IMPORT_PACKAGE = "airflow.models.baseoperator"
+
+
+def strongly_connected_components(node_count, successors):
+    """Tarjan's algorithm, walked with an explicit stack
+
+    Args:
+        node_count (int): The nodes are 0 to node_count - 1.
+        successors (function): Returns the successors of a node.
+
+    Returns:
+        list: The components as lists of nodes, in reverse topological
+        order: a component only has edges to components listed before it.
+    """
+    index = [-1] * node_count
+    low = [0] * node_count
+    on_stack = [False] * node_count
+    stack = []
+    components = []
+    counter = 0
+    for root in range(node_count):
+        if index[root] != -1:
+            continue
+        index[root] = low[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack[root] = True
+        work = [(root, iter(successors(root)))]
+        while work:
+            node, children = work[-1]
+            for child in children:
+                if index[child] == -1:
+                    index[child] = low[child] = counter
+                    counter += 1
+                    stack.append(child)
+                    on_stack[child] = True
+                    work.append((child, iter(successors(child))))
+                    break
+                if on_stack[child] and index[child] < low[node]:
+                    low[node] = index[child]
+            else:
+                work.pop()
+                if work and low[node] < low[work[-1][0]]:
+                    low[work[-1][0]] = low[node]
+                if low[node] == index[node]:
+                    component = []
+                    while True:
+                        member = stack.pop()
+                        on_stack[member] = False
+                        component.append(member)
+                        if member == node:
+                            break
+                    components.append(component)
+    return components
+
+
+def find_cycle_path(graph, members):
+    """Returns a shortest cycle through the first task of a component"""
+    members = set(members)
+    start = min(members)
+    previous = {start: None}
+    queue = deque([start])
+    while queue:
+        task_id = queue.popleft()
+        for target in graph.get_downstream(task_id):
+            if target == start:
+                path = [start]
+                while task_id != start:
+                    path.append(task_id)
+                    task_id = previous[task_id]
+                return [start] + path[:0:-1] + [start]
+            if target in members and target not in previous:
+                previous[target] = task_id
+                queue.append(target)
+    return [start]
+
+
+def find_cycles(graph):
+    """Returns the dependency cycles of a DependencyGraph
+
+    Every strongly connected component of more than one task, or of a task
+    depending on itself, is a cycle that Airflow cannot schedule. A cycle
+    is returned as a path of task ids starting and ending with the same
+    task."""
+    components = strongly_connected_components(
+        graph.get_task_count(), graph.get_downstream)
+    cycles = []
+    for component in components:
+        if len(component) > 1 or component[0] in graph.get_downstream(component[0]):
+            cycles.append(find_cycle_path(graph, component))
+    return sorted(cycles)
+
+
+def format_cycle_report(graph, cycles):
+    """Formats the cycles of find_cycles as DAG.task paths, one per line"""
+    lines = [f"Found {len(cycles)} dependency cycle(s):"]
+    for number, cycle in enumerate(cycles, start=1):
+        path = " -> ".join(
+            f"{graph.get_divider(task_id)}.{graph.get_name(task_id)}" for task_id in cycle)
+        lines.append(f"  {number}. {path}")
+    return "\n".join(lines)
+
+
+def find_redundant_edges(edges):
+    """Returns the edges implied by other paths in a group of edges
+
+    The group is condensed into its strongly connected components, which
+    are then visited in reverse topological order. The tasks reachable
+    from a component are a bitset over the components of the group, and
+    its downstream components are visited closest first, so one already
+    reachable through a closer one is redundant. Edges within a component
+    are kept.
+
+    Args:
+        edges (list): (edge, task, downstream task) triples.
+
+    Returns:
+        set: The redundant edges.
+    """
+    nodes = {}
+    for _, source, target in edges:
+        nodes.setdefault(source, len(nodes))
+        nodes.setdefault(target, len(nodes))
+    successors = [[] for _ in nodes]
+    for _, source, target in edges:
+        successors[nodes[source]].append(nodes[target])
+    components = strongly_connected_components(len(nodes), successors.__getitem__)
+
+    # Components are numbered in reverse topological order
+    component_of = [0] * len(nodes)
+    for number, component in enumerate(components):
+        for node in component:
+            component_of[node] = number
+    component_edges = [{} for _ in components]
+    for edge, source, target in edges:
+        source = component_of[nodes[source]]
+        target = component_of[nodes[target]]
+        if source != target:
+            component_edges[source].setdefault(target, []).append(edge)
+
+    redundant = set()
+    reachable = [0] * len(components)
+    for number, targets in enumerate(component_edges):
+        reach = 0
+        for target in sorted(targets, reverse=True):
+            if reach >> target & 1:
+                redundant.update(targets[target])
+            else:
+                reach |= reachable[target] | 1 << target
+        reachable[number] = reach
+    return redundant
+
+
+def reduce_dependencies(graph, scope="dag"):
+    """Removes the dependencies of a DependencyGraph implied by others
+
+    With the dag scope only dependencies within a DAG are removed, when
+    another path within the same DAG implies them. With the global scope
+    paths through other DAGs are followed too, and dependencies across
+    DAGs are removed as well, saving their markers and sensors.
+
+    Every weakly connected group of tasks is reduced on its own, which
+    keeps the reachability bitsets as small as the groups.
+
+    Returns:
+        int: The number of dependencies removed.
+    """
+    if scope not in OPTIMIZE_SCOPES:
+        raise ValueError(
+            f"dagify: unknown optimization scope {scope}, expected one of {', '.join(OPTIMIZE_SCOPES)}")
+    edges = [(edge, source, target) for edge, source, target in graph.get_edges()
+             if scope == "global" or graph.is_internal(edge)]
+
+    # Union find of the weakly connected groups
+    parent = {}
+
+    def find(node):
+        parent.setdefault(node, node)
+        while parent[node] != node:
+            parent[node] = parent[parent[node]]
+            node = parent[node]
+        return node
+
+    for _, source, target in edges:
+        root_source, root_target = find(source), find(target)
+        if root_source != root_target:
+            parent[root_source] = root_target
+    groups = {}
+    for edge in edges:
+        groups.setdefault(find(edge[1]), []).append(edge)
+
+    redundant = set()
+    for group in groups.values():
+        redundant |= find_redundant_edges(group)
+    if redundant:
+        graph.remove_edges(redundant)
+    return len(redundant)
+
+
+def format_task_list(names):
+    return "[" + ", ".join(names) + "]"
+
+
+def compact_dependency_statements(graph, divider):
+    """Dependency statements of a DAG using chain and cross_downstream
+
+    Runs of tasks each releasing only the next one, which has no other
+    upstream task in the DAG, are written as one chain call. The remaining
+    tasks are grouped by their downstream tasks: a group of several tasks
+    with the same downstream task is written as one list >> task
+    statement, and with the same several downstream tasks as one
+    cross_downstream call.
+
+    Returns:
+        tuple: The statements and the names of the Airflow helpers they use.
+    """
+    downstream = {}
+    upstream = {}
+    for task_id, targets in graph.get_internal_dependencies(divider):
+        downstream[task_id] = list(dict.fromkeys(targets))
+        for target in downstream[task_id]:
+            upstream.setdefault(target, []).append(task_id)
+
+    def continues_chain(task_id):
+        targets = downstream.get(task_id, [])
+        return len(targets) == 1 and len(upstream[targets[0]]) == 1
+
+    statements = []
+    helpers = []
+    chained = set()
+    for task_id in downstream:
+        # A chain starts at a task that does not continue the chain of its
+        # upstream task, so tasks in a cycle never start one
+        if not continues_chain(task_id):
+            continue
+        if len(upstream.get(task_id, [])) == 1 and continues_chain(upstream[task_id][0]):
+            continue
+        links = [task_id]
+        while continues_chain(links[-1]):
+            links.append(downstream[links[-1]][0])
+        if len(links) < 3:
+            continue
+        chained.update(links[:-1])
+        statements.append("chain(" + ", ".join(graph.get_name(link) for link in links) + ")")
+        if "chain" not in helpers:
+            helpers.append("chain")
+
+    groups = {}
+    for task_id, targets in downstream.items():
+        if task_id not in chained:
+            groups.setdefault(tuple(targets), []).append(task_id)
+
+    for targets, task_ids in groups.items():
+        names = [graph.get_name(task_id) for task_id in task_ids]
+        target_names = [graph.get_name(target) for target in targets]
+        if len(task_ids) == 1:
+            statements.append(names[0] + " >> " + format_task_list(target_names))
+        elif len(targets) == 1:
+            statements.append(format_task_list(names) + " >> " + target_names[0])
+        else:
+            statements.append(
+                f"cross_downstream({format_task_list(names)}, {format_task_list(target_names)})")
+            if "cross_downstream" not in helpers:
+                helpers.append("cross_downstream")
+    return statements, sorted(helpers)
+
+
+def optimize_dependencies(graph, scope="dag"):
+    """Reports the cycles of a DependencyGraph and reduces its dependencies
+
+    Returns:
+        list: The cycles found, see find_cycles.
+    """
+    cycles = find_cycles(graph)
+    if cycles:
+        print(format_cycle_report(graph, cycles))
+    removed = reduce_dependencies(graph, scope)
+    print(f"Removed {removed} redundant dependencies of {removed + graph.get_edge_count()}")
+    return cycles
@@ -0,0 +1,149 @@
+# Copyright 2024 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import csv
+import mmap
+import os
+
+# Lookup files from this size on are memory-mapped rather than loaded
+LOOKUP_MMAP_SIZE = 256 * 2**20
+
+# Loaded lookup tables by (path, lookup column), shared by the process
+LOOKUP_TABLES = {}
+# Loaded lookup tables by the (path, lookup column) they were asked for,
+# whose file was checked since the last refresh_lookup_tables
+CHECKED_LOOKUP_TABLES = {}
+
+
+class LookupTable():
+    """A CSV lookup file indexed by one of its columns
+
+    The first row of the file names the columns. Loaded tables hold every
+    row in a hash index by the lookup column. Memory-mapped tables only
+    index the offset of each row and read a row from the mapping when it
+    is looked up, their rows must each fit on one line.
+
+    Args:
+        path (str): The CSV file.
+        key_column (str): The lookup column, the first column when None.
+        use_mmap (bool): Memory-map the file, by default from
+            LOOKUP_MMAP_SIZE bytes on.
+    """
+
+    def __init__(self, path, key_column=None, use_mmap=None):
+        self.path = path
+        stat = os.stat(path)
+        self.version = (stat.st_mtime_ns, stat.st_size)
+        if use_mmap is None:
+            use_mmap = stat.st_size >= LOOKUP_MMAP_SIZE
+        self.mapping = None
+        with open(path, mode="rb") as lookup_file:
+            if use_mmap and stat.st_size > 0:
+                self.mapping = mmap.mmap(lookup_file.fileno(), 0, access=mmap.ACCESS_READ)
+                self.index_offsets(key_column)
+            else:
+                self.index_rows(lookup_file.read().decode("utf-8-sig"), key_column)
+
+    def set_columns(self, header, key_column):
+        self.columns = {column: position for position, column in enumerate(header)}
+        if key_column is None:
+            key_column = header[0] if header else None
+        if key_column not in self.columns:
+            raise ValueError(f"dagify: lookup column {key_column} not in lookup file {self.path}")
+        self.key_position = self.columns[key_column]
+
+    def index_rows(self, text, key_column):
+        reader = csv.reader(text.splitlines())
+        self.set_columns(next(reader, []), key_column)
+        self.rows = {}
+        for row in reader:
+            if len(row) > self.key_position:
+                # The first row of a key wins
+                self.rows.setdefault(row[self.key_position], row)
+
+    def index_offsets(self, key_column):
+        mapping = self.mapping
+        self.set_columns(self.parse_line(mapping.readline(), first=True), key_column)
+        self.rows = {}
+        offset = mapping.tell()
+        for line in iter(mapping.readline, b""):
+            row = self.parse_line(line)
+            if len(row) > self.key_position:
+                self.rows.setdefault(row[self.key_position], offset)
+            offset = mapping.tell()
+
+    def parse_line(self, line, first=False):
+        text = line.decode("utf-8-sig" if first else "utf-8")
+        return next(csv.reader([text.rstrip("\r\n")]), [])
+
+    def get_row(self, key):
+        row = self.rows.get(key, None)
+        if self.mapping is None or row is None:
+            return row
+        end = self.mapping.find(b"\n", row)
+        return self.parse_line(self.mapping[row:end if end != -1 else len(self.mapping)])
+
+    def lookup(self, key, column, default=None):
+        """Returns the value of column in the row of key, default without one"""
+        position = self.columns.get(column, None)
+        if position is None:
+            raise ValueError(f"dagify: return column {column} not in lookup file {self.path}")
+        row = self.get_row(key)
+        if row is None or len(row) <= position:
+            return default
+        return row[position]
+
+    def close(self):
+        if self.mapping is not None:
+            self.mapping.close()
+            self.mapping = None
+
+
+def get_lookup_table(path, key_column=None, use_mmap=None):
+    """Returns the lookup table of a file, loaded once per process
+
+    The file is checked on the first lookup after refresh_lookup_tables,
+    and the table is loaded again when the modification time or size of
+    the file changed since it was loaded. Other lookups are hash lookups
+    only, without a system call."""
+    table = CHECKED_LOOKUP_TABLES.get((path, key_column), None)
+    if table is not None:
+        return table
+    key = (os.path.abspath(path), key_column)
+    table = LOOKUP_TABLES.get(key, None)
+    if table is not None:
+        stat = os.stat(path)
+        if table.version != (stat.st_mtime_ns, stat.st_size):
+            table.close()
+            table = None
+    if table is None:
+        table = LookupTable(path, key_column, use_mmap)
+        LOOKUP_TABLES[key] = table
+    CHECKED_LOOKUP_TABLES[(path, key_column)] = table
+    return table
+
+
+def refresh_lookup_tables():
+    """Checks the lookup files again on their next lookup
+
+    Called once per column of values a rule chain converts, so a file
+    changed between conversions is loaded again."""
+    CHECKED_LOOKUP_TABLES.clear()
+
+
+def clear_lookup_tables():
+    for table in LOOKUP_TABLES.values():
+        table.close()
+    LOOKUP_TABLES.clear()
+    CHECKED_LOOKUP_TABLES.clear()
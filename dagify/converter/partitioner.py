@@ -0,0 +1,267 @@
+# Copyright 2024 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Task attribute holding the DAG assigned by the partitioner
+PARTITION_ATTRIBUTE = "DAGIFY_PARTITION"
+# Refinement passes over all tasks, the last ones rarely move any task
+MAX_REFINEMENT_PASSES = 10
+
+
+def get_neighbours(graph):
+    """Returns the tasks linked to each task by a dependency, either way"""
+    neighbours = [[] for _ in range(graph.get_task_count())]
+    for _, source, target in graph.get_edges():
+        if source != target:
+            neighbours[source].append(target)
+            neighbours[target].append(source)
+    return neighbours
+
+
+def count_cross_dag_edges(graph, labels):
+    """Returns the dependencies between tasks of different DAGs
+
+    Each of them is rendered as an ExternalTaskMarker and an
+    ExternalTaskSensor. Tasks without a DAG are not rendered."""
+    count = 0
+    for _, source, target in graph.get_edges():
+        if labels[source] is not None and labels[target] is not None \
+                and labels[source] != labels[target]:
+            count += 1
+    return count
+
+
+def merge_components(neighbours, labels, sizes, max_dag_size):
+    """Moves every connected group of tasks into the DAG holding most of it
+
+    A group is only moved when the DAG stays within max_dag_size, which
+    saves all the dependencies the group had across DAGs at once."""
+    seen = [False] * len(labels)
+    for root in range(len(labels)):
+        if seen[root] or labels[root] is None:
+            continue
+        component = []
+        seen[root] = True
+        stack = [root]
+        while stack:
+            task_id = stack.pop()
+            component.append(task_id)
+            for neighbour in neighbours[task_id]:
+                if not seen[neighbour] and labels[neighbour] is not None:
+                    seen[neighbour] = True
+                    stack.append(neighbour)
+
+        counts = {}
+        for task_id in component:
+            counts[labels[task_id]] = counts.get(labels[task_id], 0) + 1
+        if len(counts) == 1:
+            continue
+        # The DAG holding most of the group, the first one seen on a tie
+        label = max(counts, key=counts.get)
+        if max_dag_size is not None and sizes[label] + len(component) - counts[label] > max_dag_size:
+            continue
+        for task_id in component:
+            sizes[labels[task_id]] -= 1
+            labels[task_id] = label
+        sizes[label] += len(component) - counts[label]
+
+
+def refine_labels(neighbours, labels, sizes, max_dag_size):
+    """Moves single tasks to the DAG most of their dependencies are in
+
+    A task only moves when that saves dependencies across DAGs, so every
+    move lowers their number and the refinement ends."""
+    for _ in range(MAX_REFINEMENT_PASSES):
+        moved = False
+        for task_id, label in enumerate(labels):
+            if label is None or not neighbours[task_id]:
+                continue
+            counts = {}
+            for neighbour in neighbours[task_id]:
+                if labels[neighbour] is not None:
+                    counts[labels[neighbour]] = counts.get(labels[neighbour], 0) + 1
+            best, best_count = label, counts.get(label, 0)
+            for candidate, count in counts.items():
+                if count > best_count and (max_dag_size is None or sizes[candidate] < max_dag_size):
+                    best, best_count = candidate, count
+            if best != label:
+                sizes[label] -= 1
+                sizes[best] += 1
+                labels[task_id] = best
+                moved = True
+        if not moved:
+            break
+
+
+def partition_tasks(graph, max_dag_size=None):
+    """Assigns tasks to DAGs with few dependencies between them
+
+    Tasks start in the DAG of their divider value. Connected groups of
+    tasks split over several DAGs are first moved whole into one of them,
+    then single tasks move to the DAG most of their dependencies are in.
+    Tasks only move to the DAGs of other divider values, and not into a
+    DAG that already has max_dag_size tasks. Tasks without a divider value
+    keep no DAG.
+
+    Args:
+        graph (DependencyGraph): The dependencies by divider value.
+        max_dag_size (int): The maximum number of tasks of a DAG, None
+            for the number of tasks of the largest divider value, so a
+            group linked across many divider values is not merged into a
+            single DAG larger than any of them.
+
+    Returns:
+        list: The DAG of each task.
+    """
+    labels = [graph.get_divider(task_id) for task_id in range(graph.get_task_count())]
+    sizes = {}
+    for label in labels:
+        if label is not None:
+            sizes[label] = sizes.get(label, 0) + 1
+    if max_dag_size is None and sizes:
+        max_dag_size = max(sizes.values())
+    neighbours = get_neighbours(graph)
+    merge_components(neighbours, labels, sizes, max_dag_size)
+    refine_labels(neighbours, labels, sizes, max_dag_size)
+    return labels
+
+
+def format_partition_report(graph, labels):
+    """Reports the sensors the partition saves and the tasks it moved"""
+    before = count_cross_dag_edges(graph, [graph.get_divider(task_id)
+                                           for task_id in range(graph.get_task_count())])
+    after = count_cross_dag_edges(graph, labels)
+    moves = [(task_id, graph.get_divider(task_id), label)
+             for task_id, label in enumerate(labels) if label != graph.get_divider(task_id)]
+    lines = [
+        f"Cross DAG dependencies: {before} before partitioning, {after} after",
+        f"Sensors saved: {before - after}",
+        f"Tasks moved: {len(moves)}",
+    ]
+    for task_id, source, target in moves:
+        lines.append(f"  {graph.get_name(task_id)}: {source} -> {target}")
+    return "\n".join(lines)
+
+
+def get_group_edges(graph, task_ids):
+    """Returns the downstream tasks of each task within a group of tasks"""
+    members = set(task_ids)
+    return {task_id: [target for target in graph.get_downstream(task_id)
+                      if target in members and target != task_id]
+            for task_id in task_ids}
+
+
+def split_by_layers(graph, task_ids, max_dag_size):
+    """Splits tasks into parts of consecutive topological layers
+
+    Layer n holds the tasks whose longest upstream path in the group has n
+    dependencies, so dependencies between parts only go from a part to a
+    later one. Tasks in a cycle come last, in task order."""
+    downstream = get_group_edges(graph, task_ids)
+    upstream_count = dict.fromkeys(task_ids, 0)
+    for targets in downstream.values():
+        for target in targets:
+            upstream_count[target] += 1
+    layer = [task_id for task_id in task_ids if upstream_count[task_id] == 0]
+    ordered = []
+    while layer:
+        ordered += layer
+        next_layer = []
+        for task_id in layer:
+            for target in downstream[task_id]:
+                upstream_count[target] -= 1
+                if upstream_count[target] == 0:
+                    next_layer.append(target)
+        layer = next_layer
+    placed = set(ordered)
+    ordered += [task_id for task_id in task_ids if task_id not in placed]
+    return [ordered[start:start + max_dag_size] for start in range(0, len(ordered), max_dag_size)]
+
+
+def split_by_components(graph, task_ids, max_dag_size):
+    """Splits tasks into parts of whole connected groups of tasks
+
+    Groups are placed in the first part with room for them, so only
+    groups larger than max_dag_size are cut, along their layers."""
+    downstream = get_group_edges(graph, task_ids)
+    neighbours = {task_id: list(targets) for task_id, targets in downstream.items()}
+    for task_id, targets in downstream.items():
+        for target in targets:
+            neighbours[target].append(task_id)
+
+    parts = []
+    seen = set()
+    for root in task_ids:
+        if root in seen:
+            continue
+        seen.add(root)
+        component = [root]
+        for task_id in component:
+            for neighbour in neighbours[task_id]:
+                if neighbour not in seen:
+                    seen.add(neighbour)
+                    component.append(neighbour)
+        component.sort()
+        if len(component) > max_dag_size:
+            parts += split_by_layers(graph, component, max_dag_size)
+            continue
+        for part in parts:
+            if len(part) + len(component) <= max_dag_size:
+                part += component
+                break
+        else:
+            parts.append(component)
+    return [sorted(part) for part in parts]
+
+
+# Ways of splitting a DAG larger than the maximum DAG size
+SPLIT_MODES = {
+    "components": split_by_components,
+    "layers": split_by_layers,
+}
+
+
+def split_dags(graph, labels, max_dag_size, mode="components"):
+    """Splits the DAGs with more than max_dag_size tasks
+
+    The parts of a DAG are named after it with a _1, _2, ... suffix.
+
+    Args:
+        graph (DependencyGraph): The dependencies of the tasks.
+        labels (list): The DAG of each task.
+        max_dag_size (int): The maximum number of tasks of a DAG.
+        mode (str): How DAGs are split, one of SPLIT_MODES.
+
+    Returns:
+        list: The DAG of each task after splitting.
+    """
+    if mode not in SPLIT_MODES:
+        raise ValueError(
+            f"dagify: unknown split mode {mode}, expected one of {', '.join(SPLIT_MODES)}")
+    if max_dag_size < 1:
+        raise ValueError("dagify: the maximum DAG size must be at least 1")
+    groups = {}
+    for task_id, label in enumerate(labels):
+        if label is not None:
+            groups.setdefault(label, []).append(task_id)
+
+    labels = list(labels)
+    for label, task_ids in groups.items():
+        if len(task_ids) <= max_dag_size:
+            continue
+        parts = SPLIT_MODES[mode](graph, task_ids, max_dag_size)
+        print(f"Split DAG {label} of {len(task_ids)} tasks into {len(parts)} DAGs")
+        for number, part in enumerate(parts, start=1):
+            for task_id in part:
+                labels[task_id] = f"{label}_{number}"
+    return labels
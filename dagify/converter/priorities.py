@@ -0,0 +1,130 @@
+# Copyright 2024 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from .graph_optimizer import strongly_connected_components
+
+# Weights are computed over all DAGs, Airflow must use them as they are
+PRIORITY_WEIGHT_RULE = "absolute"
+
+
+def get_weak_groups(task_count, edges):
+    """Returns the weakly connected groups of tasks, in task order"""
+    parent = list(range(task_count))
+
+    def find(node):
+        while parent[node] != node:
+            parent[node] = parent[parent[node]]
+            node = parent[node]
+        return node
+
+    for source, target in edges:
+        root_source, root_target = find(source), find(target)
+        if root_source != root_target:
+            parent[max(root_source, root_target)] = min(root_source, root_target)
+    groups = {}
+    for task_id in range(task_count):
+        groups.setdefault(find(task_id), []).append(task_id)
+    return list(groups.values())
+
+
+def compute_group_paths(task_ids, edges):
+    """Returns the critical path length and downstream count of a group
+
+    The group is condensed into its strongly connected components, which
+    are visited in reverse topological order. The tasks of a cycle are all
+    downstream of each other and count once on a path.
+
+    Args:
+        task_ids (list): The tasks of a weakly connected group.
+        edges (list): The (task, downstream task) pairs of the group.
+
+    Returns:
+        tuple: The dicts of the tasks on the longest path starting at each
+        task, itself included, and of the number of tasks downstream of it.
+    """
+    local = {task_id: index for index, task_id in enumerate(task_ids)}
+    successors = [[] for _ in task_ids]
+    for source, target in edges:
+        successors[local[source]].append(local[target])
+    components = strongly_connected_components(len(task_ids), successors.__getitem__)
+
+    component_of = [0] * len(task_ids)
+    for number, component in enumerate(components):
+        for node in component:
+            component_of[node] = number
+
+    depth = [0] * len(components)
+    reachable = [0] * len(components)
+    for number, component in enumerate(components):
+        # Components only reach components listed before them
+        members = 0
+        longest = 0
+        reach = 0
+        for node in component:
+            members |= 1 << node
+            for successor in successors[node]:
+                target = component_of[successor]
+                if target != number:
+                    longest = max(longest, depth[target])
+                    reach |= reachable[target]
+        depth[number] = longest + len(component)
+        reachable[number] = reach | members
+
+    path_lengths = {}
+    downstream_counts = {}
+    for node, task_id in enumerate(task_ids):
+        number = component_of[node]
+        path_lengths[task_id] = depth[number]
+        downstream_counts[task_id] = reachable[number].bit_count() - 1
+    return path_lengths, downstream_counts
+
+
+def compute_priority_weights(task_count, edges, critical=()):
+    """Computes an Airflow priority_weight for every task
+
+    The weight of a task is the number of tasks on the longest dependency
+    path starting at it plus the number of tasks downstream of it, within
+    and across DAGs, so the tasks holding up the most work run first when
+    workers are saturated. Critical tasks are boosted above all others.
+
+    Args:
+        task_count (int): The tasks are 0 to task_count - 1.
+        edges (list): The (task, downstream task) dependencies.
+        critical (iterable): The critical tasks.
+
+    Returns:
+        list: The weight of each task.
+    """
+    edges = list(edges)
+    group_edges = {}
+    groups = get_weak_groups(task_count, edges)
+    group_of = {}
+    for number, group in enumerate(groups):
+        for task_id in group:
+            group_of[task_id] = number
+    for source, target in edges:
+        group_edges.setdefault(group_of[source], []).append((source, target))
+
+    weights = [1] * task_count
+    for number, group in enumerate(groups):
+        if number not in group_edges:
+            continue
+        path_lengths, downstream_counts = compute_group_paths(group, group_edges[number])
+        for task_id in group:
+            weights[task_id] = path_lengths[task_id] + downstream_counts[task_id]
+
+    boost = max(weights, default=0)
+    for task_id in critical:
+        weights[task_id] += boost
+    return weights
@@ -0,0 +1,130 @@
+# Copyright 2024 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import hashlib
+import json
+import os
+import sqlite3
+import time
+
+from .snapshot_cache import DEFAULT_CACHE_SIZE
+
+# Bump whenever rendering a task changes, so older renders are no longer found
+RENDER_VERSION = 2
+
+RENDER_CACHE_FILE = "renders.db"
+# Renders may take this fraction of the cache size, snapshots the rest
+RENDER_CACHE_SHARE = 0.25
+
+# Keys of a template added when it is compiled, not part of its content
+COMPILED_TEMPLATE_KEYS = ["rule_chains", "renderer", "priority_renderer", "content_hash", "cacheable"]
+
+
+def get_template_hash(template):
+    """Returns the hash of the content of a template as loaded"""
+    content = {key: value for key, value in template.items() if key not in COMPILED_TEMPLATE_KEYS}
+    digest = hashlib.sha256(f"{RENDER_VERSION}:".encode())
+    digest.update(json.dumps(content, sort_keys=True, default=str).encode())
+    return digest.hexdigest()
+
+
+def get_render_key(template_hash, inputs):
+    """Returns the cache key of a task from everything its render reads"""
+    digest = hashlib.sha256(template_hash.encode())
+    digest.update(json.dumps(inputs, default=str).encode())
+    return digest.hexdigest()
+
+
+class RenderCache():
+    """On-disk cache of rendered tasks, shared by runs and sources
+
+    A render is keyed by the hash of the template content and of the task
+    values the template reads, so a job converted before with the same
+    template and values, from any source, is not rendered again. Renders
+    are JSON in a SQLite file of the cache directory. Once they take more
+    than RENDER_CACHE_SHARE of max_size, the least recently used renders
+    are removed when the cache is closed.
+
+    Args:
+        cache_dir (str): The cache directory.
+        max_size (int): The maximum size of the cache directory in bytes,
+            None for DEFAULT_CACHE_SIZE.
+    """
+
+    def __init__(self, cache_dir, max_size=None):
+        os.makedirs(cache_dir, exist_ok=True)
+        self.max_size = int((DEFAULT_CACHE_SIZE if max_size is None else max_size) * RENDER_CACHE_SHARE)
+        self.stored = False
+        # Shards converting in parallel may share the cache directory
+        self.connection = sqlite3.connect(os.path.join(cache_dir, RENDER_CACHE_FILE), timeout=60)
+        columns = [row[1] for row in self.connection.execute("PRAGMA table_info(renders)")]
+        if columns and "last_used" not in columns:
+            # Renders of older versions have no use times, they are dropped
+            with self.connection:
+                self.connection.execute("DROP TABLE IF EXISTS renders")
+            columns = []
+        if not columns:
+            # Pages of removed renders are given back to the file system
+            self.connection.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            self.connection.execute("VACUUM")
+        with self.connection:
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS renders (key TEXT PRIMARY KEY, render TEXT NOT NULL, "
+                "size INTEGER NOT NULL, last_used INTEGER NOT NULL)")
+
+    def get_many(self, keys):
+        """Returns the cached renders of keys, by key, marking them used"""
+        renders = {}
+        keys = list(dict.fromkeys(keys))
+        now = time.time_ns()
+        with self.connection:
+            # Within the default limit of SQLite query parameters
+            for start in range(0, len(keys), 500):
+                batch = keys[start:start + 500]
+                placeholders = ", ".join("?" * len(batch))
+                rows = self.connection.execute(
+                    f"SELECT key, render FROM renders WHERE key IN ({placeholders})", batch)
+                for key, render in rows:
+                    renders[key] = json.loads(render)
+                self.connection.execute(
+                    f"UPDATE renders SET last_used = ? WHERE key IN ({placeholders})", [now] + batch)
+        return renders
+
+    def store_many(self, renders):
+        """Stores renders given as (key, render) pairs"""
+        now = time.time_ns()
+        rows = []
+        for key, render in renders:
+            content = json.dumps(render)
+            rows.append((key, content, len(key) + len(content), now))
+        with self.connection:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO renders (key, render, size, last_used) VALUES (?, ?, ?, ?)",
+                rows)
+        self.stored = self.stored or bool(rows)
+
+    def trim(self):
+        """Removes the least recently used renders over max_size"""
+        with self.connection:
+            # Renders are kept from the most recently used until max_size
+            self.connection.execute(
+                "DELETE FROM renders WHERE key IN (SELECT key FROM ("
+                "SELECT key, SUM(size) OVER (ORDER BY last_used DESC, key) AS kept FROM renders"
+                ") WHERE kept > ?)", [self.max_size])
+        self.connection.execute("PRAGMA incremental_vacuum")
+
+    def close(self):
+        if self.stored:
+            self.trim()
+        self.connection.close()
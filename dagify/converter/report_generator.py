@@ -15,22 +15,27 @@
 
 import xml.etree.ElementTree as ET
 import yaml
+import pyarrow.compute as pc
 from .utils import (
     is_directory,
     generate_report_utils,
     get_jobtypes_andcount,
     generate_json,
     format_table_json,
-    get_job_info,
     get_tasktype_statistics,
     get_job_statistics,
-    filter_jobs_by_parameter_in_child,
     calculate_cron_schedule,
+    get_divider_value,
     directory_exists,
     create_directory,
     generate_table,
     load_source
 )
+from .uf_columnar import (
+    uf_to_tables,
+    get_task_types,
+    get_jobs_with_attribute,
+)
 
 
 class Report():
@@ -42,7 +47,13 @@ class Report():
         output_path=None,
         templates_path="./templates",
         config_file="./config.yaml",
-        dag_divider="PARENT_FOLDER"
+        dag_divider="PARENT_FOLDER",
+        streaming=False,
+        parser_backend=None,
+        parse_workers=None,
+        cache_dir=None,
+        cache_size=None,
+        uf=None
     ):
         self.config_file = config_file
         self.config = {}
@@ -52,7 +63,16 @@ class Report():
         self.output_path = f"{output_path}/{source_xml_name}"
         self.templates_path = templates_path
         self.dag_divider = dag_divider
-        self.uf = load_source(self.source_path, "controlm")
+        self.parser_backend = parser_backend
+        if uf is None:
+            uf = load_source(self.source_path, "controlm",
+                             streaming=streaming, backend=self.parser_backend,
+                             workers=parse_workers, cache_dir=cache_dir,
+                             cache_size=cache_size)
+        self.uf = uf
+        # Statistics are queried from the columnar tables of the parsed
+        # source rather than by scanning the XML again
+        self.tables = uf_to_tables(self.uf)
         # Run the Proccess
         self.write_report()
 
@@ -67,7 +87,7 @@ class Report():
         universal_format = self.uf
         tasks = universal_format.get_tasks()
         for tIdx, task in enumerate(tasks):
-            current_divider = task.get_attribute(dag_divider)
+            current_divider = get_divider_value(task, dag_divider)
 
             if not prev_divider:
                 prev_divider = current_divider
@@ -109,7 +129,8 @@ class Report():
         # Get the Job_types from source xml
         if is_directory(self.source_path) is False:
             source_file_info.append(self.source_path.split("/")[-1])
-            job_types_source, job_types_source_count = get_jobtypes_andcount(self.source_path)
+            job_types_source = list(set(get_task_types(self.tables["tasks"])))
+            job_types_source_count = len(job_types_source)
 
         # Get templates INFO
         with open(self.config_file, encoding="utf-8") as stream:
@@ -125,7 +146,13 @@ class Report():
             templates_to_validate.append(self.config["config"]["mappings"][idx]["template_name"])
 
         # Get job related info
-        job_info = get_job_info(self.source_path)
+        tasks = self.tables["tasks"]
+        job_info = [
+            {'job_name': job_name, 'task_type': task_type}
+            for job_name, task_type in zip(
+                tasks.column("JOBNAME").to_pylist(),
+                pc.utf8_lower(tasks.column("TASKTYPE")).to_pylist())
+        ]
         unconverted_job_name, converted_job_name, \
             non_converted_job_percent, converted_job_percent, conv_job_count = \
             get_job_statistics(job_info, config_job_types)
@@ -134,7 +161,7 @@ class Report():
             non_converted_percentage = \
             get_tasktype_statistics(job_types_source, config_job_types)
         # Get Manual Intervention Job_Name Info
-        manual_job_names = filter_jobs_by_parameter_in_child(self.source_path, "CONFIRM")
+        manual_job_names = get_jobs_with_attribute(tasks, "CONFIRM")
 
         # Table Info
         statistics = [
@@ -13,159 +13,186 @@
 # limitations under the License.
 
 import codecs
-import pandas as pd
 import random
 import uuid
-import re
+from .lookup_tables import get_lookup_table, refresh_lookup_tables
+from .control_m_variables import parse_variables, to_fstring
+
+
+# Characters replaced by an underscore to make a Python variable name
+PYTHON_VARIABLE_UNSAFE_CHARS = "- .:;$!,#"
+PYTHON_VARIABLE_SAFE_TABLE = str.maketrans(dict.fromkeys(PYTHON_VARIABLE_UNSAFE_CHARS, "_"))
+ESCAPE_QUOTES_TABLE = str.maketrans({char: f"\\{char}" for char in "'\"`"})
+
+
+def lowercase(value):
+    return value.lower()
+
+
+def replace(value, old, new):
+    return value.replace(old, new)
+
+
+def python_variable_safe(value):
+    return value.lower().translate(PYTHON_VARIABLE_SAFE_TABLE)
+
+
+def prefix(value, *args):
+    if len(args) < 1:
+        print("Error: Not Enough Variables passed to Prefix Rule")
+        return
+    return args[0] + "_" + value
+
+
+def suffix(value, *args):
+    if len(args) < 1:
+        print("Error: Not Enough Variables passed to Suffix Rule")
+        return
+    return value + "_" + args[0]
+
+
+def escape_quotes(value):
+    if value is None:
+        return value
+    return value.translate(ESCAPE_QUOTES_TABLE)
+
+
+def make_unique(value):
+    random.seed()
+    rnd = random.randint(0, 1000000)
+    uid = str(uuid.uuid5(uuid.NAMESPACE_DNS, str(value + str(rnd))))[:5]
+    return suffix(value, uid)
+
+
+def obfuscate(value):
+    return codecs.encode(value, 'rot13')
+
+
+def lookup_replace(value, *args):
+    # args[0] is Lookup File Path
+    # args[1] is Lookup Return Column
+    # args[2] is the optional Lookup Column, the first column by default
+    if len(args) < 2:
+        print("Error: Not Enough Variables passed to Lookup Replace Rule")
+        return value
+    if value is None:
+        return value
+
+    # Values without a row in the lookup file are kept
+    table = get_lookup_table(args[0], args[2] if len(args) > 2 else None)
+    return table.lookup(value, args[1], default=value)
+
+
+def env_var_to_python(value):
+    """
+    Converts Control-M environment variables (prefixed with %%) to Python variables.
+    
+    The value is parsed by parse_variables and written as the body of an
+    f-string referencing the Python variables, which are defined at the
+    DAG level from the Airflow Variables of the same names.
+    
+    Example: 
+    Input: %%G_COMMON_SCRIPT_HOME/fw-SFTX.sh
+    Output: f"{g_common_script_home}/fw-SFTX.sh"
+    
+    A period after a variable concatenates it with what follows:
+    Input: %%G_APP_HOME_PREFIX.omg/vpop/resources/job
+    Output: f"{g_app_home_prefix}omg/vpop/resources/job"
+    """
+    # If input is None, return None
+    if value is None:
+        return None
+        
+    # Check if the string contains any environment variables
+    if '%%' not in value:
+        return value
+
+    return to_fstring(parse_variables(value))
+
+
+# Rules by the name templates use in their mappings
+RULES = {
+    "lowercase": lowercase,
+    "replace": replace,
+    "python_variable_safe": python_variable_safe,
+    "prefix": prefix,
+    "suffix": suffix,
+    "escape_quotes": escape_quotes,
+    "make_unique": make_unique,
+    "obfuscate": obfuscate,
+    "lookup_replace": lookup_replace,
+    "env_var_to_python": env_var_to_python,
+}
+
+# Rules returning another value on every call for the same input
+NONDETERMINISTIC_RULES = {"make_unique"}
+# Rules reading files besides their input, their results are not cached
+# across runs
+EXTERNAL_RULES = {"lookup_replace"}
+
+
+def compile_rule(name, args=()):
+    """Returns a rule of a template mapping as a callable of the value
+
+    An unknown rule is reported once and returns the value unchanged."""
+    function = RULES.get(name, None)
+    if function is None:
+        print(f"Error: Rule not found: {name}")
+        return lambda value: value
+    args = tuple(args)
+    if not args:
+        return function
+    return lambda value: function(value, *args)
+
+
+class RuleChain():
+    """The rules of a template mapping, compiled once the template loads
+
+    Args:
+        rules (list): The rules of the mapping, dicts with a rule name and
+            optional args.
+    """
+
+    def __init__(self, rules=None):
+        rules = rules or []
+        self.names = [rule.get("rule") for rule in rules]
+        self.steps = [compile_rule(rule.get("rule"), rule.get("args", None) or ())
+                      for rule in rules]
+        self.deterministic = not NONDETERMINISTIC_RULES.intersection(self.names)
+        # Rules reading files, which may change between conversions
+        self.external = bool(EXTERNAL_RULES.intersection(self.names))
+        self.cacheable = self.deterministic and not self.external
+
+    def __len__(self):
+        return len(self.steps)
+
+    def __call__(self, value):
+        for step in self.steps:
+            value = step(value)
+        return value
+
+    def apply_column(self, values):
+        """Applies the chain to a column of values, one per task
+
+        Deterministic chains run once per distinct value of the column.
+        Lookup files are checked for changes once per column."""
+        if self.external:
+            refresh_lookup_tables()
+        if not self.steps:
+            return list(values)
+        if not self.deterministic:
+            return [self(value) for value in values]
+        results = {}
+        column = []
+        for value in values:
+            if value not in results:
+                results[value] = self(value)
+            column.append(results[value])
+        return column
 
 
 class Rule:
-    def __init__(self):
-        pass
+    """Runs a single rule by name, see RULES"""
 
     def run(self, args):
-        method_name = "rule_{0}".format(args[0])
-        if self.__can_execute(method_name):
-            func = getattr(self, method_name)
-            return func(args[1:])
-        else:
-            print(f"Error: Rule not found: {args[0]}")
-            return args[1]
-
-    def __can_execute(self, method_name):
-        return method_name in dir(self)
-
-    # Define Rule - LowerCase
-    def rule_lowercase(self, vals):
-        print(f"Info: Rule Lowercase: {vals[0]}")
-        vals[0] = vals[0].lower()
-        return vals
-
-    # Define Rule - Replace Characters
-    def rule_replace(self, vals):
-        print(f"Info: Rule Replace Characters: {vals[1]} -> {vals[2]} output = {vals[0]}")
-        vals[0] = vals[0].replace(vals[1], vals[2])
-        return vals
-
-    # Define Rule - Python Variable Safe
-    def rule_python_variable_safe(self, vals):
-        print(f"Info: Rule Python Variable Safe: {vals[0]}")
-        vals = self.rule_lowercase(vals)
-        for char in ['-', ' ', '.', ':', ';', "$", "!", ",", "#"]:
-            if char in vals[0]:
-                vals = self.rule_replace([vals[0], char, "_"])
-        return vals[0]
-
-    def rule_prefix(self, vals):
-        if len(vals) < 2:
-            print("Error: Not Enough Variables passed to Prefix Rule")
-            return
-        print(f"Info: Rule Prefix: {vals[0]}")
-        vals[0] = vals[1] + "_" + vals[0]
-        return vals[0]
-
-    def rule_suffix(self, vals):
-        if len(vals) < 2:
-            print("Error: Not Enough Variables passed to Suffix Rule")
-            return
-
-        print(f"Info: Rule Suffix: {vals[0]}")
-        vals[0] = vals[0] + "_" + vals[1]
-        return vals[0]
-
-    def rule_escape_quotes(self, vals):
-        print(f"Info: Rule Escape Quotes: {vals[0]}")
-        # Check if vals[0] is None before trying to iterate over it
-        if vals[0] is None:
-            return vals[0]
-        for char in ["'", '"', "`"]:
-            if char in vals[0]:
-                vals = self.rule_replace([vals[0], char, f"\\{char}"])
-        return vals[0]
-
-    def rule_make_unique(self, vals):
-        print(f"Info: Rule Make Unique: {vals[0]}")
-        random.seed()
-        rnd = random.randint(0, 1000000)
-        uid = str(uuid.uuid5(uuid.NAMESPACE_DNS, str(vals[0] + str(rnd))))[:5]
-        vals[0] = self.rule_suffix([vals[0], uid])
-        return vals[0]
-
-    def rule_obfuscate(self, vals):
-        print(f"Info: Rule Obfuscate: {vals[0]}")
-        vals[0] = codecs.encode(vals[0], 'rot13')
-        return vals[0]
-
-    def rule_lookup_replace(self, vals):
-        print(f"Info: Rule Lookup Replace: {vals[0]}")
-        # vals[0] is Lookup Value
-        # vals[1] is Lookup File Path
-        # vals[2] is Lookup Return Column
-
-        if len(vals) < 3:
-            print("Error: Not Enough Variables passed to Lookup Replace Rule")
-            return vals[0]
-
-        df = pd.read_csv(vals[1], header=0)
-        print(df)
-
-        return vals[0]
-        
-    def rule_env_var_to_python(self, vals):
-        """
-        Converts Control-M environment variables (prefixed with %%) to Python variables.
-        
-        This rule extracts environment variables from the input string and formats them
-        to be defined at the DAG level using os.environ.get(), then referenced in the
-        operator commands using Python variables.
-        
-        Example: 
-        Input: %%G_COMMON_SCRIPT_HOME/fw-SFTX.sh
-        Output: f"{g_common_script_home}/fw-SFTX.sh"
-        
-        Special handling for variables ending with _prefix:
-        Input: %%G_APP_HOME_PREFIX.omg/vpop/resources/job
-        Output: f"{g_app_home_prefix}omg/vpop/resources/job"
-        
-        The environment variable 'G_COMMON_SCRIPT_HOME' will be extracted and defined
-        at the DAG level as:
-        g_common_script_home = os.environ.get('G_COMMON_SCRIPT_HOME', '')
-        """
-        print(f"Info: Rule Environment Variable to Python: {vals[0]}")
-        
-        # If input is None, return None
-        if vals[0] is None:
-            return None
-            
-        # Check if the string contains any environment variables
-        if '%%' not in vals[0]:
-            return vals[0]
-            
-        # Find all environment variables in the string
-        env_vars = re.findall(r'%%([A-Za-z0-9_]+)', vals[0])
-        
-        if not env_vars:
-            return vals[0]
-        
-        # Create a dictionary to store environment variable names and their Python variable names
-        python_vars = {}
-        for var in env_vars:
-            # Convert to lowercase for Python variable naming convention
-            python_var = var.lower()
-            python_vars[var] = python_var
-            
-        # Replace each environment variable with its Python variable reference
-        result = vals[0]
-        for var, python_var in python_vars.items():
-            # Check if this is a _prefix variable followed by a period
-            if var.endswith('_PREFIX'):
-                # Replace the variable and remove the period that follows it
-                pattern = f'%%{var}\\.'
-                replacement = f"{{{python_var}}}"
-                result = re.sub(pattern, replacement, result)
-            else:
-                # Standard replacement for non-prefix variables
-                result = result.replace(f'%%{var}', f"{{{python_var}}}")
-            
-        # Return the result as an f-string
-        return f"{result}"
+        return compile_rule(args[0], args[2:])(args[1])
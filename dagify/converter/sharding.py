@@ -0,0 +1,170 @@
+# Copyright 2024 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import os
+from .utils import get_divider_value
+
+# Bumped when the layout of the shard plan changes
+SHARD_PLAN_VERSION = 2
+
+
+def assign_shards(divider_sizes, shard_count):
+    """Assigns dividers to shards with balanced numbers of tasks
+
+    The largest dividers are placed first, each in the shard with the
+    fewest tasks so far. A divider is never split, so all its DAG is
+    converted by one shard.
+
+    Args:
+        divider_sizes (dict): The number of tasks of each divider value.
+        shard_count (int): The number of shards.
+
+    Returns:
+        list: The divider values of each shard, in their order in
+        divider_sizes.
+    """
+    if shard_count < 1:
+        raise ValueError("dagify: the number of shards must be at least 1")
+    order = {divider: number for number, divider in enumerate(divider_sizes)}
+    loads = [0] * shard_count
+    shard_of = {}
+    for divider in sorted(divider_sizes, key=lambda divider: (-divider_sizes[divider], order[divider])):
+        shard = loads.index(min(loads))
+        shard_of[divider] = shard
+        loads[shard] += divider_sizes[divider]
+    shards = [[] for _ in range(shard_count)]
+    for divider in divider_sizes:
+        shards[shard_of[divider]].append(divider)
+    return shards
+
+
+def build_shard_plan(uf, source, dag_divider, task_name, task_ids, shard_count):
+    """Extracts the global plan of a sharded conversion
+
+    The plan holds the source name, task id, divider value and condition
+    names of every task, in source order, and the divider values each
+    shard converts. Tasks without a divider value are not in any shard,
+    they are not converted to a DAG.
+
+    Args:
+        uf (UF): The parsed source.
+        source (str): The source name, the output directory of the DAGs.
+        dag_divider (str): The task attribute dividing tasks into DAGs.
+        task_name (str): The task attribute naming tasks.
+        task_ids (list): The names of the tasks once converted, in task
+            order, which the other shards refer to them by.
+        shard_count (int): The number of shards.
+
+    Returns:
+        dict: The plan, see write_shard_plan.
+    """
+    tasks = []
+    divider_sizes = {}
+    for task, task_id in zip(uf.get_tasks(), task_ids):
+        divider = get_divider_value(task, dag_divider)
+        if divider is not None:
+            divider_sizes[divider] = divider_sizes.get(divider, 0) + 1
+        tasks.append([
+            task.get_attribute(task_name),
+            task_id,
+            divider,
+            [in_cond.get_attribute("NAME") for in_cond in task.get_in_conditions()],
+            [out_cond.get_attribute("NAME") for out_cond in task.get_out_conditions()
+             if out_cond.get_attribute("SIGN") == "+"],
+        ])
+    return {
+        "version": SHARD_PLAN_VERSION,
+        "source": source,
+        "dag_divider": dag_divider,
+        "task_name": task_name,
+        "shards": assign_shards(divider_sizes, shard_count),
+        "tasks": tasks,
+    }
+
+
+def write_shard_plan(plan, plan_path):
+    """Writes a shard plan as JSON, replacing the file at once"""
+    directory = os.path.dirname(plan_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(plan_path + ".tmp", mode="w", encoding="utf-8") as plan_file:
+        json.dump(plan, plan_file, separators=(",", ":"))
+    os.replace(plan_path + ".tmp", plan_path)
+
+
+def load_shard_plan(plan_path):
+    with open(plan_path, encoding="utf-8") as plan_file:
+        plan = json.load(plan_file)
+    if plan.get("version") != SHARD_PLAN_VERSION:
+        raise ValueError(
+            f"dagify: the shard plan {plan_path} was written by another version, plan the shards again")
+    return plan
+
+
+def get_shard_positions(plan, shard, uf):
+    """Returns the positions of the tasks of a shard in the parsed source
+
+    The source must be the one the plan was built from, with the same
+    tasks in the same order."""
+    if not 0 <= shard < len(plan["shards"]):
+        raise ValueError(
+            f"dagify: shard {shard} not in the plan, expected 0 to {len(plan['shards']) - 1}")
+    tasks = uf.get_tasks()
+    if len(tasks) != len(plan["tasks"]) or any(
+            task.get_attribute(plan["task_name"]) != planned[0]
+            for task, planned in zip(tasks, plan["tasks"])):
+        raise ValueError(
+            f"dagify: the shard plan does not match the source {plan['source']}, plan the shards again")
+    dividers = set(plan["shards"][shard])
+    return [position for position, planned in enumerate(plan["tasks"]) if planned[2] in dividers]
+
+
+def get_shard_dependencies(plan, shard):
+    """Returns the dependencies between the tasks of a shard and the others
+
+    Conditions are matched over all the tasks of the plan, as within one
+    conversion, and the dependencies with one task in the shard and the
+    other in another shard are kept. Tasks of the shard are given by
+    their position in the source, as they are named once converted by the
+    shard, and tasks of other shards by their DAG and task id.
+
+    Returns:
+        tuple: The (position, upstream dag_id, upstream task id) rows of
+        the tasks of the shard waiting on other shards, and the (position,
+        downstream dag_id, downstream task id) rows of the tasks of other
+        shards waiting on the shard.
+    """
+    dividers = set(plan["shards"][shard])
+    consumers = {}
+    for position, (_, _, divider, in_conds, _) in enumerate(plan["tasks"]):
+        if divider is not None:
+            for condition in in_conds:
+                consumers.setdefault(condition, []).append(position)
+
+    upstream = {}
+    downstream = {}
+    for position, (_, task_id, divider, _, out_conds) in enumerate(plan["tasks"]):
+        if divider is None:
+            continue
+        for condition in out_conds:
+            for dep_position in consumers.get(condition, ()):
+                _, dep_task_id, dep_divider, _, _ = plan["tasks"][dep_position]
+                if (divider in dividers) == (dep_divider in dividers):
+                    continue
+                if dep_divider in dividers:
+                    upstream.setdefault((dep_position, divider, task_id), None)
+                else:
+                    downstream.setdefault((position, dep_divider, dep_task_id), None)
+    return list(upstream), list(downstream)
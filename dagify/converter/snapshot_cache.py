@@ -0,0 +1,140 @@
+# Copyright 2024 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import gc
+import hashlib
+import io
+import os
+import pickle
+import tempfile
+import zlib
+import xml.etree.ElementTree as ET
+from lxml import etree
+
+from .xml_scanner import SourceDocument, get_source_document
+
+# Bump whenever parsing into the Universal Format changes, so snapshots
+# written by older versions of the parser are no longer found
+PARSER_VERSION = 3
+
+SNAPSHOT_SUFFIX = ".ufs"
+DEFAULT_CACHE_SIZE = 512 * 2**20
+
+
+class _SnapshotPickler(pickle.Pickler):
+    """Pickles a UF without its source document and XML elements
+
+    The document is bound again to the source file being loaded, which has
+    the same content but not necessarily the same path."""
+
+    def persistent_id(self, obj):
+        if isinstance(obj, SourceDocument):
+            return "document"
+        if ET.iselement(obj) or etree.iselement(obj):
+            return "element"
+        return None
+
+
+class _SnapshotUnpickler(pickle.Unpickler):
+
+    def __init__(self, file, document):
+        super().__init__(file)
+        self.document = document
+
+    def persistent_load(self, pid):
+        if pid == "document":
+            return self.document
+        if pid == "element":
+            return None
+        raise pickle.UnpicklingError(f"dagify: unknown snapshot reference {pid}")
+
+
+class SnapshotCache():
+    """Content addressed on-disk cache of parsed Universal Format snapshots
+
+    Snapshots are keyed by the hash of the source file content, the source
+    tool and PARSER_VERSION, so an edited source file or a new parser never
+    finds a stale snapshot. Snapshots are zlib compressed pickles and the
+    least recently used ones are evicted once the cache exceeds max_size."""
+
+    def __init__(self, cache_dir, max_size=None):
+        self.cache_dir = cache_dir
+        self.max_size = DEFAULT_CACHE_SIZE if max_size is None else max_size
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def get_key(self, source_path, tool):
+        digest = hashlib.sha256()
+        digest.update(f"{tool}:{PARSER_VERSION}:".encode())
+        with open(source_path, "rb") as f:
+            for block in iter(lambda: f.read(2**20), b""):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def get_path(self, key):
+        return os.path.join(self.cache_dir, key + SNAPSHOT_SUFFIX)
+
+    def load(self, source_path, tool, key=None):
+        """Returns the cached UF of source_path, None when not cached"""
+        path = self.get_path(key or self.get_key(source_path, tool))
+        try:
+            with open(path, "rb") as f:
+                content = zlib.decompress(f.read())
+        except FileNotFoundError:
+            return None
+        except zlib.error:
+            print(f"dagify: ignoring corrupt snapshot {path}")
+            return None
+        # Loading a snapshot makes it the most recently used
+        os.utime(path)
+        document = get_source_document(source_path)
+        # Unpickling only allocates, cycle collections would find nothing
+        gc_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            return _SnapshotUnpickler(io.BytesIO(content), document).load()
+        finally:
+            if gc_enabled:
+                gc.enable()
+
+    def store(self, source_path, tool, uf, key=None):
+        """Writes the snapshot of uf, parsed from source_path"""
+        path = self.get_path(key or self.get_key(source_path, tool))
+        content = io.BytesIO()
+        _SnapshotPickler(content, protocol=pickle.HIGHEST_PROTOCOL).dump(uf)
+        # Written to a temporary file first so readers never see a partial snapshot
+        fd, temp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(zlib.compress(content.getbuffer(), 1))
+        os.replace(temp_path, path)
+        self.evict()
+
+    def evict(self):
+        """Removes the least recently used snapshots over max_size
+
+        Other files of the cache directory, such as the render cache,
+        count towards max_size but are not removed."""
+        snapshots = []
+        total = 0
+        for entry in os.scandir(self.cache_dir):
+            if not entry.is_file():
+                continue
+            stat = entry.stat()
+            total += stat.st_size
+            if entry.name.endswith(SNAPSHOT_SUFFIX):
+                snapshots.append((stat.st_mtime_ns, stat.st_size, entry.path))
+        for _, size, path in sorted(snapshots):
+            if total <= self.max_size:
+                break
+            os.remove(path)
+            total -= size
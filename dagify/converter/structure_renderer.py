@@ -0,0 +1,82 @@
+# Copyright 2024 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from string import Formatter
+
+
+def convert_field(value, conversion):
+    if conversion == "r":
+        return repr(value)
+    if conversion == "a":
+        return ascii(value)
+    return str(value)
+
+
+class StructureRenderer():
+    """The structure of a template, parsed once into literals and keys
+
+    A structure uses the str.format syntax with named placeholders. Its
+    literal text, braces unescaped, and its placeholders are split when
+    the template loads, and a task is rendered by joining the literals
+    with its values. Values are inserted as they are, braces in them are
+    not read as placeholders.
+
+    Args:
+        structure (str): The structure of the template.
+        template_name (str): The template name, for errors.
+    """
+
+    def __init__(self, structure, template_name):
+        self.template_name = template_name
+        self.literals = []
+        self.fields = []
+        try:
+            parsed = list(Formatter().parse(structure))
+        except ValueError as exc:
+            raise ValueError(f"dagify: invalid structure in template {template_name}: {exc}")
+        literal = ""
+        for text, key, format_spec, conversion in parsed:
+            literal += text
+            if key is None:
+                continue
+            if not key.isidentifier() or "{" in (format_spec or ""):
+                raise ValueError(
+                    f"dagify: unsupported placeholder {{{key}}} in the structure of template {template_name}")
+            self.literals.append(literal)
+            self.fields.append((key, conversion, format_spec))
+            literal = ""
+        self.literals.append(literal)
+        self.keys = list(dict.fromkeys(key for key, _, _ in self.fields))
+
+    def check_keys(self, keys):
+        """Raises a ValueError for placeholders not in keys"""
+        missing = [key for key in self.keys if key not in keys]
+        if missing:
+            raise ValueError(
+                f"dagify: no mapping for {', '.join(missing)} in the structure of template {self.template_name}")
+
+    def render(self, values):
+        parts = [self.literals[0]]
+        for (key, conversion, format_spec), literal in zip(self.fields, self.literals[1:]):
+            if key not in values:
+                raise ValueError(f"dagify: no value for {key} in template {self.template_name}")
+            value = values[key]
+            if conversion is None and not format_spec:
+                parts.append(value if isinstance(value, str) else str(value))
+            else:
+                if conversion is not None:
+                    value = convert_field(value, conversion)
+                parts.append(format(value, format_spec))
+            parts.append(literal)
+        return "".join(parts)
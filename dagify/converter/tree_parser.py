@@ -0,0 +1,187 @@
+# Copyright 2024 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from collections import Counter
+
+from .uf import (
+    UF,
+    UFTask,
+    UFTaskVariable,
+    UFTaskInCondition,
+    UFTaskOutCondition,
+    UFTaskShout,
+    UFTaskQuantitativeResource,
+    UFTaskControlResource,
+    UFTaskOnAction,
+    UFTaskDoAction,
+)
+
+
+def walk_through(node, parent):
+    """Handler for container elements, their children belong to parent"""
+    return parent
+
+
+def add_child(cls, adder):
+    """Returns a handler building a cls object added to parent with adder
+
+    The handler returns None, and the element is counted as unsupported,
+    when the parent cannot hold such an object."""
+    def handler(node, parent):
+        add = getattr(parent, adder, None)
+        if add is None:
+            return None
+        child = cls()
+        child.from_xml(node)
+        add(child)
+        return child
+    return handler
+
+
+_add_do_action = add_child(UFTaskDoAction, "add_do_action")
+
+
+def add_do_action(node, parent):
+    do_action = _add_do_action(node, parent)
+    if do_action is not None:
+        do_action.set_action_type(node.tag)
+    return do_action
+
+
+# DO statements of a Control-M ON element
+CONTROLM_DO_TAGS = [
+    "DOACTION", "DOAUTOEDIT", "DOCOND", "DOCTBRULE", "DOFORCEJOB", "DOMAIL",
+    "DOOUTPUT", "DOREMEDY", "DORULE", "DOSHOUT", "DOSYSOUT",
+]
+
+CONTROLM_HANDLERS = {
+    "FOLDER": walk_through,
+    "SMART_FOLDER": walk_through,
+    "JOB": add_child(UFTask, "add_task"),
+    "VARIABLE": add_child(UFTaskVariable, "add_variable"),
+    "INCOND": add_child(UFTaskInCondition, "add_in_condition"),
+    "OUTCOND": add_child(UFTaskOutCondition, "add_out_condition"),
+    "SHOUT": add_child(UFTaskShout, "add_shout"),
+    "QUANTITATIVE": add_child(UFTaskQuantitativeResource, "add_quantitative_resource"),
+    "CONTROL": add_child(UFTaskControlResource, "add_control_resource"),
+    "ON": add_child(UFTaskOnAction, "add_on_action"),
+}
+CONTROLM_HANDLERS.update({tag: add_do_action for tag in CONTROLM_DO_TAGS})
+
+
+class AutomicWorkflow():
+    """Parent of the tasks of an Automic JOBP workflow
+
+    Tasks are added to the Universal Format and indexed by their workflow
+    and Lnr, the number their pre conditions reference them by."""
+
+    def __init__(self, uf, name):
+        self.uf = uf
+        self.name = name
+
+    def add_task(self, ufTask):
+        position = len(self.uf.get_tasks())
+        self.uf.add_task(ufTask)
+        self.uf.index_task("automic_lnr", (self.name, ufTask.get_attribute("Lnr")), position)
+        self.uf.index_task("automic_workflow", position, self.name)
+
+
+def add_automic_workflow(node, parent):
+    # Only the outer JOBP element of a workflow is named
+    name = node.get("name")
+    if name is None:
+        return parent
+    if isinstance(parent, AutomicWorkflow):
+        parent = parent.uf
+    if not isinstance(parent, UF):
+        return None
+    return AutomicWorkflow(parent, name)
+
+
+AUTOMIC_HANDLERS = {
+    "JOBP": add_automic_workflow,
+    "task": add_child(UFTask, "add_task"),
+    "pre": add_child(UFTaskInCondition, "add_in_condition"),
+}
+
+# Per source tool, the handler of each tag and the handler of other tags
+TREE_HANDLERS = {
+    "controlm": (CONTROLM_HANDLERS, None),
+    "automic": (AUTOMIC_HANDLERS, walk_through),
+}
+
+
+class TreeParser():
+    """Iterative parser of a source tree into the Universal Format
+
+    Elements are dispatched on their tag to the handlers of the source
+    tool. A handler builds the object of its element and returns the
+    object the children of the element are added to, or None when the
+    element is not supported. The tree is walked with an explicit stack so
+    deeply nested folders do not hit the recursion limit, and unsupported
+    elements are counted by tag in unknown_tags instead of walked."""
+
+    def __init__(self, handlers, default=None):
+        self.handlers = handlers
+        self.default = default
+        self.unknown_tags = Counter()
+
+    def parse(self, root_node, root_parent):
+        handlers = self.handlers
+        default = self.default
+        unknown_tags = self.unknown_tags
+        stack = [(iter(root_node), root_parent)]
+        while stack:
+            children, parent = stack[-1]
+            for node in children:
+                handler = handlers.get(node.tag, default)
+                child = handler(node, parent) if handler is not None else None
+                if child is None:
+                    unknown_tags[node.tag] += 1
+                elif len(node):
+                    stack.append((iter(node), child))
+                    break
+            else:
+                stack.pop()
+        return root_parent
+
+    def is_container(self, tag):
+        """Whether the children of tag elements belong to its parent"""
+        return self.handlers.get(tag, self.default) is walk_through
+
+
+def report_unknown_tags(unknown_tags):
+    """Prints one line per unsupported tag with its number of elements"""
+    for tag, count in sorted(unknown_tags.items()):
+        print(f"Node: {tag} is not currently supported ({count} elements).")
+
+
+def register_tree_handlers(tool, handlers, default=None):
+    """Registers the tag handlers of a source tool
+
+    Args:
+        tool (str): The source tool name.
+        handlers (dict): The handler of each tag, see TreeParser.
+        default (function): The handler of tags without their own handler,
+            None to count them as unsupported.
+    """
+    TREE_HANDLERS[tool] = (handlers, default)
+
+
+def get_tree_parser(tool):
+    """Returns a new TreeParser for a source tool"""
+    if tool not in TREE_HANDLERS:
+        raise ValueError(f"dagify: unsupported source tool {tool}")
+    handlers, default = TREE_HANDLERS[tool]
+    return TreeParser(handlers, default)
@@ -12,51 +12,371 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import sys
+from bisect import bisect_left
+import textwrap
 from typing import TypeVar, Type
 import xml.etree.ElementTree
 from lxml import etree
 
+class _Absent():
+    """Marks a slot the object has no value for"""
+    __slots__ = ()
+
+    # Pickled by reference so identity checks hold after unpickling
+    def __reduce__(self):
+        return "_ABSENT"
+
+
+_ABSENT = _Absent()
+
+
+class _ReadOnly(dict):
+    """Changes of a read-only object, which stay empty"""
+    __slots__ = ()
+
+    def __setitem__(self, key, value):
+        raise ValueError(
+            "dagify: the parsed Universal Format is read-only, convert an overlay of it")
+
+    def __reduce__(self):
+        return "_READ_ONLY"
+
+
+_READ_ONLY = _ReadOnly()
+
+# Suffix under which original attribute values used to be exposed
+ORIGINAL_SUFFIX = "_ORIGINAL"
+
+# Attribute values up to this length are interned. Short values such as
+# DATACENTER, RUN_AS, NODEID or dates repeat across most jobs of an export
+INTERN_MAX_LENGTH = 64
+
+
+class AttributeTable():
+    """Slot table shared by all objects of a UF class
+
+    Maps attribute names to positions in the per object value tuples so
+    every name is stored once per class rather than once per object."""
+    __slots__ = ("names", "index", "_remap_names", "_remap_slots")
+
+    def __init__(self):
+        self.names = []
+        self.index = {}
+        self._remap_names = None
+        self._remap_slots = None
+
+    def slot(self, name):
+        index = self.index.get(name, None)
+        if index is None:
+            name = sys.intern(name)
+            index = len(self.names)
+            self.names.append(name)
+            self.index[name] = index
+        return index
+
+    def remap(self, names):
+        """Returns the slots of the names of another table, in order
+
+        None is returned when the slots are the same as the positions in
+        names, which is the case in a fresh process. The result is kept for
+        the last names seen, as unpickled objects share the same list."""
+        if self._remap_names is not names:
+            slots = [self.slot(name) for name in names]
+            self._remap_names = names
+            self._remap_slots = None if slots == list(range(len(slots))) else slots
+        return self._remap_slots
+
 
 class UF():
     T = TypeVar('T', bound='UF')
+    __slots__ = ("tasks", "task_indexes", "raw_xml_element", "source_document",
+                 "source_start", "source_end", "_values", "_changed",
+                 "_attribute_indexes", "_task_positions", "_index_owners")
+    _attribute_table = AttributeTable()
+    # Slots holding conversion state, which overlays do not share
+    _conversion_slots = ("tasks", "_attribute_indexes", "_task_positions", "_index_owners")
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._attribute_table = AttributeTable()
 
     def __init__(self):
+        self.init_attributes()
         self.tasks = []
+        # Task positions by key, built by the source parsers
+        self.task_indexes = {}
+
+    def init_attributes(self):
+        # Original values by slot, shared table in _attribute_table
+        self._values = ()
+        # Values changed since parsing, created on first change
+        self._changed = None
+        self.raw_xml_element = None
+        self.source_document = None
 
     def from_xml(self: Type[T], node: xml.etree.ElementTree.Element):
-        for key, value in node.attrib.items():
-            # Set Original Attribute Version
-            self.set_attribute_original(key, value)
-            # Set Current Attribute Version
-            self.set_attribute(key, value)
+        self.from_attributes(node.attrib)
         self.set_raw_xml_element(node)
 
+    def from_attributes(self, attributes):
+        table = self._attribute_table
+        index_of = table.index
+        intern = sys.intern
+        values = [_ABSENT] * len(table.names)
+        for key, value in attributes.items():
+            index = index_of.get(key, None)
+            if index is None:
+                index = table.slot(key)
+                values.append(_ABSENT)
+            if len(value) <= INTERN_MAX_LENGTH:
+                value = intern(value)
+            values[index] = value
+        self._values = tuple(values)
+
     # Handle Attributes
     def set_attribute_original(self, key, value):
-        self.set_attribute(key + "_ORIGINAL", value)
+        owners = getattr(self, "_index_owners", None)
+        previous = self.get_attribute(key) if owners else None
+        index = self._attribute_table.slot(key)
+        values = list(self._values)
+        if index >= len(values):
+            values.extend([_ABSENT] * (index + 1 - len(values)))
+        values[index] = value
+        self._values = tuple(values)
+        if owners:
+            self.update_index_owners(owners, key, previous)
 
     def set_attribute(self, key, value):
-        setattr(self, key, value)
+        # Only values that differ from the original are shadowed, read-only
+        # objects raise on the shadow assignment
+        owners = getattr(self, "_index_owners", None)
+        previous = self.get_attribute(key) if owners else None
+        original = self.get_attribute_original(key)
+        if value == original and key in self._attribute_table.index:
+            if self._changed is not None:
+                self._changed.pop(key, None)
+        else:
+            if self._changed is None:
+                self._changed = {}
+            self._changed[key] = value
+        if owners:
+            self.update_index_owners(owners, key, previous)
+
+    def update_index_owners(self, owners, key, previous):
+        # Moves the object to the entry of its new value in the attribute
+        # indexes of the Universal Formats holding it
+        value = self.get_attribute(key)
+        if value != previous:
+            for owner in owners:
+                owner.reindex_task(self, key, previous, value)
 
     def get_attribute_original(self, attribute: str) -> str:
-        return self.get_attribute(attribute + "_ORIGINAL")
+        index = self._attribute_table.index.get(attribute, None)
+        if index is not None and index < len(self._values):
+            value = self._values[index]
+            if value is not _ABSENT:
+                return value
+        return None
 
     def get_attribute(self, attribute: str) -> str:
-        return getattr(self, attribute, None)
+        if self._changed is not None and attribute in self._changed:
+            return self._changed[attribute]
+        index = self._attribute_table.index.get(attribute, None)
+        if index is not None and index < len(self._values):
+            value = self._values[index]
+            if value is not _ABSENT:
+                return value
+        elif isinstance(attribute, str) and attribute.endswith(ORIGINAL_SUFFIX):
+            return self.get_attribute_original(attribute[:-len(ORIGINAL_SUFFIX)])
+        return None
+
+    def get_attributes_original(self):
+        names = self._attribute_table.names
+        return {names[index]: value for index, value in enumerate(self._values)
+                if value is not _ABSENT}
+
+    def get_attributes(self):
+        attributes = self.get_attributes_original()
+        if self._changed is not None:
+            attributes.update(self._changed)
+        return attributes
+
+    # Slot positions are specific to the process that parsed the object, so
+    # values are pickled with the names of the table, which pickle shares
+    # between all objects of the class
+    def __getstate__(self):
+        state = {}
+        for cls in type(self).__mro__:
+            for name in getattr(cls, "__slots__", ()):
+                if name not in ("_values", "_changed", "_attribute_indexes",
+                                "_task_positions", "_index_owners") \
+                        and hasattr(self, name):
+                    state[name] = getattr(self, name)
+        return self._attribute_table.names, self._values, self._changed, state
+
+    def __setstate__(self, state):
+        names, values, changed, state = state
+        self.init_attributes()
+        for name, value in state.items():
+            setattr(self, name, value)
+        table = self._attribute_table
+        slots = table.remap(names)
+        if slots is not None:
+            remapped = [_ABSENT] * len(table.names)
+            for index, value in zip(slots, values):
+                remapped[index] = value
+            values = tuple(remapped)
+        self._values = values
+        self._changed = changed
+
+    # Read-only Universal Format and conversion overlays
+    def freeze(self):
+        # Parsed objects become read-only, conversions run on overlays
+        for parsed in self.get_parsed_objects():
+            if parsed._changed:
+                for key, value in parsed._changed.items():
+                    parsed.set_attribute_original(key, value)
+            parsed._changed = _READ_ONLY
+        return self
+
+    def is_read_only(self):
+        return self._changed is _READ_ONLY
+
+    def check_writable(self):
+        if self._changed is _READ_ONLY:
+            raise ValueError(
+                "dagify: the parsed Universal Format is read-only, convert an overlay of it")
+
+    def copy_for_overlay(self):
+        # Shares the attribute values and parsed children, which are not
+        # modified by conversions, and starts without conversion state
+        overlay = object.__new__(type(self))
+        for cls in type(self).__mro__:
+            for name in getattr(cls, "__slots__", ()):
+                if name not in self._conversion_slots and hasattr(self, name):
+                    setattr(overlay, name, getattr(self, name))
+        overlay._changed = None
+        return overlay
+
+    def create_overlay(self, positions=None):
+        """Returns a writable view of the Universal Format for one conversion
+
+        The overlay holds the attribute changes and outputs of a conversion
+        while sharing everything parsed with this Universal Format, so one
+        parse can be converted with several configuration profiles.
+
+        positions restricts the overlay to the tasks at those positions, in
+        the given order, for example the tasks of one shard."""
+        overlay = self.copy_for_overlay()
+        if positions is None:
+            overlay.tasks = [task.create_overlay() for task in self.tasks]
+            return overlay
+        overlay.tasks = [self.tasks[position].create_overlay() for position in positions]
+        # The task indexes hold positions in the whole Universal Format
+        overlay.task_indexes = {}
+        return overlay
+
+    def get_parsed_objects(self):
+        parsed = [self]
+        for task in self.tasks:
+            parsed += task.get_parsed_objects()
+        return parsed
 
     # add task to the universal format
     def add_task(self, ufTask):
         self.tasks.append(ufTask)
 
+    # Task positions are shared with overlays, their tasks are in the same order
+    def index_task(self, index_name, key, position):
+        self.task_indexes.setdefault(index_name, {}).setdefault(key, []).append(position)
+
+    def get_task_index(self, index_name):
+        return self.task_indexes.get(index_name, None)
+
     # get tasks from the universal format
     def get_tasks(self):
         return self.tasks
 
+    def get_attribute_index(self, attribute):
+        """Returns the tasks by value of an attribute, in task order
+
+        The index of an attribute is built on first use and extended with
+        the tasks added since. Indexed tasks know the Universal Formats
+        indexing them, and an attribute assignment moves the task to the
+        entry of its new value, so the index is maintained rather than
+        rebuilt and never returns tasks by a value they no longer have.
+        """
+        try:
+            indexes = self._attribute_indexes
+        except AttributeError:
+            indexes = self._attribute_indexes = {}
+            self._task_positions = {}
+        positions = self._task_positions
+        for position in range(len(positions), len(self.tasks)):
+            task = self.tasks[position]
+            positions[task] = position
+            owners = getattr(task, "_index_owners", None)
+            if owners is None:
+                owners = task._index_owners = []
+            owners.append(self)
+        entry = indexes.get(attribute, None)
+        if entry is None:
+            entry = indexes[attribute] = [0, {}, []]
+        count, index, values = entry
+        for task in self.tasks[count:]:
+            value = task.get_attribute(attribute)
+            tasks = index.get(value, None)
+            if tasks is None:
+                tasks = index[value] = []
+                if values is not None:
+                    # Added tasks come after all others, so do their values
+                    values.append(value)
+            tasks.append(task)
+        entry[0] = len(self.tasks)
+        return index
+
+    def reindex_task(self, task, attribute, previous, value):
+        """Moves a task from the entry of its previous value of an attribute
+
+        Entries are kept in task order, the task is found and inserted by
+        bisection on the task positions."""
+        entry = self._attribute_indexes.get(attribute, None)
+        position = self._task_positions[task]
+        if entry is None or position >= entry[0]:
+            # Indexed by its current value when the index is next extended
+            return
+        index = entry[1]
+        get_position = self._task_positions.__getitem__
+        tasks = index[previous]
+        removed = bisect_left(tasks, position, key=get_position)
+        del tasks[removed]
+        if not tasks:
+            del index[previous]
+        tasks = index.get(value, None)
+        if tasks is None:
+            tasks = index[value] = []
+        inserted = bisect_left(tasks, position, key=get_position)
+        tasks.insert(inserted, task)
+        # The order of the values follows the first task of each entry
+        if removed == 0 or inserted == 0:
+            entry[2] = None
+
+    def get_tasks_by_attr(self, attribute, value):
+        return self.get_attribute_index(attribute).get(value, [])
+
     def get_task_by_attr(self, attribute, value):
-        for task in self.tasks:
-            if task.get_attribute(attribute) == value:
-                return task
-        return None
+        tasks = self.get_tasks_by_attr(attribute, value)
+        return tasks[0] if tasks else None
+
+    def get_attribute_values(self, attribute):
+        """Returns the distinct values of an attribute, in task order"""
+        index = self.get_attribute_index(attribute)
+        entry = self._attribute_indexes[attribute]
+        if entry[2] is None:
+            # Sorted again after tasks moved to or from the front of an entry
+            entry[2] = sorted(index, key=lambda value: self._task_positions[index[value][0]])
+        return list(entry[2])
 
     # get total count of tasks from the universal format
     def get_task_count(self):
@@ -68,100 +388,105 @@ class UF():
     def get_raw_xml(self):
         return self.raw_xml_element
 
+    def set_source_span(self, document, start, end):
+        # Byte span of the element in the parsed source document, used in
+        # place of the element once the parsed tree has been released
+        self.source_document = document
+        self.source_start = start
+        self.source_end = end
+
+    def get_source_xml(self):
+        if self.source_document is None:
+            return None
+        return self.source_document.read(self.source_start, self.source_end)
+
+    def match_dependencies_automic(self):
+        """Yields the (task, dependent task) positions of pre conditions
+
+        A pre condition names its predecessor by Lnr, which is unique within
+        the workflow of the task only. The parser indexes the tasks by
+        (workflow, Lnr), so every pre condition is resolved with a single
+        lookup in its own workflow. Pairs are yielded by dependent task,
+        once per pre condition."""
+        tasks = self.get_tasks()
+        lnr_index = self.get_task_index("automic_lnr")
+        workflows = self.get_task_index("automic_workflow") or {}
+        if lnr_index is None:
+            # Not built by the parser, Lnr are matched across all tasks
+            lnr_index = {}
+            for position, task in enumerate(tasks):
+                lnr_index.setdefault((None, task.get_attribute("Lnr")), []).append(position)
+
+        for position, task_dep in enumerate(tasks):
+            workflow = workflows.get(position, [None])[0]
+            for in_cond in task_dep.get_in_conditions():
+                key = (workflow, in_cond.get_attribute("PreLnr"))
+                for producer in lnr_index.get(key, ()):
+                    if producer != position:
+                        yield producer, position
+
     def calculate_dag_dependencies_automic(self):
-        # remove later
-        # lnr_task = {}
-        # for task in self.get_tasks():
-        #     lnr_task[task.get_attribute("Object")] = task.get_attribute("Lnr")
+        """Links every task to the tasks listing it as predecessor
 
-        for task in self.get_tasks():
-            for task_dep in self.get_tasks():
-                if not task == task_dep:
-                    for inconds in task_dep.get_in_conditions():
-                        if inconds.get_attribute("PreLnr") == task.get_attribute("Lnr"):
-                           task.add_dependent_task(task.get_dag_name(), task_dep.get_attribute("Object"))
-        return
+        A dependency matched by several pre conditions is only added once.
 
+        Returns:
+            list: The (task, dependent task) edges, in the order added.
+        """
+        tasks = self.get_tasks()
+        dependents = {}
+        for producer, position in self.match_dependencies_automic():
+            dependents.setdefault(producer, {}).setdefault(position, None)
+
+        edges = []
+        for producer in sorted(dependents):
+            task = tasks[producer]
+            for position in dependents[producer]:
+                task_dep = tasks[position]
+                task.add_dependent_task(task.get_dag_name(), task_dep.get_attribute("Object"))
+                edges.append((task, task_dep))
+        return edges
+
+    def match_dependencies_controlm(self):
+        """Yields the (task, dependent task) positions of matching conditions
+
+        The tasks are indexed by the names of their in conditions in one
+        pass, so each out condition is resolved with a single lookup and the
+        whole matching is linear in the number of tasks and conditions.
+        Pairs are yielded by task, once per matching condition."""
+        tasks = self.get_tasks()
+        consumers = {}
+        for position, obj in enumerate(tasks):
+            for in_cond in obj.get_in_conditions():
+                consumers.setdefault(in_cond.get_attribute("NAME"), []).append(position)
+
+        for position, task in enumerate(tasks):
+            for out_cond in task.get_out_conditions():
+                if out_cond.get_attribute("SIGN") != "+":
+                    continue
+                for consumer in consumers.get(out_cond.get_attribute("NAME"), ()):
+                    yield position, consumer
 
     def calculate_dag_dependencies_controlm(self):
-        for task in self.get_tasks():
-            out_conds = task.get_out_conditions()
-            out_conds_positive = []
-            for out_cond in out_conds:
-                if out_cond.get_attribute("SIGN") == "+":
-                    out_conds_positive.append(out_cond)
-            if len(out_conds_positive) > 0:
-
-                for poutcon in out_conds_positive:
-                    for obj in self.get_tasks():
-                        for in_conds in obj.get_in_conditions():
-                            if in_conds.get_attribute("NAME") == poutcon.get_attribute("NAME"):
-                                task.add_dependent_task(obj.get_dag_name(), obj.get_attribute("JOBNAME"))
-        return
+        """Links every task to the tasks waiting on its positive out conditions
 
-    def generate_dag_dependencies_by_divider(self, dag_divider, task_name):
-        """
-        the following structure for dependencies will be created by this method:
-        dependencies = {
-            div1: {
-                task1: {
-                    internal: [task2, task3, ...],
-                    external: [task4, task5, ...]
-                task2: {
-                    internal: [task1, task3, ...],
-                    external: [task5, task6, ...]
-                }
-            },
-            div2: {
-                task1: {
-                    internal: [task2, task3, ...],
-                    external: [task4, task5, ...]
-                task2: {
-                    internal: [task1, task3, ...],
-                    external: [task5, task6, ...]
-                }
-            }
-        }
-        """
+        A dependency matched by several conditions is only added once.
 
-        dependencies = {}
-
-        dag_divider_values = set(task.get_attribute(dag_divider) for task in self.get_tasks())
-
-        for tIdx, dag_divider_value in enumerate(dag_divider_values):
-            dependencies.setdefault(dag_divider_value, {})
-            deps = []
-            tasks = []
-            for tIdx, task in enumerate(self.get_tasks()):
-                current_task_name = task.get_attribute(task_name)
-                dependencies.setdefault(dag_divider_value, {}).setdefault(current_task_name, {"internal": [], "external": []})
-
-                # Capture the airflow tasks for each dag divider
-                if task.get_attribute(dag_divider) == dag_divider_value:
-                    tasks.append(task.get_airflow_task_output())
-
-                    deps = task.get_dependent_tasks()
-                    if len(deps) > 0:
-                        # ======== Internal DAG Dependencies ======== #
-                        for dep in deps:
-                            if dep.get("dag_name") == dag_divider_value:
-                                print(dep.get("task_name"))
-                                current_deps_for_divider = dependencies.get(dag_divider_value, {current_task_name: {"internal": [], "external": []}})
-                                current_internal_deps_for_task_in_divider = current_deps_for_divider[current_task_name]["internal"]
-
-                                current_internal_deps_for_task_in_divider.append(dep.get("task_name"))
-                                dependencies[dag_divider_value][current_task_name]["internal"] = current_internal_deps_for_task_in_divider
-
-                        # ======== External DAG Dependencies ======== #
-                        for dep in deps:
-                            if dep.get("dag_name") != dag_divider_value:
-                                print(dep.get("task_name"))
-                                current_deps_for_divider = dependencies.get(dag_divider_value, {current_task_name: {"internal": [], "external": []}})
-                                current_external_deps_for_task_in_divider = current_deps_for_divider[current_task_name]["external"]
-                                current_external_deps_for_task_in_divider.append(dep.get("task_name"))
-                                dependencies[dag_divider_value][current_task_name]["external"] = current_external_deps_for_task_in_divider
-
-        return dependencies
+        Returns:
+            list: The (task, dependent task) edges, in the order added.
+        """
+        tasks = self.get_tasks()
+        edges = []
+        added = set()
+        for position, consumer in self.match_dependencies_controlm():
+            task, obj = tasks[position], tasks[consumer]
+            dependency = (obj.get_dag_name(), obj.get_attribute("JOBNAME"))
+            if (position, dependency) in added:
+                continue
+            added.add((position, dependency))
+            task.add_dependent_task(*dependency)
+            edges.append((task, obj))
+        return edges
 
     def generate_dag_dependency_statement(self, task, dependencies):
         statement = task + " >> "
@@ -187,20 +512,22 @@ class UF():
     def calculate_dag_python_imports(self, dag_divider_key="", dag_divider_value=""):
         python_imports = []
         dag_imps = {}
-        for task in self.get_tasks():
-            if task.get_attribute(dag_divider_key) == dag_divider_value or dag_divider_key == "":
-                for task_import in task.get_airflow_task_python_imports():
-                    if dag_imps.get(task_import['package'], None) is not None:
-                        existing_imports = dag_imps.get(task_import['package'], None)
-                        for new_imp in task_import['imports']:
-                            if new_imp not in existing_imports:
-                                dag_imps[task_import['package']].append(new_imp)
-
-                    else:
-                        dag_imps[task_import['package']] = task_import['imports']
-
-                    # Sort the Import List
-                    dag_imps[task_import['package']].sort()
+        tasks = self.get_tasks()
+        if dag_divider_key != "":
+            tasks = self.get_tasks_by_attr(dag_divider_key, dag_divider_value)
+        for task in tasks:
+            for task_import in task.get_airflow_task_python_imports():
+                if dag_imps.get(task_import['package'], None) is not None:
+                    existing_imports = dag_imps.get(task_import['package'], None)
+                    for new_imp in task_import['imports']:
+                        if new_imp not in existing_imports:
+                            dag_imps[task_import['package']].append(new_imp)
+
+                else:
+                    dag_imps[task_import['package']] = task_import['imports']
+
+                # Sort the Import List
+                dag_imps[task_import['package']].sort()
         # Sort the Modules
         dag_imps = dict(sorted(dag_imps.items()))
 
@@ -215,12 +542,23 @@ class UF():
 
 class UFTask(UF):
     T = TypeVar('T', bound='UFTask')
+    __slots__ = ("variables", "in_conditions", "out_conditions", "shouts",
+                 "quantitative_resources", "control_resources", "on_actions",
+                 "dep_tasks", "dag_name", "env_vars", "airflow_task_output",
+                 "airflow_task_python_imports", "priority_weight")
+    _conversion_slots = ("tasks", "dep_tasks", "dag_name", "env_vars",
+                         "airflow_task_output", "airflow_task_python_imports",
+                         "priority_weight", "_index_owners")
 
     def __init__(self):
+        self.init_attributes()
         self.variables = []
         self.in_conditions = []
         self.out_conditions = []
         self.shouts = []
+        self.quantitative_resources = []
+        self.control_resources = []
+        self.on_actions = []
         self.dep_tasks = []
         return
 
@@ -264,25 +602,81 @@ class UFTask(UF):
     def get_shout_count(self):
         return len(self.shouts)
 
+    # Handle Quantitative Resources
+    def add_quantitative_resource(self, ufTaskQuantitativeResource):
+        self.quantitative_resources.append(ufTaskQuantitativeResource)
+
+    def get_quantitative_resources(self):
+        return self.quantitative_resources
+
+    # Handle Control Resources
+    def add_control_resource(self, ufTaskControlResource):
+        self.control_resources.append(ufTaskControlResource)
+
+    def get_control_resources(self):
+        return self.control_resources
+
+    # Handle ON Statements
+    def add_on_action(self, ufTaskOnAction):
+        self.on_actions.append(ufTaskOnAction)
+
+    def get_on_actions(self):
+        return self.on_actions
+
     def set_airflow_task_output(self, output):
+        self.check_writable()
         self.airflow_task_output = output
 
     def get_airflow_task_output(self):
         return self.airflow_task_output
 
     def set_airflow_task_python_imports(self, imps):
+        self.check_writable()
         self.airflow_task_python_imports = imps
 
     def get_airflow_task_python_imports(self):
         return self.airflow_task_python_imports
 
     def get_output_raw_xml(self):
+        if self.source_document is not None:
+            # Dedent with the indentation of the start tag in the file
+            indentation = self.source_document.get_indentation(self.source_start)
+            return textwrap.dedent(indentation + self.get_source_xml()) + "\n"
+        if self.raw_xml_element is None:
+            return None
+        if etree.iselement(self.raw_xml_element):
+            # Parsed by the lxml backend, no round-trip needed
+            return etree.tostring(
+                self.raw_xml_element,
+                pretty_print=True,
+                with_tail=False).decode()
         xmlstr = xml.etree.ElementTree.tostring(self.raw_xml_element)
         return etree.tostring(
             etree.fromstring(xmlstr),
             pretty_print=True).decode()
 
+    def get_parsed_objects(self):
+        # The task and the objects parsed from its child elements
+        parsed = [self] + self.variables + self.in_conditions + self.out_conditions
+        parsed += self.quantitative_resources + self.control_resources
+        for on_action in self.on_actions:
+            parsed.append(on_action)
+            parsed += on_action.get_do_actions()
+        return parsed
+
+    def create_overlay(self):
+        overlay = self.copy_for_overlay()
+        overlay.dep_tasks = []
+        return overlay
+
+    def release_raw_xml_element(self):
+        # Drop the XML elements of the task and its children so that a
+        # streaming parser can free them
+        for parsed in self.get_parsed_objects():
+            parsed.set_raw_xml_element(None)
+
     def set_dag_name(self, dag_name):
+        self.check_writable()
         self.dag_name = dag_name
         return
 
@@ -293,40 +687,115 @@ class UFTask(UF):
         return self.dep_tasks
 
     def add_dependent_task(self, dag_name, task_name):
+        self.check_writable()
         self.dep_tasks.append({"dag_name": dag_name, "task_name": task_name})
         return
+
+    def clear_dependent_tasks(self):
+        self.check_writable()
+        self.dep_tasks = []
+        return
         
     def set_env_vars(self, env_vars):
+        self.check_writable()
         self.env_vars = env_vars
         return
         
     def get_env_vars(self):
         return getattr(self, 'env_vars', [])
 
+    def set_priority_weight(self, priority_weight):
+        self.check_writable()
+        self.priority_weight = priority_weight
+        return
+
+    def get_priority_weight(self):
+        return getattr(self, 'priority_weight', None)
+
 
 class UFTaskVariable(UFTask):
     T = TypeVar('T', bound='UFTaskVariable')
+    __slots__ = ()
 
     def __init__(self):
+        self.init_attributes()
         return
 
 
 class UFTaskInCondition(UFTask):
     T = TypeVar('T', bound='UFTaskInCondition')
+    __slots__ = ()
 
     def __init__(self):
+        self.init_attributes()
         return
 
 
 class UFTaskOutCondition(UFTask):
     T = TypeVar('T', bound='UFTaskOutCondition')
+    __slots__ = ()
 
     def __init__(self):
+        self.init_attributes()
         return
 
 
 class UFTaskShout(UFTask):
     T = TypeVar('T', bound='UFTaskShout')
+    __slots__ = ()
+
+    def __init__(self):
+        self.init_attributes()
+        return
+
+
+class UFTaskQuantitativeResource(UFTask):
+    T = TypeVar('T', bound='UFTaskQuantitativeResource')
+    __slots__ = ()
 
     def __init__(self):
+        self.init_attributes()
         return
+
+
+class UFTaskControlResource(UFTask):
+    T = TypeVar('T', bound='UFTaskControlResource')
+    __slots__ = ()
+
+    def __init__(self):
+        self.init_attributes()
+        return
+
+
+class UFTaskOnAction(UFTask):
+    T = TypeVar('T', bound='UFTaskOnAction')
+    __slots__ = ("do_actions",)
+
+    def __init__(self):
+        self.init_attributes()
+        self.do_actions = []
+        return
+
+    # Handle DO Actions run when the ON statement matches
+    def add_do_action(self, ufTaskDoAction):
+        self.do_actions.append(ufTaskDoAction)
+
+    def get_do_actions(self):
+        return self.do_actions
+
+
+class UFTaskDoAction(UFTask):
+    T = TypeVar('T', bound='UFTaskDoAction')
+    __slots__ = ("action_type",)
+
+    def __init__(self):
+        self.init_attributes()
+        self.action_type = None
+        return
+
+    # The DO element tag, such as DOACTION, DOCOND or DOMAIL
+    def set_action_type(self, action_type):
+        self.action_type = action_type
+
+    def get_action_type(self):
+        return self.action_type
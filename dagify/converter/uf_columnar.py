@@ -0,0 +1,191 @@
+# Copyright 2024 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import shutil
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from .uf import (
+    UF,
+    UFTask,
+    UFTaskVariable,
+    UFTaskInCondition,
+    UFTaskOutCondition,
+)
+
+# Column joining the rows of the child tables to their task
+TASK_KEY = "task_key"
+# Partition column of a dataset holding many exports
+SOURCE_KEY = "source"
+
+# Table name, UFTask getter and adder and class of each child table
+CHILD_TABLES = [
+    ("variables", "get_variables", "add_variable", UFTaskVariable),
+    ("in_conditions", "get_in_conditions", "add_in_condition", UFTaskInCondition),
+    ("out_conditions", "get_out_conditions", "add_out_condition", UFTaskOutCondition),
+]
+TABLES = ["tasks"] + [name for name, _, _, _ in CHILD_TABLES]
+
+
+def build_table(keys, rows):
+    """Builds a table with a task key column and one column per attribute
+
+    Columns are the union of the attributes of the rows, in the order they
+    are first seen, and rows without an attribute hold a null."""
+    names = {}
+    for row in rows:
+        for name in row:
+            names.setdefault(name, None)
+    columns = {TASK_KEY: pa.array(keys, pa.int32())}
+    for name in names:
+        if name != TASK_KEY:
+            columns[name] = pa.array([row.get(name) for row in rows], pa.string())
+    return pa.table(columns)
+
+
+def uf_to_tables(uf):
+    """Converts a Universal Format into columnar tables
+
+    Attributes are exported with their values as parsed from the source.
+
+    Args:
+        uf (UF): The Universal Format.
+
+    Returns:
+        dict: A pyarrow Table per name in TABLES. Tasks are keyed by their
+        position in the Universal Format and the child tables reference it
+        in their task_key column.
+    """
+    tasks = uf.get_tasks()
+    tables = {"tasks": build_table(
+        range(len(tasks)), [task.get_attributes_original() for task in tasks])}
+    for name, getter, _, _ in CHILD_TABLES:
+        keys = []
+        rows = []
+        for key, task in enumerate(tasks):
+            for child in getattr(task, getter)():
+                keys.append(key)
+                rows.append(child.get_attributes_original())
+        tables[name] = build_table(keys, rows)
+    return tables
+
+
+def tables_to_uf(tables):
+    """Rebuilds a Universal Format from the tables of uf_to_tables
+
+    The rebuilt objects carry the attributes only, not the source XML."""
+    def rows(table):
+        names = [name for name in table.column_names
+                 if name not in (TASK_KEY, SOURCE_KEY)]
+        keys = table.column(TASK_KEY).to_pylist()
+        columns = [table.column(name).to_pylist() for name in names]
+        for index, key in enumerate(keys):
+            yield key, {name: column[index] for name, column in zip(names, columns)
+                        if column[index] is not None}
+
+    uf = UF()
+    tasks = {}
+    for key, attributes in rows(tables["tasks"]):
+        task = UFTask()
+        task.from_attributes(attributes)
+        uf.add_task(task)
+        tasks[key] = task
+    for name, _, adder, cls in CHILD_TABLES:
+        for key, attributes in rows(tables[name]):
+            child = cls()
+            child.from_attributes(attributes)
+            getattr(tasks[key], adder)(child)
+    return uf
+
+
+def write_dataset(uf, dataset_path, source):
+    """Writes a Universal Format into a partitioned dataset
+
+    Every table is a directory of Parquet files partitioned by source, so
+    the exports of a whole estate can be written to the same dataset and
+    queried together. Writing a source again replaces its partition.
+
+    Args:
+        uf (UF): The Universal Format.
+        dataset_path (str): The dataset directory.
+        source (str): The partition name, usually the source file name.
+    """
+    for name, table in uf_to_tables(uf).items():
+        partition = os.path.join(dataset_path, name, f"{SOURCE_KEY}={source}")
+        if os.path.isdir(partition):
+            shutil.rmtree(partition)
+        os.makedirs(partition)
+        pq.write_table(table, os.path.join(partition, "part-0.parquet"))
+
+
+def read_table(dataset_path, name, columns=None, sources=None):
+    """Reads a table of a partitioned dataset
+
+    Partitions may hold different attribute columns, the table has the
+    union of them and a source column naming the partition of each row.
+    Tasks are identified by their (source, task_key) pair.
+
+    Args:
+        dataset_path (str): The dataset directory.
+        name (str): The table name, one of TABLES.
+        columns (list): The columns to read, all when None.
+        sources (list): The partitions to read, all when None.
+
+    Returns:
+        pyarrow.Table: The table.
+    """
+    if name not in TABLES:
+        raise ValueError(
+            f"dagify: unknown table {name}, expected one of {', '.join(TABLES)}")
+    path = os.path.join(dataset_path, name)
+    partitioning = ds.partitioning(pa.schema([(SOURCE_KEY, pa.string())]), flavor="hive")
+    dataset = ds.dataset(path, format="parquet", partitioning=partitioning)
+    schema = pa.unify_schemas(
+        [fragment.physical_schema for fragment in dataset.get_fragments()]
+        + [partitioning.schema])
+    dataset = ds.dataset(path, schema=schema, format="parquet", partitioning=partitioning)
+
+    if columns is not None:
+        # Attributes no export has are read as nulls
+        columns = {column: ds.field(column) if column in schema.names
+                   else pa.scalar(None, pa.string()) for column in columns}
+    row_filter = None
+    if sources is not None:
+        row_filter = ds.field(SOURCE_KEY).isin(sources)
+    return dataset.to_table(columns=columns, filter=row_filter)
+
+
+def read_dataset(dataset_path, source):
+    """Reads the Universal Format of one source back from a dataset"""
+    tables = {name: read_table(dataset_path, name, sources=[source]) for name in TABLES}
+    return tables_to_uf(tables)
+
+
+def get_task_types(tasks):
+    """Returns the distinct lower case TASKTYPE values of a tasks table"""
+    if "TASKTYPE" not in tasks.column_names:
+        return []
+    task_types = pc.unique(pc.utf8_lower(tasks.column("TASKTYPE").drop_null()))
+    return task_types.to_pylist()
+
+
+def get_jobs_with_attribute(tasks, attribute):
+    """Returns the JOBNAME of the tasks that have attribute set"""
+    if attribute not in tasks.column_names:
+        return []
+    tasks = tasks.filter(pc.is_valid(tasks.column(attribute)))
+    return tasks.column("JOBNAME").to_pylist()
@@ -15,25 +15,70 @@
 import re
 import os
 import pprint
-import xml.etree.ElementTree as ET
+from collections import Counter
+from bisect import bisect_right
+from concurrent.futures import ProcessPoolExecutor
 import json
 import yaml
 from prettytable import PrettyTable
 
+from .snapshot_cache import SnapshotCache
+from .tree_parser import get_tree_parser, report_unknown_tags
+from .xml_backend import get_backend
+from .xml_scanner import (
+    get_source_document,
+    scan_element_spans,
+    split_top_level,
+)
+
 from .uf import (
     UF,
     UFTask,
-    UFTaskVariable,
-    UFTaskInCondition,
-    UFTaskOutCondition,
-    UFTaskShout,
 )
 
 
-def load_source(source_path, tool):
+# Top level elements that can be parsed independently of each other
+PARALLEL_SPLIT_TAGS = {
+    "controlm": [b"FOLDER", b"SMART_FOLDER"],
+}
+
+# Composite dag dividers name several attributes, their values are joined
+DIVIDER_KEY_SEPARATOR = "+"
+DIVIDER_VALUE_SEPARATOR = "_"
+
+# Elements parsed into UF objects, these keep a byte span into the source
+SPAN_TAGS = {
+    "controlm": ["JOB", "VARIABLE", "INCOND", "OUTCOND", "SHOUT"],
+    "automic": ["task", "pre"],
+}
+
+
+def load_source(source_path, tool, streaming=False, backend=None, workers=None,
+                cache_dir=None, cache_size=None):
     """ Read the Source File
         Parse into dagify Universial Format
-        Output the dagify Universial Format Back to the Class"""
+        Output the dagify Universial Format Back to the Class
+
+        When streaming is set the source file is read incrementally and
+        each job is released from the parsed tree once it has been
+        converted, so memory grows with the Universial Format only.
+
+        backend names the XML parser backend to use, see xml_backend.
+
+        When workers is more than 1 (0 for one per CPU) the top level
+        folders of the source file are parsed in a pool of processes.
+
+        Parsed objects keep the byte span of their element in the source
+        file rather than the element, so the parsed tree is released once
+        loading returns.
+
+        When cache_dir is set the Universial Format is loaded from a
+        snapshot of a previous run on the same source content if there is
+        one, and a snapshot is written otherwise. cache_size caps the size
+        of the cache directory in bytes.
+
+        The Universial Format is read-only, conversions run on overlays
+        created with create_overlay."""
     if source_path is None:
         raise ValueError("dagify: source file cannot be None or Empty")
     if file_exists(source_path) is False:
@@ -41,78 +86,245 @@ def load_source(source_path, tool):
             "dagify: source file not found at {}".format(
                 source_path))
 
-    root = ET.parse(source_path).getroot()
+    if cache_dir is None:
+        return parse_source(source_path, tool, streaming, backend, workers).freeze()
+
+    cache = SnapshotCache(cache_dir, cache_size)
+    key = cache.get_key(source_path, tool)
+    uf = cache.load(source_path, tool, key)
+    if uf is not None:
+        print(f"Loaded {source_path} from snapshot {cache.get_path(key)}")
+        return uf.freeze()
+    uf = parse_source(source_path, tool, streaming, backend, workers).freeze()
+    cache.store(source_path, tool, uf, key)
+    return uf
+
+
+def parse_source(source_path, tool, streaming=False, backend=None, workers=None):
+    """Parses the source file into the Universial Format, see load_source"""
+    if workers == 0:
+        workers = os.cpu_count()
+    if workers is not None and workers > 1:
+        if streaming:
+            raise ValueError(
+                "dagify: streaming and parallel parsing cannot be combined")
+        return parallel_universal_format(source_path, tool, workers, backend)
+
+    if streaming:
+        return stream_universal_format(source_path, tool, backend)
+
+    root = get_backend(backend).parse(source_path)
     uf = parse_universal_format(root, tool)
+    if tool in SPAN_TAGS:
+        document = get_source_document(source_path)
+        spans = find_element_spans(root, document.data, SPAN_TAGS[tool])
+        attach_source_spans(uf.get_tasks(), spans, document)
+    for task in uf.get_tasks():
+        task.release_raw_xml_element()
     return uf
 
 
 def parse_universal_format(source, tool):
-    """Function to parse uf"""
+    """Function to parse uf
+
+    Elements without a handler for the tool are counted and reported once
+    per tag after parsing."""
     uf = UF()
 
-    function = "parse_" + tool + "_tree"
-    globals()[function](source, uf)
+    parser = get_tree_parser(tool)
+    parser.parse(source, uf)
+    report_unknown_tags(parser.unknown_tags)
 
     return uf
 
-def parse_automic_tree(root_node, parent):
-    for node in root_node:
-        match node.tag:
-            case "task":
-                ufTask = UFTask()
-                ufTask.from_xml(node)
-                parent.add_task(ufTask)
-                parse_automic_tree(node, ufTask)
-            case "pre":
-                ufTaskInCondition = UFTaskInCondition()
-                ufTaskInCondition.from_xml(node)
-                parent.add_in_condition(ufTaskInCondition)
-                parse_automic_tree(node, ufTaskInCondition)
-            case _:
-                parse_automic_tree(node, parent)
+def stream_universal_format(source_path, tool, backend=None):
+    """Function to parse uf incrementally from the source file"""
+    uf = UF()
 
-    return parent
+    function = STREAM_PARSERS.get(tool, None)
+    if function is None:
+        raise ValueError(
+            f"dagify: streaming is not supported for source tool {tool}")
+    function(source_path, uf, get_backend(backend, streaming=True))
+
+    return uf
+
+
+def parallel_universal_format(source_path, tool, workers, backend=None):
+    """Function to parse uf with a pool of processes
+
+    The source file is split into its top level folders, batches of
+    folders are parsed in worker processes and the partial universal
+    formats are merged back in document order."""
+    split_tags = PARALLEL_SPLIT_TAGS.get(tool, None)
+    if split_tags is None:
+        raise ValueError(
+            f"dagify: parallel parsing is not supported for source tool {tool}")
+
+    data = get_source_document(source_path).data
+    body_start, body_end, chunks = split_top_level(data, split_tags)
+    # Whitespace between folders does not need a worker
+    chunks = [(start, end) for start, end in chunks
+              if data[start:end].strip()]
+
+    uf = UF()
+    if len(chunks) == 0:
+        return uf
+
+    # Several batches per worker keep the pool busy when folder sizes vary
+    batch_size = (chunks[-1][1] - chunks[0][0]) / (workers * 4)
+    batches = []
+    batch = []
+    for start, end in chunks:
+        if batch and start - batch[0][0] >= batch_size:
+            batches.append(batch)
+            batch = []
+        batch.append((start, end))
+    batches.append(batch)
+
+    jobs = [(source_path, tool, backend, body_start, body_end, batch)
+            for batch in batches]
+    unknown_tags = Counter()
+    with ProcessPoolExecutor(max_workers=min(workers, len(batches))) as executor:
+        for tasks, batch_unknown_tags in executor.map(parse_source_chunks, jobs):
+            for task in tasks:
+                uf.add_task(task)
+            unknown_tags.update(batch_unknown_tags)
+    report_unknown_tags(unknown_tags)
+
+    return uf
+
+
+def parse_source_chunks(job):
+    """Parses a batch of top level chunks of a source file in a worker
+
+    The chunks are wrapped in the document prolog and the root element so
+    that namespaces and encoding declared there still apply."""
+    source_path, tool, backend, body_start, body_end, chunks = job
+    document = get_source_document(source_path)
+    pieces = [(0, body_start)] + chunks + [(body_end, document.size)]
+    content = b"".join(document.data[start:end] for start, end in pieces)
+
+    # Offsets of each piece in content and in the source file
+    content_starts = []
+    source_starts = []
+    position = 0
+    for start, end in pieces:
+        content_starts.append(position)
+        source_starts.append(start)
+        position += end - start
 
-def parse_controlm_tree(root_node, parent):
-    """Function to parse control m"""
-    for node in root_node:
-        match node.tag:
-            case "FOLDER" | "SMART_FOLDER":
-                # ufFolder = UFFolder()
-                # ufFolder.from_xml(node)
-                # parent.add_folder(ufFolder)
-                parse_controlm_tree(node, parent)
-            case "JOB":
-                ufTask = UFTask()
-                ufTask.from_xml(node)
-                parent.add_task(ufTask)
-                parse_controlm_tree(node, ufTask)
-            case "VARIABLE":
-                ufTaskVariable = UFTaskVariable()
-                ufTaskVariable.from_xml(node)
-                parent.add_variable(ufTaskVariable)
-                parse_controlm_tree(node, ufTaskVariable)
-            case "INCOND":
-                ufTaskInCondition = UFTaskInCondition()
-                ufTaskInCondition.from_xml(node)
-                parent.add_in_condition(ufTaskInCondition)
-                parse_controlm_tree(node, ufTaskInCondition)
-            case "OUTCOND":
-                ufTaskOutCondition = UFTaskOutCondition()
-                ufTaskOutCondition.from_xml(node)
-                parent.add_out_condition(ufTaskOutCondition)
-                parse_controlm_tree(node, ufTaskOutCondition)
-            case "SHOUT":
-                ufTaskShout = UFTaskShout()
-                ufTaskShout.from_xml(node)
-                parent.add_shout(ufTaskShout)
-                parse_controlm_tree(node, ufTaskShout)
-            case _:
-                print("Node: " + node.tag + " is not currently supported.")
+    def to_source(start, end):
+        piece = bisect_right(content_starts, start) - 1
+        shift = source_starts[piece] - content_starts[piece]
+        return start + shift, end + shift
 
+    root = get_backend(backend).fromstring(content)
+    uf = UF()
+    parser = get_tree_parser(tool)
+    parser.parse(root, uf)
+    spans = find_element_spans(root, content, SPAN_TAGS[tool], to_source)
+    attach_source_spans(uf.get_tasks(), spans, document)
+    # XML elements are not sent back to the main process
+    for task in uf.get_tasks():
+        task.release_raw_xml_element()
+    return uf.get_tasks(), parser.unknown_tags
+
+
+def find_element_spans(root, data, tags, to_source=None):
+    """Maps the elements of root with a tag in tags to their byte spans
+
+    Args:
+        root: The root element parsed from data.
+        data (bytes): The XML document root was parsed from.
+        tags (list): The tag names to map.
+        to_source (function): Translates offsets in data to offsets in the
+            source file, when data is not the whole file.
+
+    Returns:
+        dict: (start, end) byte offsets by element.
+    """
+    elements = {tag: root.iter(tag) for tag in tags}
+    spans = {}
+    for tag, start, end in scan_element_spans(data, tags):
+        element = next(elements[tag], None)
+        if element is None:
+            raise ValueError(
+                f"dagify: {tag} element at byte {start} was not parsed from source")
+        if to_source is not None:
+            start, end = to_source(start, end)
+        spans[element] = (start, end)
+    return spans
+
+
+def attach_source_spans(tasks, spans, document):
+    """Replaces the XML elements of parsed objects by their byte spans"""
+    for task in tasks:
+        for parsed in task.get_parsed_objects():
+            span = spans.get(parsed.get_raw_xml(), None)
+            if span is not None:
+                parsed.set_source_span(document, span[0], span[1])
+                parsed.set_raw_xml_element(None)
+
+
+def stream_controlm_tree(source_path, parent, backend):
+    """Function to parse control m with iterparse
+
+    Jobs are built when their end tag is read, the same way the tree
+    parser builds them, and are then cleared and detached from the tree so
+    only the folders currently being read stay in memory.
+    """
+    parser = get_tree_parser("controlm")
+    document = get_source_document(source_path)
+    span_tags = SPAN_TAGS["controlm"]
+    # The span scan runs in step with the end events of the parser
+    source_spans = scan_element_spans(document.data, span_tags)
+    spans = {}
+
+    # Elements currently open, each with a flag telling whether
+    # the tree parser would have walked into their children
+    open_nodes = []
+    for event, node in backend.iterparse(source_path, events=("start", "end")):
+        if event == "start":
+            walked = len(open_nodes) == 0 or (
+                open_nodes[-1][1] and parser.is_container(node.tag))
+            open_nodes.append((node, walked))
+            continue
+
+        open_nodes.pop()
+        if node.tag in span_tags:
+            tag, start, end = next(source_spans)
+            if tag != node.tag:
+                raise ValueError(
+                    f"dagify: {node.tag} element was not found in source at byte {start}")
+            spans[node] = (start, end)
+        if node.tag == "JOB":
+            job_spans = spans
+            spans = {}
+        if node.tag != "JOB" or len(open_nodes) == 0 or not open_nodes[-1][1]:
+            continue
+
+        ufTask = UFTask()
+        ufTask.from_xml(node)
+        parent.add_task(ufTask)
+        parser.parse(node, ufTask)
+        attach_source_spans([ufTask], job_spans, document)
+        # The element is cleared below, do not keep a reference to it
+        ufTask.release_raw_xml_element()
+
+        node.clear()
+        open_nodes[-1][0].remove(node)
+
+    report_unknown_tags(parser.unknown_tags)
     return parent
 
 
+# Incremental parsers by source tool, see stream_universal_format
+STREAM_PARSERS = {
+    "controlm": stream_controlm_tree,
+}
+
+
 def clean_converter_type(converter_type):
     """Cleans a converter type string by removing all non-alphanumeric characters and converting it to uppercase.
 
@@ -281,18 +493,16 @@ def get_tasktype_statistics(source_jt, config_jt):
     return job_types_converted, job_types_not_converted, converted_percent, non_converted_percent
 
 
-def get_jobtypes_andcount(source_path):
+def get_jobtypes_andcount(source_path, backend=None):
     """Generic function that calculates the job_types and the count from any input"""
     unique_job_types = []
     job_types_source = []
     job_types_count = 0
     if source_path.endswith('.xml'):
-        tree = ET.parse(source_path)
-        root = tree.getroot()
-        # Find all JOB elements
-        job_elements = root.findall('.//JOB')
-        # Extract TASKTYPE values and store them in a set to ensure uniqueness
-        job_types_source = list({job.get('TASKTYPE') for job in job_elements})
+        backend = get_backend(backend)
+        root = backend.parse(source_path)
+        # Extract TASKTYPE values of all JOB elements and store them in a set to ensure uniqueness
+        job_types_source = list(set(backend.get_job_attribute(root, 'TASKTYPE')))
         # Convert all to lowercase for comparision
         job_types_source = [item.lower() for item in job_types_source]
         unique_job_types = list(set(job_types_source))
@@ -347,15 +557,14 @@ def generate_json(statistics, job_table_data, schedule_table_data, warning_line,
         json.dump(data, json_file, indent=2)  # indent for better readability
 
 
-def get_job_info(file_path):
+def get_job_info(file_path, backend=None):
     """Function to get and return a dictionary of job_name and its task_type"""
     if not file_path.endswith('.xml'):
         raise ValueError(f"Invalid file format: {file_path}. Only XML files are supported.")
     job_info_list = []
-    tree = ET.parse(file_path)
-    root = tree.getroot()
-    # Find all JOB elements
-    for job in root.findall('.//JOB'):  # Find all JOB elements
+    backend = get_backend(backend)
+    root = backend.parse(file_path)
+    for job in backend.find_jobs(root):  # Find all JOB elements
         job_name = job.attrib['JOBNAME']
         task_type = job.attrib['TASKTYPE'].lower()
         job_info_list.append({'job_name': job_name, 'task_type': task_type})
@@ -384,6 +593,28 @@ def get_template_name(self, job_type):
     return None
 
 
+def get_divider_value(task, dag_divider):
+    """Returns the value of the dag divider of a task
+
+    A composite divider such as APPLICATION+SUB_APPLICATION joins the
+    values of its attributes with an underscore, skipping missing ones.
+
+    Args:
+        task (UFTask): The task.
+        dag_divider (str): The divider attribute, or attributes joined by +.
+
+    Returns:
+        str: The divider value, None when the task has none of them.
+    """
+    if DIVIDER_KEY_SEPARATOR not in dag_divider:
+        return task.get_attribute(dag_divider)
+    values = [task.get_attribute(attribute) for attribute in dag_divider.split(DIVIDER_KEY_SEPARATOR)]
+    values = [value for value in values if value is not None]
+    if not values:
+        return None
+    return DIVIDER_VALUE_SEPARATOR.join(values)
+
+
 def calculate_cron_schedule(task):
     """Function to calculate cron schedule for a given task"""
     timefrom = task.get_attribute("TIMEFROM")
@@ -432,19 +663,14 @@ def calculate_cron_schedule(task):
     return schedule_interval
 
 
-def filter_jobs_by_parameter_in_child(xml_file_path, parameter_name, child_element_name=None):
+def filter_jobs_by_parameter_in_child(xml_file_path, parameter_name, child_element_name=None, backend=None):
     """Function to return job_name with a particular paramter"""
-    tree = ET.parse(xml_file_path)
-    root = tree.getroot()
+    backend = get_backend(backend)
+    root = backend.parse(xml_file_path)
     matching_job_names = []
 
-    for job in root.findall('.//JOB'):
-        if child_element_name:
-            child_element = job.find(f'./{child_element_name}')
-            if child_element is not None and child_element.attrib.get(parameter_name) is not None:
-                matching_job_names.append(job.attrib['JOBNAME'])
-        else:  # Search within the JOB tag itself
-            if job.attrib.get(parameter_name) is not None:
-                matching_job_names.append(job.attrib['JOBNAME'])
+    # Search within the first child_element_name child, or within the JOB tag itself
+    for job in backend.find_jobs_with_parameter(root, parameter_name, child_element_name):
+        matching_job_names.append(job.attrib['JOBNAME'])
 
     return matching_job_names
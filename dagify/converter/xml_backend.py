@@ -0,0 +1,119 @@
+# Copyright 2024 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import xml.etree.ElementTree as ET
+from lxml import etree
+
+
+class ElementTreeBackend():
+    """Parser backend built on the standard library ElementTree"""
+    name = "etree"
+
+    def parse(self, source_path):
+        return ET.parse(source_path).getroot()
+
+    def fromstring(self, content):
+        return ET.fromstring(content)
+
+    def iterparse(self, source_path, events):
+        return ET.iterparse(source_path, events=events)
+
+    def find_jobs(self, root):
+        return root.findall('.//JOB')
+
+    def get_job_attribute(self, root, attribute):
+        return [job.get(attribute) for job in root.iter('JOB')
+                if job.get(attribute) is not None]
+
+    def find_jobs_with_parameter(self, root, parameter_name, child_element_name=None):
+        matching_jobs = []
+        for job in root.iter('JOB'):
+            if child_element_name:
+                child_element = job.find(f'./{child_element_name}')
+                if child_element is not None and child_element.attrib.get(parameter_name) is not None:
+                    matching_jobs.append(job)
+            elif job.attrib.get(parameter_name) is not None:
+                matching_jobs.append(job)
+        return matching_jobs
+
+
+class LxmlBackend():
+    """Parser backend built on lxml (libxml2) with precompiled XPath
+
+    huge_tree lifts libxml2's limits on text size and tree depth, which
+    estate-wide exports can exceed."""
+    name = "lxml"
+
+    _jobs = etree.XPath('//JOB')
+    _job_attribute = etree.XPath('//JOB/@*[name()=$attribute]')
+    _jobs_with_parameter = etree.XPath('//JOB[@*[name()=$parameter]]')
+    _jobs_with_parameter_in_child = etree.XPath(
+        '//JOB[*[name()=$child][1][@*[name()=$parameter]]]')
+
+    def __init__(self):
+        self.parser = etree.XMLParser(
+            huge_tree=True, remove_comments=True, remove_pis=True)
+
+    def parse(self, source_path):
+        return etree.parse(source_path, self.parser).getroot()
+
+    def fromstring(self, content):
+        return etree.fromstring(content, self.parser)
+
+    def iterparse(self, source_path, events):
+        return etree.iterparse(
+            source_path, events=events,
+            huge_tree=True, remove_comments=True, remove_pis=True)
+
+    def find_jobs(self, root):
+        return self._jobs(root)
+
+    def get_job_attribute(self, root, attribute):
+        # XPath string results keep their element alive, return plain str
+        return [str(value) for value in self._job_attribute(root, attribute=attribute)]
+
+    def find_jobs_with_parameter(self, root, parameter_name, child_element_name=None):
+        if child_element_name:
+            return self._jobs_with_parameter_in_child(
+                root, child=child_element_name, parameter=parameter_name)
+        return self._jobs_with_parameter(root, parameter=parameter_name)
+
+
+BACKENDS = {
+    ElementTreeBackend.name: ElementTreeBackend,
+    LxmlBackend.name: LxmlBackend,
+}
+
+# Fastest backend per parse mode on large exports, see
+# dagify/test/benchmarks/bench_parser_backends.py
+DEFAULT_BACKEND = LxmlBackend.name
+DEFAULT_STREAMING_BACKEND = ElementTreeBackend.name
+
+
+def get_backend(name=None, streaming=False):
+    """Returns the parser backend registered under name
+
+    Args:
+        name (str): The backend name, the default for the parse mode when None.
+        streaming (bool): Whether the backend is used for iterparse.
+
+    Returns:
+        The parser backend instance.
+    """
+    if name is None:
+        name = DEFAULT_STREAMING_BACKEND if streaming else DEFAULT_BACKEND
+    if name not in BACKENDS:
+        raise ValueError(
+            f"dagify: unknown parser backend {name}, expected one of {', '.join(BACKENDS)}")
+    return BACKENDS[name]()
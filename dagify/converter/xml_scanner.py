@@ -0,0 +1,225 @@
+# Copyright 2024 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import mmap
+import os
+import re
+
+# Attribute values may legally contain '>', so tags are matched quote aware
+_TAG_BODY = rb'((?:[^>"\']|"[^"]*"|\'[^\']*\')*)>'
+_IGNORED = rb'<!--.*?-->|<!\[CDATA\[.*?\]\]>|<[?!][^>]*>'
+_ROOT_PATTERN = re.compile(_IGNORED + rb'|<([A-Za-z_][\w.:-]*)' + _TAG_BODY, re.S)
+_ENCODING_PATTERN = re.compile(rb'^\s*<\?xml[^>]*encoding=["\']([A-Za-z0-9._-]+)["\']')
+
+# Documents opened in this process, by absolute path
+_DOCUMENTS = {}
+
+
+def open_source(source_path):
+    """Memory-maps a source file for reading
+
+    Args:
+        source_path (str): The path to the source file.
+
+    Returns:
+        mmap.mmap: A read-only view of the file.
+    """
+    with open(source_path, "rb") as f:
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+class SourceDocument():
+    """Read-only memory-mapped view of a parsed source file
+
+    UF objects keep the byte span of their element in the document instead
+    of the element itself, the XML is sliced from the file when needed."""
+
+    def __init__(self, source_path, data=None):
+        self.source_path = os.path.abspath(source_path)
+        stat = os.stat(self.source_path)
+        self.size = stat.st_size
+        self.mtime = stat.st_mtime_ns
+        self._data = data
+        # The file is only mapped once a span is read
+        if data is not None:
+            head = data[:256]
+        else:
+            with open(self.source_path, "rb") as f:
+                head = f.read(256)
+        match = _ENCODING_PATTERN.match(head)
+        self.encoding = match.group(1).decode() if match else "utf-8"
+
+    def check_unchanged(self):
+        """Raises a ValueError when the file changed since it was parsed
+
+        Spans are offsets in the parsed file, a mapping of a rewritten file
+        holds other bytes and one of a truncated file faults on read."""
+        stat = os.stat(self.source_path)
+        if stat.st_size != self.size or stat.st_mtime_ns != self.mtime:
+            raise ValueError(
+                f"dagify: source file {self.source_path} changed since it was parsed")
+
+    @property
+    def data(self):
+        if self._data is None:
+            self.check_unchanged()
+            self._data = open_source(self.source_path)
+        return self._data
+
+    def read(self, start, end):
+        self.check_unchanged()
+        return self.data[start:end].decode(self.encoding)
+
+    def get_indentation(self, start):
+        """Returns the whitespace before start on its line"""
+        self.check_unchanged()
+        line_start = self.data.rfind(b"\n", 0, start) + 1
+        indentation = self.data[line_start:start]
+        return indentation.decode(self.encoding) if indentation.isspace() else ""
+
+    # Documents are shared by path within a process, also after pickling
+    def __reduce__(self):
+        return (get_source_document, (self.source_path,))
+
+
+def get_source_document(source_path, data=None):
+    """Returns the SourceDocument of source_path for this process
+
+    Args:
+        source_path (str): The path to the source file.
+        data (mmap.mmap): An already open view of the file to reuse.
+
+    Returns:
+        SourceDocument: The document.
+    """
+    source_path = os.path.abspath(source_path)
+    document = _DOCUMENTS.get(source_path, None)
+    if document is not None:
+        stat = os.stat(source_path)
+        if stat.st_size == document.size and stat.st_mtime_ns == document.mtime:
+            return document
+    document = SourceDocument(source_path, data)
+    _DOCUMENTS[source_path] = document
+    return document
+
+
+def find_root(data):
+    """Finds the root element of an XML document
+
+    Args:
+        data (bytes): The XML document.
+
+    Returns:
+        tuple: The root tag name, the end offset of its start tag and the
+        start offset of its end tag.
+    """
+    for match in _ROOT_PATTERN.finditer(data):
+        if match.group(1) is None:
+            continue
+        name = match.group(1)
+        if match.group(2).endswith(b"/"):
+            raise ValueError(f"dagify: root element {name.decode()} is empty")
+        close = data.rfind(b"</" + name)
+        if close < match.end():
+            raise ValueError(f"dagify: root element {name.decode()} is not closed")
+        return name, match.end(), close
+    raise ValueError("dagify: no root element found in source")
+
+
+def split_top_level(data, tags):
+    """Splits the content of the root element into consecutive chunks
+
+    Each top level element whose tag is in tags becomes a chunk of its own
+    and whatever lies between them (whitespace, comments or other elements)
+    becomes a chunk as well. Parsing the chunks in order is therefore
+    equivalent to walking the children of the root in document order.
+
+    Only the split tags and comments are matched, so the scan costs one
+    regex pass over the file and a Python step per folder, not per element.
+
+    Args:
+        data (bytes): The XML document.
+        tags (list): The tag names (bytes) to split on.
+
+    Returns:
+        tuple: The end offset of the root start tag, the start offset of
+        the root end tag and the list of (start, end) chunk offsets.
+    """
+    _, body_start, body_end = find_root(data)
+    names = b"|".join(re.escape(tag) for tag in tags)
+    pattern = re.compile(
+        _IGNORED + rb'|<(/?)(' + names + rb')(?=[\s/>])' + _TAG_BODY, re.S)
+
+    chunks = []
+    position = body_start
+    depth = 0
+    for match in pattern.finditer(data, body_start, body_end):
+        if match.group(2) is None:
+            continue
+        closing = match.group(1) == b"/"
+        empty = not closing and match.group(3).endswith(b"/")
+        if not closing and depth == 0:
+            if match.start() > position:
+                chunks.append((position, match.start()))
+            position = match.start()
+        if closing:
+            depth -= 1
+        elif not empty:
+            depth += 1
+        if depth == 0:
+            chunks.append((position, match.end()))
+            position = match.end()
+        elif depth < 0:
+            raise ValueError(
+                f"dagify: unbalanced {match.group(2).decode()} element at byte {match.start()}")
+    if depth != 0:
+        raise ValueError("dagify: unbalanced top level elements in source")
+    if body_end > position:
+        chunks.append((position, body_end))
+    return body_start, body_end, chunks
+
+
+def scan_element_spans(data, tags, start=0, end=None):
+    """Scans the byte spans of the elements with a tag in tags
+
+    Spans are produced when the end tag is read, which is the order of the
+    "end" events of iterparse. Elements sharing a tag do not nest in the
+    supported sources, so per tag this is also document order.
+
+    Args:
+        data (bytes): The XML document.
+        tags (list): The tag names (str) to scan.
+        start (int): The offset to start scanning from.
+        end (int): The offset to stop scanning at, the end of data when None.
+
+    Yields:
+        tuple: The tag name, the start offset of its start tag and the end
+        offset of its end tag.
+    """
+    names = b"|".join(re.escape(tag.encode()) for tag in tags)
+    pattern = re.compile(
+        _IGNORED + rb'|<(/?)(' + names + rb')(?=[\s/>])' + _TAG_BODY, re.S)
+    if end is None:
+        end = len(data)
+
+    opened = []
+    for match in pattern.finditer(data, start, end):
+        if match.group(2) is None:
+            continue
+        if match.group(1) == b"/":
+            yield match.group(2).decode(), opened.pop(), match.end()
+        elif match.group(3).endswith(b"/"):
+            yield match.group(2).decode(), match.start(), match.end()
+        else:
+            opened.append(match.start())
@@ -0,0 +1,66 @@
+# Copyright 2024 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Benchmark of the Control-M condition matching on a synthetic estate.
+
+A Universal Format of N jobs is built in memory, spread over folders of
+200 jobs. Every job releases a condition that the next job of its
+folder waits on, and every 50th job also waits on a job of the previous
+folder, so about one dependency in fifty crosses a DAG boundary.
+
+calculate_dag_dependencies_controlm is timed on the full estate. The
+nested loop matching it replaced is timed on a small estate only, as it
+grows quadratically with the number of jobs.
+
+Usage: python -m dagify.test.benchmarks.bench_dependencies [--jobs 100000]
+"""
+
+import argparse
+import time
+
+from dagify.converter.uf import UF
+from dagify.test.synthetic_estate import (
+    build_estate,
+    nested_loop_dependencies,
+)
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Control-M condition matching")
+    parser.add_argument("--jobs", type=int, default=100000, help="Number of jobs in the estate")
+    parser.add_argument("--nested-loop-jobs", type=int, default=2000,
+                        help="Number of jobs to time the nested loop matching on")
+    args = parser.parse_args()
+
+    small = args.nested_loop_jobs
+    seconds, _ = timed(nested_loop_dependencies, build_estate(small))
+    print(f"{'nested loop matching':<28} {small:>8} jobs {seconds:8.2f}s")
+    seconds, edges = timed(UF.calculate_dag_dependencies_controlm, build_estate(small))
+    print(f"{'indexed matching':<28} {small:>8} jobs {seconds:8.2f}s")
+
+    build_seconds, uf = timed(build_estate, args.jobs)
+    print(f"Built {args.jobs} job estate in {build_seconds:.2f}s")
+    seconds, edges = timed(uf.calculate_dag_dependencies_controlm)
+    print(f"{'indexed matching':<28} {args.jobs:>8} jobs {seconds:8.2f}s ({len(edges)} edges)")
+
+
+if __name__ == "__main__":
+    main()
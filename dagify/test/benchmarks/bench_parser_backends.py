@@ -0,0 +1,91 @@
+# Copyright 2024 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Benchmark of the XML parser backends on a scaled up Control-M export.
+
+The folders of telus_data/BIL-EXF.DRF.xml are repeated until the export
+reaches the requested size, then load_source (serial, streaming and with
+a pool of workers) and the report helpers are timed with every
+registered backend.
+
+Usage: python -m dagify.test.benchmarks.bench_parser_backends [--scale 50] [--workers 8]
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import re
+import tempfile
+import time
+
+from dagify.converter.utils import (
+    load_source,
+    get_jobtypes_andcount,
+    get_job_info,
+    filter_jobs_by_parameter_in_child,
+)
+from dagify.converter.xml_backend import BACKENDS
+
+SOURCE = os.path.join(os.path.dirname(__file__), "..", "..", "..", "telus_data", "BIL-EXF.DRF.xml")
+
+
+def write_scaled_export(source_path, scale, target):
+    """Writes source_path with its folders repeated scale times to target"""
+    with open(source_path, "rb") as f:
+        content = f.read()
+    body = re.search(rb"(<DEFTABLE[^>]*>)(.*)(</DEFTABLE>)", content, re.S)
+    target.write(content[:body.start(2)])
+    for _ in range(scale):
+        target.write(body.group(2))
+    target.write(content[body.end(2):])
+    target.flush()
+
+
+def timed(function, *args, **kwargs):
+    # The parsers print every unsupported tag, keep that out of the timings
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        function(*args, **kwargs)
+        return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the XML parser backends")
+    parser.add_argument("--scale", type=int, default=50, help="Number of copies of the source folders")
+    parser.add_argument("--source", default=SOURCE, help="Control-M export to scale up")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Processes for parallel parsing")
+    args = parser.parse_args()
+
+    with tempfile.NamedTemporaryFile(suffix=".xml") as export:
+        write_scaled_export(args.source, args.scale, export)
+        size = os.path.getsize(export.name) / (1024 * 1024)
+        print(f"Scaled export: {size:.1f} MB ({args.scale} x {os.path.basename(args.source)})")
+
+        cases = [
+            ("load_source", lambda b: timed(load_source, export.name, "controlm", backend=b)),
+            ("load_source streaming", lambda b: timed(load_source, export.name, "controlm", streaming=True, backend=b)),
+            (f"load_source {args.workers} workers", lambda b: timed(load_source, export.name, "controlm", backend=b, workers=args.workers)),
+            ("get_jobtypes_andcount", lambda b: timed(get_jobtypes_andcount, export.name, backend=b)),
+            ("get_job_info", lambda b: timed(get_job_info, export.name, backend=b)),
+            ("filter_jobs_by_parameter_in_child", lambda b: timed(filter_jobs_by_parameter_in_child, export.name, "CONFIRM", backend=b)),
+        ]
+        print(f"{'case':<36}" + "".join(f"{name:>12}" for name in BACKENDS))
+        for case, run in cases:
+            print(f"{case:<36}" + "".join(f"{run(name):>11.3f}s" for name in BACKENDS))
+
+
+if __name__ == "__main__":
+    main()
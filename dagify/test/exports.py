@@ -0,0 +1,93 @@
+# Copyright 2024 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Small Control-M exports and conversion settings shared by the tests
+converting them end to end.
+"""
+
+import ast
+import os
+import requests
+import yaml
+
+TEMPLATES_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "templates")
+
+CONFIG = """
+config:
+  mappings:
+    - job_type: "Command"
+      template_name: "control-m-command-to-airflow-bash"
+    - job_type: "Dummy"
+      template_name: "control-m-dummy-to-airflow-dummy"
+"""
+TEMPLATE_NAMES = ["control-m-command-to-airflow-bash", "control-m-dummy-to-airflow-dummy"]
+
+JOB = """
+    <JOB JOBNAME="{job}" TASKTYPE="{task_type}" CMDLINE="echo" PARENT_FOLDER="{folder}">
+      {conditions}
+    </JOB>"""
+
+
+def write_config(directory):
+    config_file = os.path.join(directory, "config.yaml")
+    with open(config_file, "w") as config:
+        config.write(CONFIG)
+    return config_file
+
+
+def skip_unless_templates_validate(testcase):
+    """Skips a test converting exports when the templates cannot be validated
+
+    Loading the config validates the documentation links of its templates,
+    which are requested."""
+    for name in TEMPLATE_NAMES:
+        with open(os.path.join(TEMPLATES_PATH, name + ".yaml")) as template:
+            link = yaml.safe_load(template)["target"]["operator"]["docs"]
+        try:
+            reachable = requests.get(link, timeout=10).status_code == 200
+        except requests.exceptions.RequestException:
+            reachable = False
+        if not reachable:
+            testcase.skipTest(f"the documentation link of template {name} is not reachable")
+
+
+def write_export(directory, name, jobs):
+    """Writes an export of jobs given as (folder, job, conditions, task type)"""
+    path = os.path.join(directory, name + ".xml")
+    with open(path, "w") as export:
+        export.write("<DEFTABLE>\n  <SMART_FOLDER FOLDER_NAME=\"SMART\" JOBNAME=\"SMART\">")
+        for folder, job, conditions, task_type in jobs:
+            export.write(JOB.format(folder=folder, job=job, conditions=conditions, task_type=task_type))
+        export.write("\n  </SMART_FOLDER>\n</DEFTABLE>\n")
+    return path
+
+
+def out_condition(name):
+    return f'<OUTCOND NAME="{name}" ODATE="ODAT" SIGN="+" />'
+
+
+def in_condition(name):
+    return f'<INCOND NAME="{name}" ODATE="ODAT" AND_OR="A" />'
+
+
+def get_keyword_values(path, function, keyword):
+    """Returns a keyword argument of the calls to function in a DAG file
+
+    The file is parsed, so a DAG file that is not valid Python fails."""
+    with open(path) as dag_file:
+        tree = ast.parse(dag_file.read())
+    return [node_keyword.value.value for node in ast.walk(tree)
+            if isinstance(node, ast.Call) and getattr(node.func, "id", None) == function
+            for node_keyword in node.keywords if node_keyword.arg == keyword]
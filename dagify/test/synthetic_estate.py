@@ -0,0 +1,75 @@
+# Copyright 2024 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+A synthetic Control-M estate shared by the tests and the benchmarks.
+
+Jobs are spread over folders of FOLDER_SIZE jobs. Every job releases a
+condition that the next job of its folder waits on, and every
+CROSS_FOLDER_EVERY-th job also waits on a job of the previous folder.
+"""
+
+from dagify.converter.uf import (
+    UF,
+    UFTask,
+    UFTaskInCondition,
+    UFTaskOutCondition,
+)
+
+FOLDER_SIZE = 200
+CROSS_FOLDER_EVERY = 50
+
+
+def make_condition(cls, name, sign=None):
+    condition = cls()
+    attributes = {"NAME": name, "ODATE": "ODAT"}
+    if sign is not None:
+        attributes["SIGN"] = sign
+    condition.from_attributes(attributes)
+    return condition
+
+
+def build_estate(jobs):
+    """Builds a Universal Format of jobs chained within their folder"""
+    uf = UF()
+    for index in range(jobs):
+        folder = index // FOLDER_SIZE
+        task = UFTask()
+        task.from_attributes({
+            "JOBNAME": f"JOB-{index}",
+            "PARENT_FOLDER": f"FOLDER-{folder}",
+            "TASKTYPE": "Command",
+        })
+        task.set_dag_name(f"FOLDER-{folder}")
+        task.add_out_condition(make_condition(UFTaskOutCondition, f"JOB-{index}-OK", "+"))
+        task.add_out_condition(make_condition(UFTaskOutCondition, f"JOB-{index - 1}-OK", "-"))
+        if index % FOLDER_SIZE > 0:
+            task.add_in_condition(make_condition(UFTaskInCondition, f"JOB-{index - 1}-OK"))
+        if index % CROSS_FOLDER_EVERY == 0 and folder > 0:
+            task.add_in_condition(make_condition(
+                UFTaskInCondition, f"JOB-{index - FOLDER_SIZE}-OK"))
+        uf.add_task(task)
+    return uf
+
+
+def nested_loop_dependencies(uf):
+    """The matching calculate_dag_dependencies_controlm used to perform"""
+    for task in uf.get_tasks():
+        for out_cond in task.get_out_conditions():
+            if out_cond.get_attribute("SIGN") != "+":
+                continue
+            for obj in uf.get_tasks():
+                for in_cond in obj.get_in_conditions():
+                    if in_cond.get_attribute("NAME") == out_cond.get_attribute("NAME"):
+                        task.add_dependent_task(obj.get_dag_name(), obj.get_attribute("JOBNAME"))
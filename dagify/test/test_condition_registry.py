@@ -0,0 +1,87 @@
+# Copyright 2024 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+from ..converter.condition_registry import ConditionRegistry
+from ..converter.controlm import ControlM
+from .exports import (
+    TEMPLATES_PATH,
+    write_config,
+    skip_unless_templates_validate,
+    write_export,
+    out_condition,
+    in_condition,
+    get_keyword_values,
+)
+
+
+class TestClass(unittest.TestCase):
+    def test_cross_export_conditions(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "conditions.db")
+            registry = ConditionRegistry(path)
+            registry.update_source("BIL", [("BIL_OK", "bil", "load")], [])
+            registry.update_source("OMG", [("OMG_OK", "omg", "start")],
+                                   [("BIL_OK", "omg", "vpop"), ("OMG_OK", "omg", "end")])
+            self.assertEqual(registry.get_upstream_tasks("OMG"),
+                             [("omg", "vpop", "BIL", "bil", "load")])
+            self.assertEqual(registry.get_downstream_tasks("BIL"),
+                             [("bil", "load", "OMG", "omg", "vpop")])
+            # Conditions produced within the export are not matched outside it
+            self.assertEqual(registry.get_downstream_tasks("OMG"), [])
+            registry.close()
+
+            # The registry persists and an export is replaced on its own
+            registry = ConditionRegistry(path)
+            self.assertEqual(registry.get_sources(), ["BIL", "OMG"])
+            registry.update_source("BIL", [("BIL_OK", "bil_2", "load")], [])
+            self.assertEqual(registry.get_upstream_tasks("OMG"),
+                             [("omg", "vpop", "BIL", "bil_2", "load")])
+            registry.remove_source("BIL")
+            self.assertEqual(registry.get_upstream_tasks("OMG"), [])
+            registry.close()
+
+    def test_conditions_across_conversions(self):
+        skip_unless_templates_validate(self)
+        with tempfile.TemporaryDirectory() as tmp:
+            config_file = write_config(tmp)
+            registry = os.path.join(tmp, "conditions.db")
+            output = os.path.join(tmp, "output")
+            export_a = write_export(tmp, "A", [("FA", "Job-A1", out_condition("A1_OK"), "Command")])
+            export_b = write_export(tmp, "B", [("FB", "Job-B1", in_condition("A1_OK"), "Command")])
+
+            def convert(source_path):
+                with contextlib.redirect_stdout(io.StringIO()):
+                    ControlM(source_path=source_path, output_path=output, config_file=config_file,
+                             templates_path=TEMPLATES_PATH, condition_registry=registry)
+
+            # Converting an export again keeps the task names the others refer to
+            convert(export_a)
+            convert(export_b)
+            convert(export_a)
+            dag_a = os.path.join(output, "A", "FA.py")
+            dag_b = os.path.join(output, "B", "FB.py")
+            self.assertEqual(get_keyword_values(dag_b, "ExternalTaskSensor", "external_task_id"), ["job_a1"])
+            self.assertIn("job_a1", get_keyword_values(dag_a, "BashOperator", "task_id"))
+            self.assertEqual(get_keyword_values(dag_a, "ExternalTaskMarker", "external_task_id"), ["job_b1"])
+            self.assertIn("job_b1", get_keyword_values(dag_b, "BashOperator", "task_id"))
+
+            # Task names with a random suffix would change on every run
+            export_c = write_export(tmp, "C", [("FC", "Job-C1", out_condition("A1_OK"), "Dummy")])
+            with self.assertRaises(ValueError):
+                convert(export_c)
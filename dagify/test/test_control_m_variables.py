@@ -0,0 +1,42 @@
+# Copyright 2024 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+from ..converter.control_m_variables import Text, Variable, get_variable_declarations, parse_variables, to_fstring
+from ..converter.rules import env_var_to_python
+
+
+class TestClass(unittest.TestCase):
+    def test_parse_variables(self):
+        self.assertEqual(parse_variables("echo hello"), (Text("echo hello"),))
+        self.assertEqual(parse_variables("%%A and %%AB"), (Variable("A"), Text(" and "), Variable("AB")))
+        # A period followed by text is the concatenation operator
+        self.assertEqual(parse_variables("%%APP_HOME.bin/run.sh"), (Variable("APP_HOME"), Text("bin/run.sh")))
+        self.assertEqual(parse_variables("%%A.%%B"), (Variable("A"), Variable("B")))
+        # A trailing period is kept, unless after a _PREFIX variable
+        self.assertEqual(parse_variables("cd %%DIR."), (Text("cd "), Variable("DIR"), Text(".")))
+        self.assertEqual(parse_variables("%%G_PREFIX. x"), (Variable("G_PREFIX"), Text(" x")))
+        # %%\ is a literal %% and a lone %% is text
+        self.assertEqual(parse_variables("100%%\\ %% done"), (Text("100%% %% done"),))
+
+    def test_outputs(self):
+        nodes = parse_variables("%%G_HOME_PREFIX.%%APP/bin -o %%ORDERID")
+        self.assertEqual(to_fstring(nodes), "{g_home_prefix}{app}/bin -o {orderid}")
+        self.assertEqual(get_variable_declarations(nodes), [
+            {"env_var": "G_HOME_PREFIX", "python_var": "g_home_prefix"},
+            {"env_var": "APP", "python_var": "app"},
+            {"env_var": "ORDERID", "python_var": "orderid"},
+        ])
+        self.assertEqual(env_var_to_python("%%A.b"), "{a}b")
+        self.assertEqual(env_var_to_python("plain"), "plain")
@@ -13,6 +13,8 @@
 # limitations under the License.
 
 import unittest
+from types import SimpleNamespace
+from ..converter.engine import compile_template_index, get_template_name
 
 
 class TestClass(unittest.TestCase):
@@ -27,6 +29,22 @@ class TestClass(unittest.TestCase):
     # Test Control-M with Mixed Cases No Hyphen
         # con = new_converter(converter_type="cOnTroLm")
 
+    def test_template_name_resolution(self):
+        converter = SimpleNamespace(config={"config": {"mappings": [
+            {"job_type": "COMMAND", "template_name": "bash"},
+            {"appl_type": "FileWatch", "template_name": "dummy"},
+            {"appl_type": "SAP", "template_name": "sap"},
+            {"job_type": "COMMAND", "template_name": "ssh"},
+        ]}})
+        compile_template_index(converter)
+        # job_type mappings match first, the first mapping of a type wins
+        self.assertEqual(get_template_name(converter, "Command", "FileWatch"), "bash")
+        # Jobs of the same type resolve with their own appl_type
+        self.assertEqual(get_template_name(converter, "Job", "FileWatch"), "dummy")
+        self.assertEqual(get_template_name(converter, "Job", "SAP"), "sap")
+        self.assertIsNone(get_template_name(converter, "Job", None))
+        self.assertEqual(len(converter.template_names), 4)
+
 
 if __name__ == '__main__':
     unittest.main()
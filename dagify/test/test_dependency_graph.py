@@ -0,0 +1,61 @@
+# Copyright 2024 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+from ..converter.dependency_graph import DependencyGraph
+from .synthetic_estate import (
+    FOLDER_SIZE,
+    CROSS_FOLDER_EVERY,
+    build_estate,
+)
+
+
+class TestClass(unittest.TestCase):
+    def setUp(self):
+        uf = build_estate(3 * FOLDER_SIZE)
+        uf.calculate_dag_dependencies_controlm()
+        self.graph = DependencyGraph(uf, "PARENT_FOLDER", "JOBNAME")
+
+    def test_adjacency(self):
+        graph = self.graph
+        self.assertEqual(graph.get_task_count(), 3 * FOLDER_SIZE)
+        self.assertEqual(graph.get_dividers(), ["FOLDER-0", "FOLDER-1", "FOLDER-2"])
+        self.assertEqual(graph.get_tasks("FOLDER-1"), list(range(FOLDER_SIZE, 2 * FOLDER_SIZE)))
+        self.assertEqual(graph.get_task_id("JOB-5"), 5)
+        # Job 0 releases job 1 and, across folders, job 200
+        self.assertEqual(list(graph.get_downstream(0)), [1, FOLDER_SIZE])
+        self.assertEqual(list(graph.get_downstream(3 * FOLDER_SIZE - 1)), [])
+
+    def test_divider_split(self):
+        graph = self.graph
+        internal = graph.get_internal_dependencies("FOLDER-1")
+        self.assertEqual(len(internal), FOLDER_SIZE - 1)
+        self.assertEqual(internal[0], (FOLDER_SIZE, [FOLDER_SIZE + 1]))
+
+        cross_folder = FOLDER_SIZE // CROSS_FOLDER_EVERY
+        self.assertEqual(len(graph.get_external_dependencies("FOLDER-1")), cross_folder)
+        self.assertEqual(graph.get_external_dependencies("FOLDER-2"), [])
+        upstream = graph.get_upstream_dependencies("FOLDER-1")
+        self.assertEqual(upstream, graph.get_external_dependencies("FOLDER-0"))
+        self.assertEqual(upstream[0], (0, FOLDER_SIZE))
+        self.assertEqual(graph.get_upstream_dependencies("FOLDER-0"), [])
+        self.assertEqual(
+            graph.get_edge_count(),
+            sum(len(downstream) for divider in graph.get_dividers()
+                for _, downstream in graph.get_internal_dependencies(divider))
+            + sum(len(graph.get_external_dependencies(divider)) for divider in graph.get_dividers()))
+
+
+if __name__ == '__main__':
+    unittest.main()
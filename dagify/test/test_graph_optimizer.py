@@ -0,0 +1,127 @@
+# Copyright 2024 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import random
+import unittest
+from ..converter.uf import UF, UFTask
+from ..converter.dependency_graph import DependencyGraph
+from ..converter.graph_optimizer import (
+    compact_dependency_statements,
+    find_cycles,
+    format_cycle_report,
+    reduce_dependencies,
+)
+
+
+def build_graph(folders, edges):
+    """Builds the graph of tasks by folder and (task, downstream task) edges"""
+    uf = UF()
+    folder_of = {}
+    for folder, names in folders.items():
+        for name in names:
+            task = UFTask()
+            attributes = {"JOBNAME": name}
+            if folder is not None:
+                attributes["PARENT_FOLDER"] = folder
+            task.from_attributes(attributes)
+            uf.add_task(task)
+            folder_of[name] = folder
+    for name, dep in edges:
+        uf.get_task_by_attr("JOBNAME", name).add_dependent_task(folder_of[dep], dep)
+    return DependencyGraph(uf, "PARENT_FOLDER", "JOBNAME")
+
+
+def closure(graph):
+    reachable = {}
+    for task_id in range(graph.get_task_count()):
+        seen = set()
+        stack = list(graph.get_downstream(task_id))
+        while stack:
+            target = stack.pop()
+            if target not in seen:
+                seen.add(target)
+                stack.extend(graph.get_downstream(target))
+        reachable[task_id] = seen
+    return reachable
+
+
+def edge_names(graph):
+    return sorted((graph.get_name(source), graph.get_name(target))
+                  for _, source, target in graph.get_edges())
+
+
+class TestClass(unittest.TestCase):
+    def test_reduction_keeps_reachability(self):
+        rng = random.Random(7)
+        names = [f"t{index}" for index in range(60)]
+        edges = {(names[a], names[b]) for a, b in
+                 (sorted(rng.sample(range(60), 2)) for _ in range(400))}
+        graph = build_graph({"A": names[:30], "B": names[30:]}, sorted(edges))
+        expected = closure(graph)
+        removed = reduce_dependencies(graph, "global")
+        self.assertGreater(removed, 0)
+        self.assertEqual(graph.get_edge_count(), len(edges) - removed)
+        self.assertEqual(closure(graph), expected)
+        # A minimal graph has nothing left to remove
+        self.assertEqual(reduce_dependencies(graph, "global"), 0)
+
+    def test_reduction_scope(self):
+        folders = {"A": ["a1", "a2", "a3"], "B": ["b1"]}
+        edges = [("a1", "a2"), ("a2", "a3"), ("a1", "a3"), ("a1", "b1"), ("b1", "a3")]
+        graph = build_graph(folders, edges)
+        self.assertEqual(reduce_dependencies(graph, "dag"), 1)
+        self.assertEqual(edge_names(graph), [("a1", "a2"), ("a1", "b1"), ("a2", "a3"), ("b1", "a3")])
+
+        # Only the global scope follows the path through b1
+        graph = build_graph(folders, [("a1", "a3"), ("a1", "b1"), ("b1", "a3")])
+        self.assertEqual(reduce_dependencies(graph, "dag"), 0)
+        self.assertEqual(reduce_dependencies(graph, "global"), 1)
+        self.assertEqual(graph.get_internal_dependencies("A"), [])
+        with self.assertRaises(ValueError):
+            reduce_dependencies(graph, "folder")
+
+    def test_cycles_reported(self):
+        folders = {"A": ["a1", "a2", "a3", "a4"], "B": ["b1"]}
+        edges = [("a1", "a2"), ("a2", "b1"), ("b1", "a1"), ("a3", "a3"), ("a3", "a4")]
+        graph = build_graph(folders, edges)
+        cycles = find_cycles(graph)
+        self.assertEqual(format_cycle_report(graph, cycles), "\n".join([
+            "Found 2 dependency cycle(s):",
+            "  1. A.a1 -> A.a2 -> B.b1 -> A.a1",
+            "  2. A.a3 -> A.a3",
+        ]))
+        # Edges within a cycle are kept by the reduction
+        self.assertEqual(reduce_dependencies(graph, "global"), 0)
+
+    def test_compact_statements(self):
+        folders = {"A": ["s1", "s2", "s3", "f1", "f2", "f3", "j", "x1", "x2", "y1", "y2"]}
+        edges = [("s1", "s2"), ("s2", "s3"),
+                 ("f1", "j"), ("f2", "j"), ("f3", "j"),
+                 ("x1", "y1"), ("x1", "y2"), ("x2", "y1"), ("x2", "y2")]
+        graph = build_graph(folders, edges)
+        statements, helpers = compact_dependency_statements(graph, "A")
+        self.assertEqual(statements, [
+            "chain(s1, s2, s3)",
+            "[f1, f2, f3] >> j",
+            "cross_downstream([x1, x2], [y1, y2])",
+        ])
+        self.assertEqual(helpers, ["chain", "cross_downstream"])
+
+        # Tasks in a cycle do not start a chain
+        graph = build_graph({"A": ["c1", "c2"]}, [("c1", "c2"), ("c2", "c1")])
+        self.assertEqual(compact_dependency_statements(graph, "A"), (["c1 >> [c2]", "c2 >> [c1]"], []))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+# Copyright 2024 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import tempfile
+import unittest
+from ..converter.lookup_tables import (
+    get_lookup_table,
+    clear_lookup_tables,
+    LookupTable,
+)
+from ..converter.rules import RuleChain
+
+HOSTS = "hostname,queue,account\nhost-1,tol8,svc-a\nhost-2,\"kidc,2\",svc-b\nhost-1,lidc,svc-c\n"
+
+
+class TestClass(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "hosts.csv")
+        with open(self.path, mode="w", encoding="utf-8") as lookup_file:
+            lookup_file.write(HOSTS)
+
+    def tearDown(self):
+        clear_lookup_tables()
+        self.tmp.cleanup()
+
+    def test_lookup_table(self):
+        for use_mmap in (False, True):
+            table = LookupTable(self.path, use_mmap=use_mmap)
+            # The first row of a key wins
+            self.assertEqual(table.lookup("host-1", "queue"), "tol8")
+            self.assertEqual(table.lookup("host-2", "queue"), "kidc,2")
+            self.assertIsNone(table.lookup("host-3", "queue"))
+            table.close()
+        table = LookupTable(self.path, key_column="account")
+        self.assertEqual(table.lookup("svc-c", "queue"), "lidc")
+        with self.assertRaises(ValueError):
+            table.lookup("svc-c", "missing")
+
+    def test_lookup_replace_rule(self):
+        chain = RuleChain([{"rule": "lookup_replace", "args": [self.path, "account"]}])
+        self.assertEqual(chain.apply_column(["host-2", "host-3"]), ["svc-b", "host-3"])
+        table = get_lookup_table(self.path)
+        self.assertIs(get_lookup_table(self.path), table)
+
+        # A changed file is loaded again when the next column is converted
+        with open(self.path, mode="a", encoding="utf-8") as lookup_file:
+            lookup_file.write("host-3,qidc,svc-d\n")
+        self.assertIs(get_lookup_table(self.path), table)
+        self.assertEqual(chain.apply_column(["host-3"]), ["svc-d"])
+        self.assertIsNot(get_lookup_table(self.path), table)
@@ -0,0 +1,158 @@
+# Copyright 2024 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import pickle
+import shutil
+import tempfile
+import unittest
+from ..converter.utils import (
+    load_source,
+    get_jobtypes_andcount,
+    get_job_info,
+    filter_jobs_by_parameter_in_child,
+)
+from ..converter.xml_backend import BACKENDS, get_backend
+from ..converter.xml_scanner import split_top_level
+
+TEST_DATA = os.path.join(os.path.dirname(__file__), "integration", "test_data")
+TELUS_DATA = os.path.join(os.path.dirname(__file__), "..", "..", "telus_data")
+SOURCES = [
+    os.path.join(TEST_DATA, "011-fast-x.xml"),
+    os.path.join(TEST_DATA, "012-fast-x.xml"),
+    os.path.join(TELUS_DATA, "BIL-EXF.DRF.xml"),
+]
+
+
+def summarize(uf):
+    """Flatten a universal format into comparable tuples"""
+    def attrs(obj):
+        return sorted(obj.get_attributes().items())
+    return [
+        (
+            attrs(task),
+            [attrs(v) for v in task.get_variables()],
+            [attrs(c) for c in task.get_in_conditions()],
+            [attrs(c) for c in task.get_out_conditions()],
+        )
+        for task in uf.get_tasks()
+    ]
+
+
+class TestClass(unittest.TestCase):
+    def test_streaming_matches_dom(self):
+        for source in SOURCES:
+            dom = load_source(source, "controlm")
+            for backend in BACKENDS:
+                stream = load_source(source, "controlm", streaming=True, backend=backend)
+                self.assertEqual(summarize(stream), summarize(dom), source)
+
+    def test_backends_match(self):
+        for source in SOURCES:
+            expected = summarize(load_source(source, "controlm", backend="etree"))
+            self.assertEqual(summarize(load_source(source, "controlm", backend="lxml")), expected)
+
+    def test_backend_helpers_match(self):
+        for source in SOURCES:
+            for function, args in [
+                (get_jobtypes_andcount, ()),
+                (get_job_info, ()),
+                (filter_jobs_by_parameter_in_child, ("CONFIRM",)),
+                (filter_jobs_by_parameter_in_child, ("NAME", "INCOND")),
+            ]:
+                etree_result = function(source, *args, backend="etree")
+                lxml_result = function(source, *args, backend="lxml")
+                if function is get_jobtypes_andcount:
+                    etree_result = sorted(etree_result[0]), etree_result[1]
+                    lxml_result = sorted(lxml_result[0]), lxml_result[1]
+                self.assertEqual(lxml_result, etree_result, function.__name__)
+
+    def test_unknown_backend(self):
+        with self.assertRaises(ValueError):
+            get_backend("sax")
+
+    def test_streaming_releases_elements(self):
+        uf = load_source(SOURCES[0], "controlm", streaming=True)
+        for task in uf.get_tasks():
+            self.assertIsNone(task.get_raw_xml())
+            for variable in task.get_variables():
+                self.assertIsNone(variable.get_raw_xml())
+
+    def test_parallel_matches_dom(self):
+        for source in SOURCES:
+            dom = load_source(source, "controlm")
+            parallel = load_source(source, "controlm", workers=2)
+            self.assertEqual(summarize(parallel), summarize(dom), source)
+
+    def test_split_top_level(self):
+        content = (b'<?xml version="1.0"?>\n<DEFTABLE>\n'
+                   b'  <FOLDER NAME="a"><JOB CMDLINE="x > y"/></FOLDER>\n'
+                   b'  <!-- <FOLDER> -->\n'
+                   b'  <SMART_FOLDER NAME="b"><SUB_FOLDER/></SMART_FOLDER>\n'
+                   b'  <FOLDER NAME="c"/>\n'
+                   b'</DEFTABLE>\n')
+        body_start, body_end, chunks = split_top_level(content, [b"FOLDER", b"SMART_FOLDER"])
+        self.assertEqual(content[body_start:body_end].strip(), b"".join(
+            content[start:end] for start, end in chunks).strip())
+        folders = [content[start:end] for start, end in chunks if content[start:end].startswith(b"<")]
+        self.assertEqual(folders, [
+            b'<FOLDER NAME="a"><JOB CMDLINE="x > y"/></FOLDER>',
+            b'<SMART_FOLDER NAME="b"><SUB_FOLDER/></SMART_FOLDER>',
+            b'<FOLDER NAME="c"/>',
+        ])
+
+    def test_source_spans_match(self):
+        for source in SOURCES:
+            expected = [task.get_output_raw_xml()
+                        for task in load_source(source, "controlm").get_tasks()]
+            self.assertTrue(expected[0].startswith("<JOB"))
+            for options in [{"streaming": True}, {"workers": 2}]:
+                uf = load_source(source, "controlm", **options)
+                self.assertEqual(
+                    [task.get_output_raw_xml() for task in uf.get_tasks()], expected, options)
+
+    def test_source_spans_pickle(self):
+        tasks = load_source(SOURCES[2], "controlm").get_tasks()
+        task = next(task for task in tasks if task.get_variables())
+        self.assertIsNone(task.get_raw_xml())
+        variable = task.get_variables()[0]
+        self.assertTrue(variable.get_source_xml().startswith("<VARIABLE"))
+        copy = pickle.loads(pickle.dumps(task))
+        self.assertIs(copy.source_document, task.source_document)
+        self.assertEqual(copy.get_output_raw_xml(), task.get_output_raw_xml())
+
+    def test_source_spans_changed_file(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            source = os.path.join(tmp, "source.xml")
+            shutil.copyfile(SOURCES[0], source)
+            task = load_source(source, "controlm").get_tasks()[0]
+            self.assertTrue(task.get_output_raw_xml().startswith("<JOB"))
+            size = os.path.getsize(source)
+            # Rewritten with the same size, then truncated
+            with open(source, "wb") as f:
+                f.write(b"x" * size)
+            with self.assertRaises(ValueError):
+                task.get_output_raw_xml()
+            with open(source, "wb") as f:
+                f.write(b"x")
+            with self.assertRaises(ValueError):
+                task.get_output_raw_xml()
+
+    def test_streaming_unsupported_tool(self):
+        with self.assertRaises(ValueError):
+            load_source(SOURCES[0], "automic", streaming=True)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+# Copyright 2024 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+from ..converter.partitioner import (
+    count_cross_dag_edges,
+    format_partition_report,
+    partition_tasks,
+    split_dags,
+)
+from .test_graph_optimizer import build_graph
+
+
+class TestClass(unittest.TestCase):
+    def test_split_cluster_merged(self):
+        # A chain of jobs with its last two jobs in another folder
+        folders = {"A": ["a1", "a2", "a3"], "B": ["b1", "b2"], "C": ["c1"]}
+        edges = [("a1", "a2"), ("a2", "a3"), ("a3", "b1"), ("b1", "b2")]
+        graph = build_graph(folders, edges)
+        labels = partition_tasks(graph, max_dag_size=5)
+        self.assertEqual(labels, ["A", "A", "A", "A", "A", "C"])
+        self.assertEqual(count_cross_dag_edges(graph, labels), 0)
+        self.assertEqual(format_partition_report(graph, labels), "\n".join([
+            "Cross DAG dependencies: 1 before partitioning, 0 after",
+            "Sensors saved: 1",
+            "Tasks moved: 2",
+            "  b1: B -> A",
+            "  b2: B -> A",
+        ]))
+
+    def test_max_dag_size(self):
+        folders = {"A": ["a1", "a2", "a3"], "B": ["b1", "b2"]}
+        edges = [("a1", "a2"), ("a2", "a3"), ("a3", "b1"), ("b1", "b2"), ("a1", "b1")]
+        graph = build_graph(folders, edges)
+        # The cluster does not fit, b1 alone still saves two dependencies
+        labels = partition_tasks(graph, max_dag_size=4)
+        self.assertEqual(labels, ["A", "A", "A", "A", "B"])
+        self.assertEqual(count_cross_dag_edges(graph, labels), 1)
+        self.assertEqual(partition_tasks(graph, max_dag_size=3), ["A", "A", "A", "B", "B"])
+
+    def test_default_max_dag_size(self):
+        # A chain across three folders is not merged into one DAG larger than any folder
+        folders = {"A": ["a1", "a2"], "B": ["b1", "b2"], "C": ["c1", "c2"]}
+        edges = [("a1", "a2"), ("a2", "b1"), ("b1", "b2"), ("b2", "c1"), ("c1", "c2")]
+        graph = build_graph(folders, edges)
+        labels = partition_tasks(graph)
+        self.assertEqual(labels, ["A", "A", "B", "B", "C", "C"])
+        self.assertEqual(partition_tasks(graph, max_dag_size=6), ["A"] * 6)
+
+    def test_unrendered_tasks_kept(self):
+        graph = build_graph({"A": ["a1"], None: ["n1"]}, [("a1", "n1")])
+        self.assertEqual(partition_tasks(graph), ["A", None])
+
+    def test_split_by_components(self):
+        folders = {"A": ["a1", "a2", "a3", "a4", "a5", "a6"], "B": ["b1"]}
+        edges = [("a1", "a2"), ("a3", "a4"), ("a4", "a5"), ("a5", "a6"), ("a2", "b1")]
+        graph = build_graph(folders, edges)
+        labels = [graph.get_divider(task_id) for task_id in range(graph.get_task_count())]
+        self.assertEqual(split_dags(graph, labels, 4), ["A_1", "A_1", "A_2", "A_2", "A_2", "A_2", "B"])
+        # a3 to a6 no longer fit in a DAG and are cut along their layers
+        self.assertEqual(split_dags(graph, labels, 3), ["A_1", "A_1", "A_2", "A_2", "A_2", "A_3", "B"])
+        # Groups fill the first DAG with room for them
+        self.assertEqual(split_dags(graph, labels, 5), ["A_1", "A_1", "A_2", "A_2", "A_2", "A_2", "B"])
+        graph = build_graph({"A": ["a1", "a2", "a3", "a4", "a5"]}, [("a1", "a2"), ("a2", "a3")])
+        self.assertEqual(split_dags(graph, ["A"] * 5, 4), ["A_1", "A_1", "A_1", "A_1", "A_2"])
+
+    def test_split_by_layers(self):
+        folders = {"A": ["a1", "a2", "a3", "a4", "a5"]}
+        edges = [("a4", "a1"), ("a1", "a2"), ("a5", "a3"), ("a3", "a3")]
+        graph = build_graph(folders, edges)
+        labels = split_dags(graph, ["A"] * 5, 2, mode="layers")
+        # Layers a4 a5, a1 a3, a2: parts only depend on earlier parts
+        self.assertEqual(labels, ["A_2", "A_3", "A_2", "A_1", "A_1"])
+        for _, source, target in graph.get_edges():
+            self.assertLessEqual(labels[source], labels[target])
+        with self.assertRaises(ValueError):
+            split_dags(graph, labels, 2, mode="folders")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,46 @@
+# Copyright 2024 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+from ..converter.engine import add_priority_arguments
+from ..converter.priorities import compute_priority_weights
+
+
+class TestClass(unittest.TestCase):
+    def test_critical_path_weights(self):
+        # 0 -> 1 -> 3 and 0 -> 2 -> 3 -> 4, 5 has no dependencies
+        edges = [(0, 1), (0, 2), (1, 3), (2, 3), (3, 4)]
+        # Path of 4 tasks and 4 tasks downstream for task 0
+        self.assertEqual(compute_priority_weights(6, edges), [8, 5, 5, 3, 1, 1])
+
+    def test_cycles_and_critical_tasks(self):
+        # 0 and 1 wait on each other and release 2
+        edges = [(0, 1), (1, 0), (1, 2)]
+        self.assertEqual(compute_priority_weights(4, edges), [5, 5, 1, 1])
+        # Critical tasks are boosted above the heaviest task
+        self.assertEqual(compute_priority_weights(4, edges, critical=[3]), [5, 5, 1, 6])
+
+    def test_add_priority_arguments(self):
+        structure = '{task_id} = DummyOperator(\n  task_id="{task_id}",\n  dag=dag,\n)\n'
+        self.assertEqual(
+            add_priority_arguments(structure).format(task_id="t", priority_weight=3, weight_rule="absolute"),
+            't = DummyOperator(\n  task_id="t",\n  dag=dag,\n  priority_weight=3,\n  weight_rule="absolute",\n)\n')
+        self.assertEqual(
+            add_priority_arguments("{task_id} = DummyOperator(task_id='{task_id}')").format(
+                task_id="t", priority_weight=3, weight_rule="absolute"),
+            "t = DummyOperator(task_id='t', priority_weight=3, weight_rule=\"absolute\")")
+
+
+if __name__ == '__main__':
+    unittest.main()
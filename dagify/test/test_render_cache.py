@@ -0,0 +1,91 @@
+# Copyright 2024 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import sqlite3
+import tempfile
+import unittest
+from ..converter.engine import compile_template
+from ..converter.render_cache import RENDER_CACHE_FILE, RenderCache, get_render_key
+
+
+def make_template(rules):
+    return {
+        "metadata": {"name": "bash"},
+        "structure": "{task_id} = BashOperator(task_id='{task_id}')",
+        "mappings": [{"source": "JOBNAME", "target": "task_id", "rules": rules}],
+    }
+
+
+class TestClass(unittest.TestCase):
+    def test_template_hash(self):
+        template = make_template([{"rule": "python_variable_safe"}])
+        compile_template(template)
+        content_hash = template["content_hash"]
+        self.assertTrue(template["cacheable"])
+        # Compiling again hashes the loaded content only
+        compile_template(template)
+        self.assertEqual(template["content_hash"], content_hash)
+        other = make_template([{"rule": "lowercase"}])
+        compile_template(other)
+        self.assertNotEqual(other["content_hash"], content_hash)
+        # Random suffixes must not be served again
+        unique = make_template([{"rule": "make_unique"}])
+        compile_template(unique)
+        self.assertFalse(unique["cacheable"])
+
+    def test_render_cache(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            key = get_render_key("hash", ["JOB-1", None, ["A"], None])
+            self.assertNotEqual(key, get_render_key("hash", ["JOB-2", None, ["A"], None]))
+            render = {"output": "job_1 = ...", "env_vars": [], "attributes": [["JOBNAME", "job_1"]]}
+            cache = RenderCache(tmp)
+            self.assertEqual(cache.get_many([key]), {})
+            cache.store_many([(key, render)])
+            cache.close()
+
+            cache = RenderCache(tmp)
+            self.assertEqual(cache.get_many([key, "missing"]), {key: render})
+            cache.close()
+
+    def test_render_cache_trimmed(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            renders = [(f"key-{number}", {"output": "x" * 1000}) for number in range(10)]
+            # Room for about four renders in a quarter of the cache size
+            cache = RenderCache(tmp, 4 * 4 * 1100)
+            cache.store_many(renders[:5])
+            cache.close()
+            cache = RenderCache(tmp, 4 * 4 * 1100)
+            self.assertEqual(len(cache.get_many([key for key, _ in renders])), 4)
+            # Renders served again are the last ones removed
+            cache.get_many(["key-1"])
+            cache.store_many(renders[5:8])
+            cache.close()
+            cache = RenderCache(tmp, 4 * 4 * 1100)
+            self.assertEqual(sorted(cache.get_many([key for key, _ in renders])),
+                             ["key-1", "key-5", "key-6", "key-7"])
+            cache.close()
+
+    def test_render_cache_without_use_times(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            connection = sqlite3.connect(os.path.join(tmp, RENDER_CACHE_FILE))
+            with connection:
+                connection.execute("CREATE TABLE renders (key TEXT PRIMARY KEY, render TEXT NOT NULL)")
+                connection.execute("INSERT INTO renders VALUES ('key', '{}')")
+            connection.close()
+            cache = RenderCache(tmp)
+            self.assertEqual(cache.get_many(["key"]), {})
+            cache.store_many([("key", {})])
+            self.assertEqual(cache.get_many(["key"]), {"key": {}})
+            cache.close()
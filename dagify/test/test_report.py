@@ -0,0 +1,73 @@
+# Copyright 2024 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import contextlib
+import io
+import json
+import os
+import tempfile
+import unittest
+from ..converter.report_generator import Report
+
+CONFIG = """
+config:
+  mappings:
+    - job_type: "Command"
+      template_name: "control-m-command-to-airflow-bash"
+"""
+
+# Jobs of sub folders are not parsed into the Universal Format, so they are
+# neither converted nor counted by the report
+SOURCE = """<DEFTABLE>
+  <SMART_FOLDER FOLDER_NAME="F" JOBNAME="F">
+    <JOB JOBNAME="Job-1" TASKTYPE="Command" CMDLINE="echo" PARENT_FOLDER="F" CONFIRM="1"/>
+    <JOB JOBNAME="Job-2" TASKTYPE="Dummy" PARENT_FOLDER="F"/>
+    <SUB_FOLDER JOBNAME="S" PARENT_FOLDER="F">
+      <JOB JOBNAME="Job-3" TASKTYPE="Command" CMDLINE="echo" PARENT_FOLDER="F/S"/>
+    </SUB_FOLDER>
+  </SMART_FOLDER>
+</DEFTABLE>
+"""
+
+
+class TestClass(unittest.TestCase):
+    def test_report_counts(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            config_file = os.path.join(tmp, "config.yaml")
+            source = os.path.join(tmp, "source.xml")
+            with open(config_file, "w") as config:
+                config.write(CONFIG)
+            with open(source, "w") as source_file:
+                source_file.write(SOURCE)
+            with contextlib.redirect_stdout(io.StringIO()):
+                Report(source_path=source, output_path=tmp, config_file=config_file)
+            with open(os.path.join(tmp, "source", "report.json")) as report_file:
+                report = json.load(report_file)
+
+        self.assertEqual(report["High_Level_Info"], [
+            "Job Types Converted: 1/2",
+            "Percentage of Job Types Converted: 50.0%",
+            "Percentage of Job Types not Converted: 50.0%",
+            "Jobs Converted: 1/2",
+            "Percentage of Jobs Converted: 50.0%",
+            "Percentage of Jobs not Converted: 50.0%",
+        ])
+        rows = {row["TASK"]: (row["INFO"], row["COUNT"]) for row in report["Job_info_table"]["rows"]}
+        self.assertEqual(rows["Jobs Converted"], ("Job-1", 1))
+        self.assertEqual(rows["Jobs not Converted"], ("Job-2", 1))
+        self.assertEqual(rows["Jobs Requiring Manual Approval"], ("Job-1", 1))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,42 @@
+# Copyright 2024 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+from ..converter.rules import Rule, RuleChain
+
+
+class TestClass(unittest.TestCase):
+    def test_rule_chain(self):
+        chain = RuleChain([
+            {"rule": "python_variable_safe"},
+            {"rule": "prefix", "args": ["dag"]},
+            {"rule": "escape_quotes"},
+        ])
+        self.assertTrue(chain.deterministic)
+        self.assertEqual(chain("Job-1 Load.Daily"), "dag_job_1_load_daily")
+        self.assertEqual(RuleChain([{"rule": "escape_quotes"}])("""echo 'a' "b" `c`"""),
+                         """echo \\'a\\' \\"b\\" \\`c\\`""")
+        # Unknown rules leave the value unchanged, as Rule.run does
+        self.assertEqual(RuleChain([{"rule": "unknown"}])("x"), "x")
+        self.assertEqual(Rule().run(["suffix", "job", "v2"]), "job_v2")
+
+    def test_apply_column(self):
+        chain = RuleChain([{"rule": "lowercase"}, {"rule": "replace", "args": ["-", "_"]}])
+        self.assertEqual(chain.apply_column(["A-B", "C", "A-B"]), ["a_b", "c", "a_b"])
+        self.assertEqual(RuleChain().apply_column(["A", None]), ["A", None])
+        # Nondeterministic rules run once per value
+        unique = RuleChain([{"rule": "make_unique"}])
+        self.assertFalse(unique.deterministic)
+        first, second = unique.apply_column(["job", "job"])
+        self.assertTrue(first.startswith("job_") and second.startswith("job_"))
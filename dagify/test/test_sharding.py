@@ -0,0 +1,111 @@
+# Copyright 2024 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+from ..converter.controlm import ControlM
+from ..converter.sharding import (
+    assign_shards,
+    build_shard_plan,
+    write_shard_plan,
+    load_shard_plan,
+    get_shard_positions,
+    get_shard_dependencies,
+)
+from .synthetic_estate import (
+    FOLDER_SIZE,
+    build_estate,
+)
+from .exports import (
+    TEMPLATES_PATH,
+    write_config,
+    skip_unless_templates_validate,
+    write_export,
+    out_condition,
+    in_condition,
+    get_keyword_values,
+)
+
+
+class TestClass(unittest.TestCase):
+    def test_assign_shards(self):
+        sizes = {"a": 5, "b": 20, "c": 10, "d": 10}
+        # Largest first into the emptiest shard, 25 and 20 tasks
+        self.assertEqual(assign_shards(sizes, 2), [["a", "b"], ["c", "d"]])
+        self.assertEqual(assign_shards(sizes, 5), [["b"], ["c"], ["d"], ["a"], []])
+        with self.assertRaises(ValueError):
+            assign_shards(sizes, 0)
+
+    def test_shard_plan(self):
+        uf = build_estate(3 * FOLDER_SIZE)
+        task_ids = [f"job_{n}" for n in range(3 * FOLDER_SIZE)]
+        plan = build_shard_plan(uf, "estate", "PARENT_FOLDER", "JOBNAME", task_ids, 2)
+        self.assertEqual(plan["shards"], [["FOLDER-0", "FOLDER-2"], ["FOLDER-1"]])
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "plan.json")
+            write_shard_plan(plan, path)
+            self.assertEqual(load_shard_plan(path), plan)
+
+        positions = get_shard_positions(plan, 1, uf)
+        self.assertEqual(positions, list(range(FOLDER_SIZE, 2 * FOLDER_SIZE)))
+        overlay = uf.create_overlay(positions)
+        self.assertEqual(overlay.get_tasks()[0].get_attribute("JOBNAME"), "JOB-200")
+        with self.assertRaises(ValueError):
+            get_shard_positions(plan, 1, build_estate(FOLDER_SIZE))
+
+        # Every 50th job of a folder waits on a job of the previous folder,
+        # tasks of the shard by position and the others by task id
+        upstream, downstream = get_shard_dependencies(plan, 1)
+        self.assertEqual(upstream, [(200 + n, "FOLDER-0", f"job_{n}") for n in range(0, 200, 50)])
+        self.assertEqual(downstream, [(200 + n, "FOLDER-2", f"job_{400 + n}") for n in range(0, 200, 50)])
+        # Dependencies between folders of the same shard are not repeated
+        upstream, downstream = get_shard_dependencies(plan, 0)
+        self.assertEqual(upstream[0], (400, "FOLDER-1", "job_200"))
+        self.assertEqual(len(upstream) + len(downstream), 8)
+
+    def test_sharded_conversion(self):
+        skip_unless_templates_validate(self)
+        with tempfile.TemporaryDirectory() as tmp:
+            config_file = write_config(tmp)
+            plan_path = os.path.join(tmp, "plan.json")
+            output = os.path.join(tmp, "output")
+            source = write_export(tmp, "estate", [
+                ("FA", "Job-A1", out_condition("A1_OK"), "Command"),
+                ("FB", "Job-B1", in_condition("A1_OK"), "Command"),
+            ])
+
+            def convert(**options):
+                with contextlib.redirect_stdout(io.StringIO()):
+                    ControlM(source_path=source, output_path=output, config_file=config_file,
+                             templates_path=TEMPLATES_PATH, shard_plan=plan_path, **options)
+
+            convert(plan_shards=2)
+            self.assertEqual(load_shard_plan(plan_path)["tasks"][0][:3], ["Job-A1", "job_a1", "FA"])
+            convert(shard=0)
+            convert(shard=1)
+            # Both sides are named by the task ids their shard converted them to
+            dag_a = os.path.join(output, "estate", "FA.py")
+            dag_b = os.path.join(output, "estate", "FB.py")
+            self.assertEqual(get_keyword_values(dag_b, "ExternalTaskSensor", "external_task_id"), ["job_a1"])
+            self.assertIn("job_a1", get_keyword_values(dag_a, "BashOperator", "task_id"))
+            self.assertEqual(get_keyword_values(dag_a, "ExternalTaskMarker", "external_task_id"), ["job_b1"])
+            self.assertIn("job_b1", get_keyword_values(dag_b, "BashOperator", "task_id"))
+
+            # Task names with a random suffix cannot be planned
+            source = write_export(tmp, "estate", [("FA", "Job-A1", out_condition("A1_OK"), "Dummy")])
+            with self.assertRaises(ValueError):
+                convert(plan_shards=2)
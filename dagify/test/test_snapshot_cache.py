@@ -0,0 +1,94 @@
+# Copyright 2024 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import shutil
+import tempfile
+import unittest
+from ..converter.render_cache import RENDER_CACHE_FILE
+from ..converter.snapshot_cache import SnapshotCache
+from ..converter.utils import load_source
+from .test_parser import SOURCES, summarize
+
+
+class TestClass(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.cache_dir = os.path.join(self.directory, "cache")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def copy_source(self, source, name):
+        path = os.path.join(self.directory, name)
+        shutil.copyfile(source, path)
+        return path
+
+    def test_snapshot_matches_parse(self):
+        source = self.copy_source(SOURCES[2], "first.xml")
+        parsed = load_source(source, "controlm", cache_dir=self.cache_dir)
+        self.assertEqual(len(os.listdir(self.cache_dir)), 1)
+        # The same content under another path is loaded from the snapshot
+        copy = self.copy_source(SOURCES[2], "second.xml")
+        cached = load_source(copy, "controlm", cache_dir=self.cache_dir)
+        self.assertEqual(summarize(cached), summarize(parsed))
+        self.assertEqual(
+            [task.get_output_raw_xml() for task in cached.get_tasks()],
+            [task.get_output_raw_xml() for task in parsed.get_tasks()])
+        self.assertEqual(cached.get_tasks()[0].source_document.source_path, copy)
+
+    def test_snapshot_invalidated_by_content(self):
+        source = self.copy_source(SOURCES[0], "source.xml")
+        cache = SnapshotCache(self.cache_dir)
+        key = cache.get_key(source, "controlm")
+        load_source(source, "controlm", cache_dir=self.cache_dir)
+        with open(source, "ab") as f:
+            f.write(b"\n")
+        self.assertNotEqual(cache.get_key(source, "controlm"), key)
+        self.assertIsNone(cache.load(source, "controlm"))
+        self.assertNotEqual(cache.get_key(source, "automic"), key)
+
+    def test_eviction_least_recently_used(self):
+        paths = [self.copy_source(source, f"{index}.xml")
+                 for index, source in enumerate(SOURCES[:2])]
+        cache = SnapshotCache(self.cache_dir)
+        for path in paths:
+            load_source(path, "controlm", cache_dir=self.cache_dir)
+        first, second = [cache.get_path(cache.get_key(path, "controlm")) for path in paths]
+        os.utime(first, ns=(0, 0))
+        os.utime(second, ns=(1, 1))
+        # Loading the first snapshot makes the second the least recently used
+        cache.max_size = os.path.getsize(first)
+        self.assertIsNotNone(cache.load(paths[0], "controlm"))
+        cache.evict()
+        self.assertTrue(os.path.exists(first))
+        self.assertFalse(os.path.exists(second))
+
+    def test_eviction_counts_render_cache(self):
+        source = self.copy_source(SOURCES[0], "source.xml")
+        cache = SnapshotCache(self.cache_dir)
+        load_source(source, "controlm", cache_dir=self.cache_dir)
+        snapshot = cache.get_path(cache.get_key(source, "controlm"))
+        renders = os.path.join(self.cache_dir, RENDER_CACHE_FILE)
+        with open(renders, "wb") as f:
+            f.write(b"x" * 100)
+        # The snapshot alone fits, not with the renders
+        cache.max_size = os.path.getsize(snapshot) + 50
+        cache.evict()
+        self.assertFalse(os.path.exists(snapshot))
+        self.assertTrue(os.path.exists(renders))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+# Copyright 2024 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+from ..converter.engine import compile_template
+from ..converter.structure_renderer import StructureRenderer
+
+
+class TestClass(unittest.TestCase):
+    def test_render(self):
+        structure = '{task_id} = BashOperator(\n  task_id="{task_id}",\n  env={{"A": 1}},\n  retries={retries:>2},\n  cmd={cmd!r},\n)\n'
+        renderer = StructureRenderer(structure, "bash")
+        self.assertEqual(renderer.keys, ["task_id", "retries", "cmd"])
+        values = {"task_id": "t", "retries": 3, "cmd": "echo {x}"}
+        self.assertEqual(renderer.render(values), structure.format(**values))
+        with self.assertRaises(ValueError):
+            renderer.render({"task_id": "t"})
+        with self.assertRaises(ValueError):
+            StructureRenderer("{task_id", "broken")
+        with self.assertRaises(ValueError):
+            StructureRenderer("{values[0]}", "indexed")
+
+    def test_compile_template_checks_keys(self):
+        template = {
+            "metadata": {"name": "bash"},
+            "structure": "{task_id} = BashOperator(queue='{queue}', command='{command}')",
+            "mappings": [{"source": "JOBNAME", "target": "task_id"}],
+        }
+        with self.assertRaises(ValueError):
+            compile_template(template)
+        template["mappings"].append({"source": "CMDLINE", "target": "command"})
+        compile_template(template)
+        self.assertEqual(len(template["rule_chains"]), 2)
+
+    def test_parameter_string_template_only(self):
+        template = {
+            "metadata": {"name": "bash"},
+            "structure": "{task_id} = BashOperator(bash_command='run {parameter_string}')",
+            "mappings": [{"source": "JOBNAME", "target": "task_id"}],
+        }
+        with self.assertRaises(ValueError):
+            compile_template(template)
+        template["metadata"]["name"] = "control-m-job-to-airflow-bash"
+        compile_template(template)
@@ -0,0 +1,110 @@
+# Copyright 2024 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import contextlib
+import io
+import unittest
+import xml.etree.ElementTree as ET
+from ..converter.uf import UF, UFTask
+from ..converter.utils import load_source
+from ..converter.tree_parser import (
+    TREE_HANDLERS,
+    add_child,
+    get_tree_parser,
+    register_tree_handlers,
+)
+from .test_parser import SOURCES
+
+JOB = """
+<JOB JOBNAME="job_1" TASKTYPE="Command">
+  <QUANTITATIVE NAME="DB_SLOTS" QUANT="2" />
+  <CONTROL NAME="DB_LOCK" TYPE="E" />
+  <ON STMT="*" CODE="NOTOK">
+    <DOMAIL DEST="ops@example.com" SUBJECT="job_1 failed" />
+    <DOCOND NAME="job_1-FAILED" ODATE="ODAT" SIGN="+" />
+  </ON>
+  <DESCRIPTION>Not converted</DESCRIPTION>
+</JOB>
+"""
+
+
+def summarize_actions(uf):
+    return [
+        (
+            [r.get_attributes() for r in task.get_quantitative_resources()],
+            [r.get_attributes() for r in task.get_control_resources()],
+            [(on.get_attributes(), [(do.get_action_type(), do.get_attributes())
+                                    for do in on.get_do_actions()])
+             for on in task.get_on_actions()],
+        )
+        for task in uf.get_tasks()
+    ]
+
+
+class TestClass(unittest.TestCase):
+    def test_resources_and_on_actions(self):
+        root = ET.fromstring(f"<DEFTABLE><FOLDER>{JOB}</FOLDER></DEFTABLE>")
+        parser = get_tree_parser("controlm")
+        uf = parser.parse(root, UF())
+        self.assertEqual(summarize_actions(uf), [(
+            [{"NAME": "DB_SLOTS", "QUANT": "2"}],
+            [{"NAME": "DB_LOCK", "TYPE": "E"}],
+            [({"STMT": "*", "CODE": "NOTOK"}, [
+                ("DOMAIL", {"DEST": "ops@example.com", "SUBJECT": "job_1 failed"}),
+                ("DOCOND", {"NAME": "job_1-FAILED", "ODATE": "ODAT", "SIGN": "+"}),
+            ])],
+        )])
+        self.assertEqual(dict(parser.unknown_tags), {"DESCRIPTION": 1})
+
+    def test_unknown_tags_counted(self):
+        # Conditions at folder level cannot be held by the UF
+        root = ET.fromstring(
+            "<DEFTABLE><SMART_FOLDER><INCOND NAME='a'/><INCOND NAME='b'/>"
+            "<RULE_BASED_CALENDARS/></SMART_FOLDER></DEFTABLE>")
+        parser = get_tree_parser("controlm")
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            parser.parse(root, UF())
+        self.assertEqual(output.getvalue(), "")
+        self.assertEqual(dict(parser.unknown_tags), {"INCOND": 2, "RULE_BASED_CALENDARS": 1})
+
+    def test_deep_nesting(self):
+        depth = 5000
+        content = "<SMART_FOLDER>" * depth + JOB + "</SMART_FOLDER>" * depth
+        root = ET.fromstring(f"<DEFTABLE>{content}</DEFTABLE>")
+        uf = get_tree_parser("controlm").parse(root, UF())
+        self.assertEqual(len(uf.get_tasks()), 1)
+
+    def test_streaming_matches_dom(self):
+        for source in SOURCES:
+            dom = load_source(source, "controlm")
+            stream = load_source(source, "controlm", streaming=True)
+            self.assertEqual(summarize_actions(stream), summarize_actions(dom))
+
+    def test_register_tree_handlers(self):
+        register_tree_handlers("custom", {"job": add_child(UFTask, "add_task")})
+        try:
+            root = ET.fromstring("<jobs><job name='a'/><group><job/></group></jobs>")
+            parser = get_tree_parser("custom")
+            uf = parser.parse(root, UF())
+            self.assertEqual(len(uf.get_tasks()), 1)
+            self.assertEqual(dict(parser.unknown_tags), {"group": 1})
+        finally:
+            del TREE_HANDLERS["custom"]
+        with self.assertRaises(ValueError):
+            get_tree_parser("custom")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,213 @@
+# Copyright 2024 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import pickle
+import unittest
+import xml.etree.ElementTree as ET
+from ..converter.uf import (
+    UF,
+    UFTask,
+    UFTaskVariable,
+    UFTaskInCondition,
+    UFTaskOutCondition,
+)
+from ..converter.tree_parser import get_tree_parser
+from .synthetic_estate import (
+    build_estate,
+    make_condition,
+    nested_loop_dependencies,
+)
+
+
+AUTOMIC_WORKFLOWS = """
+<uc-export>
+  <JOBP name="WF_A"><JOBP><JobpStruct>
+    <task Lnr="1" Object="A_START"/>
+    <task Lnr="2" Object="A_LOAD"><predecessors><pre PreLnr="1"/><pre PreLnr="1"/></predecessors></task>
+    <task Lnr="3" Object="A_END"><predecessors><pre PreLnr="2"/><pre PreLnr="1"/></predecessors></task>
+  </JobpStruct></JOBP></JOBP>
+  <JOBP name="WF_B"><JOBP><JobpStruct>
+    <task Lnr="1" Object="B_START"/>
+    <task Lnr="2" Object="B_END"><predecessors><pre PreLnr="1"/></predecessors></task>
+  </JobpStruct></JOBP></JOBP>
+</uc-export>
+"""
+
+
+def make_task(**attributes):
+    task = UFTask()
+    task.from_xml(ET.Element("JOB", attributes))
+    return task
+
+
+class TestClass(unittest.TestCase):
+    def test_attribute_copy_on_write(self):
+        task = make_task(JOBNAME="JOB-1", RUN_AS="user")
+        self.assertEqual(task.get_attribute("JOBNAME"), "JOB-1")
+        task.set_attribute("JOBNAME", "job_1")
+        self.assertEqual(task.get_attribute("JOBNAME"), "job_1")
+        self.assertEqual(task.get_attribute_original("JOBNAME"), "JOB-1")
+        self.assertEqual(task.get_attribute("JOBNAME_ORIGINAL"), "JOB-1")
+        # Setting the original value back drops the shadow
+        task.set_attribute("JOBNAME", "JOB-1")
+        self.assertEqual(task.get_attributes(), {"JOBNAME": "JOB-1", "RUN_AS": "user"})
+        self.assertIsNone(task.get_attribute("MISSING"))
+
+    def test_attribute_table_shared(self):
+        first = make_task(JOBNAME="A", NODEID="".join(["SERVER", "_1"]))
+        second = make_task(NODEID="".join(["SERVER", "_1"]), JOBNAME="B")
+        self.assertEqual(second.get_attribute("JOBNAME"), "B")
+        self.assertIsNone(UFTaskVariable().get_attribute("JOBNAME"))
+        # Repeated values are interned
+        self.assertIs(first.get_attribute("NODEID"), second.get_attribute("NODEID"))
+
+    def test_attribute_pickle(self):
+        task = make_task(JOBNAME="JOB-1", MEMNAME="script.sh")
+        task.set_attribute("MEMNAME", "other.sh")
+        task.release_raw_xml_element()
+        copy = pickle.loads(pickle.dumps(task))
+        self.assertEqual(copy.get_attributes(), task.get_attributes())
+        self.assertEqual(copy.get_attribute_original("MEMNAME"), "script.sh")
+
+    def test_read_only_after_freeze(self):
+        uf = UF()
+        uf.add_task(make_task(JOBNAME="JOB-1"))
+        uf.freeze()
+        task = uf.get_tasks()[0]
+        self.assertTrue(task.is_read_only())
+        with self.assertRaises(ValueError):
+            task.set_attribute("JOBNAME", "job_1")
+        with self.assertRaises(ValueError):
+            task.set_dag_name("dag")
+        # Setting the current value is not a change
+        task.set_attribute("JOBNAME", "JOB-1")
+        copy = pickle.loads(pickle.dumps(uf))
+        self.assertTrue(copy.get_tasks()[0].is_read_only())
+
+    def test_overlays_are_independent(self):
+        uf = UF()
+        uf.add_task(make_task(JOBNAME="JOB-1"))
+        uf.get_tasks()[0].add_variable(UFTaskVariable())
+        uf.freeze()
+        first = uf.create_overlay()
+        second = uf.create_overlay()
+        first.get_tasks()[0].set_attribute("JOBNAME", "job_1")
+        first.get_tasks()[0].add_dependent_task("dag", "job_2")
+        self.assertEqual(first.get_tasks()[0].get_attribute("JOBNAME"), "job_1")
+        self.assertEqual(second.get_tasks()[0].get_attribute("JOBNAME"), "JOB-1")
+        self.assertEqual(uf.get_tasks()[0].get_attribute("JOBNAME"), "JOB-1")
+        self.assertEqual(second.get_tasks()[0].get_dependent_tasks(), [])
+        # Parsed values and children are shared, not copied
+        self.assertIs(first.get_tasks()[0]._values, uf.get_tasks()[0]._values)
+        self.assertIs(first.get_tasks()[0].get_variables(), uf.get_tasks()[0].get_variables())
+
+    def test_dependencies_match_nested_loop(self):
+        expected = build_estate(450)
+        nested_loop_dependencies(expected)
+        uf = build_estate(450)
+        edges = uf.calculate_dag_dependencies_controlm()
+        self.assertEqual(
+            [task.get_dependent_tasks() for task in uf.get_tasks()],
+            [task.get_dependent_tasks() for task in expected.get_tasks()])
+        self.assertEqual(len(edges), sum(len(task.get_dependent_tasks()) for task in uf.get_tasks()))
+
+    def test_dependencies_deduplicated(self):
+        uf = build_estate(2)
+        producer, consumer = uf.get_tasks()
+        # A second condition between the same tasks adds no second edge
+        producer.add_out_condition(make_condition(UFTaskOutCondition, "EXTRA", "+"))
+        consumer.add_in_condition(make_condition(UFTaskInCondition, "EXTRA"))
+        consumer.add_in_condition(make_condition(UFTaskInCondition, "EXTRA"))
+        self.assertEqual(uf.calculate_dag_dependencies_controlm(), [(producer, consumer)])
+        self.assertEqual(producer.get_dependent_tasks(), [{"dag_name": "FOLDER-0", "task_name": "JOB-1"}])
+
+    def test_attribute_index(self):
+        uf = UF()
+        uf.add_task(make_task(JOBNAME="JOB-1", PARENT_FOLDER="A"))
+        uf.add_task(make_task(JOBNAME="JOB-2", PARENT_FOLDER="B"))
+        self.assertEqual(uf.get_attribute_values("PARENT_FOLDER"), ["A", "B"])
+        # Tasks added later are indexed on the next lookup
+        uf.add_task(make_task(JOBNAME="JOB-3", PARENT_FOLDER="A"))
+        self.assertEqual(
+            [task.get_attribute("JOBNAME") for task in uf.get_tasks_by_attr("PARENT_FOLDER", "A")],
+            ["JOB-1", "JOB-3"])
+        self.assertEqual(uf.get_tasks_by_attr("PARENT_FOLDER", "C"), [])
+        # Tasks are found by their converted values
+        uf.get_tasks()[0].set_attribute("JOBNAME", "job_1")
+        self.assertIs(uf.get_task_by_attr("JOBNAME", "job_1"), uf.get_tasks()[0])
+        self.assertIsNone(uf.get_task_by_attr("JOBNAME", "JOB-1"))
+        # Changed tasks are moved between entries, which stay in task order
+        uf.get_tasks()[2].set_attribute("PARENT_FOLDER", "C")
+        uf.get_tasks()[0].set_attribute("PARENT_FOLDER", "B")
+        self.assertEqual(uf.get_tasks_by_attr("PARENT_FOLDER", "B"), uf.get_tasks()[:2])
+        self.assertEqual(uf.get_attribute_values("PARENT_FOLDER"), ["B", "C"])
+        uf.get_tasks()[0].set_attribute("PARENT_FOLDER", "A")
+        uf.get_tasks()[2].set_attribute("PARENT_FOLDER", "A")
+        self.assertEqual(uf.get_attribute_values("PARENT_FOLDER"), ["A", "B"])
+        # Tasks moved in reverse order are inserted in task order
+        for task in reversed(uf.get_tasks()):
+            task.set_attribute("PARENT_FOLDER", "D")
+        self.assertEqual(uf.get_tasks_by_attr("PARENT_FOLDER", "D"), uf.get_tasks())
+        self.assertEqual(uf.get_attribute_values("PARENT_FOLDER"), ["D"])
+        uf.get_tasks()[1].set_attribute("PARENT_FOLDER", "B")
+        uf.get_tasks()[0].set_attribute("PARENT_FOLDER", "A")
+        uf.get_tasks()[2].set_attribute("PARENT_FOLDER", "A")
+        # Indexing one Universal Format leaves the indexes of others as they are
+        other = UF()
+        other.add_task(make_task(JOBNAME="JOB-4", PARENT_FOLDER="A"))
+        index = uf.get_attribute_index("PARENT_FOLDER")
+        other.get_tasks()[0].set_attribute("PARENT_FOLDER", "D")
+        self.assertIs(uf.get_attribute_index("PARENT_FOLDER"), index)
+
+        uf.freeze()
+        self.assertEqual(
+            pickle.loads(pickle.dumps(uf)).get_attribute_values("PARENT_FOLDER"), ["A", "B"])
+        overlay = uf.create_overlay()
+        overlay.get_tasks()[1].set_attribute("PARENT_FOLDER", "A")
+        self.assertEqual(len(overlay.get_tasks_by_attr("PARENT_FOLDER", "A")), 3)
+        self.assertEqual(len(uf.get_tasks_by_attr("PARENT_FOLDER", "A")), 2)
+
+    def test_automic_dependencies_within_workflow(self):
+        uf = get_tree_parser("automic").parse(ET.fromstring(AUTOMIC_WORKFLOWS), UF())
+        overlay = uf.freeze().create_overlay()
+        for task in overlay.get_tasks():
+            task.set_dag_name(task.get_attribute("Object")[0])
+        edges = overlay.calculate_dag_dependencies_automic()
+        # Lnr 1 of WF_B is not a predecessor in WF_A, and repeated pre
+        # conditions add a single edge
+        self.assertEqual(
+            [(task.get_attribute("Object"), dep.get_attribute("Object")) for task, dep in edges],
+            [("A_START", "A_LOAD"), ("A_START", "A_END"), ("A_LOAD", "A_END"), ("B_START", "B_END")])
+        self.assertEqual(
+            overlay.get_tasks()[0].get_dependent_tasks(),
+            [{"dag_name": "A", "task_name": "A_LOAD"}, {"dag_name": "A", "task_name": "A_END"}])
+
+    def test_automic_dependencies_without_index(self):
+        uf = UF()
+        for lnr, pre_lnrs in [("1", []), ("2", ["1"]), ("3", ["1", "2"])]:
+            task = make_task(Lnr=lnr, Object=f"TASK_{lnr}")
+            for pre_lnr in pre_lnrs:
+                in_cond = UFTaskInCondition()
+                in_cond.from_attributes({"PreLnr": pre_lnr})
+                task.add_in_condition(in_cond)
+            task.set_dag_name("dag")
+            uf.add_task(task)
+        uf.calculate_dag_dependencies_automic()
+        self.assertEqual(
+            [[dep["task_name"] for dep in task.get_dependent_tasks()] for task in uf.get_tasks()],
+            [["TASK_2", "TASK_3"], ["TASK_3"], []])
+
+
+if __name__ == '__main__':
+    unittest.main()
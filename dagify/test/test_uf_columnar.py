@@ -0,0 +1,77 @@
+# Copyright 2024 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import shutil
+import tempfile
+import unittest
+from ..converter.utils import load_source
+from ..converter.uf_columnar import (
+    uf_to_tables,
+    tables_to_uf,
+    write_dataset,
+    read_table,
+    read_dataset,
+    get_task_types,
+    get_jobs_with_attribute,
+)
+from .test_parser import SOURCES, summarize
+
+
+class TestClass(unittest.TestCase):
+    def setUp(self):
+        self.dataset = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dataset)
+
+    def test_tables_round_trip(self):
+        for source in SOURCES:
+            uf = load_source(source, "controlm")
+            tables = uf_to_tables(uf)
+            self.assertEqual(tables["tasks"].num_rows, len(uf.get_tasks()))
+            self.assertEqual(summarize(tables_to_uf(tables)), summarize(uf))
+
+    def test_partitioned_dataset(self):
+        ufs = {}
+        for index, source in enumerate(SOURCES):
+            ufs[f"export{index}"] = load_source(source, "controlm")
+            write_dataset(ufs[f"export{index}"], self.dataset, f"export{index}")
+        # Writing a source again replaces its partition
+        write_dataset(ufs["export0"], self.dataset, "export0")
+
+        tasks = read_table(self.dataset, "tasks", columns=["source", "NODEID", "TASKTYPE"])
+        self.assertEqual(tasks.num_rows, sum(len(uf.get_tasks()) for uf in ufs.values()))
+        counts = tasks.group_by(["source", "TASKTYPE"]).aggregate([([], "count_all")])
+        self.assertEqual(sum(counts.column("count_all").to_pylist()), tasks.num_rows)
+
+        for source, uf in ufs.items():
+            self.assertEqual(summarize(read_dataset(self.dataset, source)), summarize(uf))
+        with self.assertRaises(ValueError):
+            read_table(self.dataset, "jobs")
+
+    def test_task_queries(self):
+        uf = load_source(SOURCES[2], "controlm")
+        tasks = uf_to_tables(uf)["tasks"]
+        self.assertEqual(
+            sorted(get_task_types(tasks)),
+            sorted({task.get_attribute("TASKTYPE").lower() for task in uf.get_tasks()}))
+        self.assertEqual(
+            get_jobs_with_attribute(tasks, "CONFIRM"),
+            [task.get_attribute("JOBNAME") for task in uf.get_tasks()
+             if task.get_attribute("CONFIRM") is not None])
+        self.assertEqual(get_jobs_with_attribute(tasks, "MISSING"), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -13,7 +13,9 @@
 # limitations under the License.
 
 import unittest
-from ..converter.utils import clean_converter_type
+import xml.etree.ElementTree as ET
+from ..converter.uf import UFTask
+from ..converter.utils import clean_converter_type, get_divider_value
 
 
 class TestClass(unittest.TestCase):
@@ -30,6 +32,14 @@ class TestClass(unittest.TestCase):
         self.assertEqual(clean_converter_type("Control_M"), "CONTROLM")
         self.assertEqual(clean_converter_type("Control M"), "CONTROLM")
 
+    def test_utils_func_get_divider_value(self):
+        task = UFTask()
+        task.from_xml(ET.Element("JOB", {"APPLICATION": "Billing", "SUB_APPLICATION": "EXF"}))
+        self.assertEqual(get_divider_value(task, "APPLICATION"), "Billing")
+        self.assertEqual(get_divider_value(task, "APPLICATION+SUB_APPLICATION"), "Billing_EXF")
+        self.assertEqual(get_divider_value(task, "APPLICATION+MISSING"), "Billing")
+        self.assertIsNone(get_divider_value(task, "MISSING+OTHER"))
+
 
 if __name__ == '__main__':
     unittest.main()